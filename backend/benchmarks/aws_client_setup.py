@@ -0,0 +1,69 @@
+"""Per-request AWS client setup cost: fresh boto3 clients vs the shared registry.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/aws_client_setup.py --iterations 50
+
+No network calls are made; only client construction is timed.
+"""
+
+import argparse
+import statistics
+import time
+
+import boto3
+
+from aws.config import AWSClientSettings
+from aws.registry import SERVICES, AWSClientRegistry
+
+SETTINGS = AWSClientSettings(AWS_ACCESS_KEY="bench", AWS_SECRET_ACCESS_KEY="bench", AWS_REGION="us-east-1")
+
+
+def per_request_clients() -> None:
+    """What each request paid before: one boto3.client(...) per service"""
+    for service_name in SERVICES:
+        boto3.client(
+            service_name,
+            region_name=SETTINGS.AWS_REGION,
+            aws_access_key_id=SETTINGS.AWS_ACCESS_KEY,
+            aws_secret_access_key=SETTINGS.AWS_SECRET_ACCESS_KEY,
+        )
+
+
+def registry_clients(registry: AWSClientRegistry) -> None:
+    for service_name in SERVICES:
+        registry.client(service_name)
+
+
+def measure(fn, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    print(
+        f"{name:<12} mean={statistics.mean(timings):8.3f}ms "
+        f"p50={statistics.median(timings):8.3f}ms max={max(timings):8.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    registry = AWSClientRegistry.from_settings(SETTINGS)
+    registry.warm_up()
+
+    report("per-request", measure(per_request_clients, args.iterations))
+    report("registry", measure(lambda: registry_clients(registry), args.iterations))
+
+    registry.close()
+
+
+if __name__ == "__main__":
+    main()
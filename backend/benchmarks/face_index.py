@@ -0,0 +1,68 @@
+"""1:N face identification latency: exhaustive scan vs the IVF index.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/face_index.py --users 1000000 --queries 500
+
+With `--store DIR` the gallery lives in a memory-mapped store; run it twice to
+see the cold start of a worker mapping an existing store.
+
+The gallery is random unit vectors, the worst case for partitioning since real
+face embeddings cluster; queries are perturbed gallery entries, and recall is
+the share whose true nearest neighbour comes back first.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from faces.embeddings import normalize
+from faces.index import IVFIndex
+from faces.store import MappedEmbeddingStore, MemoryEmbeddingStore
+
+
+def measure(name: str, search, queries: np.ndarray, expected: np.ndarray) -> None:
+    started = time.perf_counter()
+    found = np.asarray([search(query) for query in queries])
+    elapsed = time.perf_counter() - started
+    recall = np.mean(found == expected)
+    print(f"{name:<12} {elapsed / len(queries) * 1000:8.2f} ms/query  recall {recall:.3f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--store", type=Path)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    gallery = normalize(rng.standard_normal((args.users, args.dim)).astype(np.float32))
+    picked = rng.choice(args.users, args.queries, replace=False)
+    queries = normalize(gallery[picked] + 0.05 * rng.standard_normal((args.queries, args.dim)).astype(np.float32))
+    expected = np.asarray([np.argmax(gallery @ query) for query in queries])
+
+    started = time.perf_counter()
+    store = MappedEmbeddingStore(args.store, args.dim) if args.store else MemoryEmbeddingStore(args.dim)
+    if store.seed(np.arange(args.users), gallery):
+        print(f"seeded store in {time.perf_counter() - started:.1f}s")
+    else:
+        print(f"mapped {len(store)} stored embeddings in {time.perf_counter() - started:.1f}s")
+
+    index = IVFIndex(store)
+    started = time.perf_counter()
+    index.build()
+    print(f"built {index.stats()} in {time.perf_counter() - started:.1f}s")
+
+    measure("exhaustive", lambda query: np.argmax(gallery @ query), queries, expected)
+    for nprobe in args.nprobe:
+        index.nprobe = nprobe
+        measure(f"nprobe={nprobe}", lambda query: index.search(query)[0][0], queries, expected)
+
+
+if __name__ == "__main__":
+    main()
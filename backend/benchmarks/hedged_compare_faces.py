@@ -0,0 +1,92 @@
+"""CompareFaces tail latency with and without hedging, against a latency-injecting stand-in.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/hedged_compare_faces.py --requests 2000 --slow-rate 0.02
+
+The stand-in backend answers in a log-normal time around --median-ms and,
+for --slow-rate of the calls, takes --slow-ms instead, like the occasional
+multi-second Rekognition call. No network calls are made.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from core.hedging import HedgingPolicy
+from core.latency import LatencyHistogram
+from rekognition.backends import FaceMatchingBackend
+from rekognition.schemas import FaceReference
+from rekognition.service import RekognitionService
+
+
+class SlowTailBackend(FaceMatchingBackend):
+    def __init__(self, median: float, slow: float, slow_rate: float):
+        self.median = median
+        self.slow = slow
+        self.slow_rate = slow_rate
+        self.calls = 0
+
+    async def compare_faces(self, reference: FaceReference, image: bytes, threshold: float) -> list[dict]:
+        self.calls += 1
+        if random.random() < self.slow_rate:
+            await asyncio.sleep(self.slow)
+        else:
+            await asyncio.sleep(random.lognormvariate(0, 0.25) * self.median)
+        return [{"Similarity": 99.0}]
+
+    async def detect_face_details(self, image: bytes) -> dict:
+        return {"FaceDetails": []}
+
+
+async def measure(service: RekognitionService, requests: int, concurrency: int) -> list[float]:
+    timings = []
+    reference = FaceReference(key="face_1.jpg")
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            await service.compare_faces(reference, b"image")
+            timings.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return timings
+
+
+def report(name: str, timings: list[float], calls: int) -> None:
+    quantiles = statistics.quantiles(timings, n=1000)
+    print(
+        f"{name:<10} p50={statistics.median(timings):8.1f}ms p99={quantiles[989]:8.1f}ms "
+        f"p99.9={quantiles[998]:8.1f}ms extra calls={calls / len(timings) - 1:6.1%}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--median-ms", type=float, default=80)
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--slow-rate", type=float, default=0.02)
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--budget", type=float, default=0.05)
+    args = parser.parse_args()
+
+    def backend() -> SlowTailBackend:
+        return SlowTailBackend(args.median_ms / 1000, args.slow_ms / 1000, args.slow_rate)
+
+    plain = backend()
+    report("plain", await measure(RekognitionService(plain), args.requests, args.concurrency), plain.calls)
+
+    hedged = backend()
+    hedging = HedgingPolicy("compare_faces", LatencyHistogram(), percentile=args.percentile, budget=args.budget)
+    timings = await measure(RekognitionService(hedged, hedging), args.requests, args.concurrency)
+    report("hedged", timings, hedged.calls)
+    print(hedging.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
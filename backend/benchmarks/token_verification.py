@@ -0,0 +1,113 @@
+"""Bearer token validation throughput: Cognito get_user round trip vs local JWKS verification.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/token_verification.py --requests 2000 --concurrency 100
+
+The remote path uses a stand-in Cognito client whose `get_user` sleeps for
+`--latency-ms`, running on the same bounded executor the app uses. The local
+path calls it once, for the email access tokens don't carry.
+"""
+
+import argparse
+import asyncio
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from aws.offload import OffloadedClient
+from cognito.repository import CognitoRepo
+from cognito.service import CognitoTokenService
+from cognito.verifier import CognitoTokenVerifier, JWKSCache, JWKSSource
+from core.executors import UpstreamExecutor
+
+ISSUER = "https://cognito-idp.us-east-1.amazonaws.com/us-east-1_bench"
+CLIENT_ID = "bench-client"
+
+
+class StandInCognito:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def get_user(self, AccessToken: str) -> dict:
+        time.sleep(self.latency)
+        return {
+            "Username": "bench@example.com",
+            "UserAttributes": [
+                {"Name": "sub", "Value": "bench"},
+                {"Name": "email", "Value": "bench@example.com"},
+                {"Name": "email_verified", "Value": "true"},
+            ],
+        }
+
+
+class StaticJWKSSource(JWKSSource):
+    def __init__(self, jwk: dict):
+        self.jwk = jwk
+
+    async def fetch(self) -> dict:
+        return {"keys": [self.jwk]}
+
+
+async def measure(name: str, validate, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await validate()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:<8} {requests / elapsed:10.1f} req/s ({elapsed:.2f}s for {requests} requests)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    args = parser.parse_args()
+
+    executor = UpstreamExecutor("cognito-idp", max_concurrency=50, max_queue=args.requests)
+    cognito = CognitoTokenService(
+        CognitoRepo(
+            user_pool_id="us-east-1_bench",
+            client_id=CLIENT_ID,
+            client_secret="secret",
+            cognito_idp=OffloadedClient(StandInCognito(args.latency_ms / 1000), executor),
+        )
+    )
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update(kid="bench", alg="RS256")
+    now = int(time.time())
+    token = jwt.encode(
+        {
+            "sub": "bench",
+            "iss": ISSUER,
+            "client_id": CLIENT_ID,
+            "token_use": "access",
+            "username": "bench@example.com",
+            "iat": now,
+            "exp": now + 3600,
+        },
+        private_key,
+        algorithm="RS256",
+        headers={"kid": "bench"},
+    )
+    verifier = CognitoTokenVerifier(JWKSCache(StaticJWKSSource(jwk)), issuer=ISSUER, client_id=CLIENT_ID)
+
+    await measure("remote", lambda: cognito.get_user_profile(token), args.requests, args.concurrency)
+    await measure(
+        "local", lambda: verifier.get_profile(token, cognito.get_user_profile), args.requests, args.concurrency
+    )
+
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
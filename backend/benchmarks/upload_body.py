@@ -0,0 +1,92 @@
+"""CPU time per face image request: multipart form upload vs raw image body.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/upload_body.py --requests 200 --sizes 1 3 5
+
+Requests go through the upload size limit middleware and the same readers
+the face routes use, in-process over httpx's ASGI transport. Bodies arrive in
+64 KB chunks as they would from uvicorn; the client side streams the same
+pre-built chunks in both modes, so the difference is the server's parsing.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Annotated
+
+import httpx
+from fastapi import FastAPI, File, Request, UploadFile
+
+from core.uploads import MULTIPART_OVERHEAD, BodySizeLimitMiddleware, read_body, read_upload
+
+MB = 1024 * 1024
+MAX_IMAGE_SIZE = 10 * MB
+CHUNK_SIZE = 64 * 1024
+BOUNDARY = "benchmark-boundary"
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=MAX_IMAGE_SIZE + MULTIPART_OVERHEAD)
+
+    @app.post("/multipart")
+    async def multipart(image: Annotated[UploadFile, File()]) -> dict:
+        return {"size": len(await read_upload(image, MAX_IMAGE_SIZE))}
+
+    @app.post("/raw")
+    async def raw(request: Request) -> dict:
+        return {"size": len(await read_body(request, MAX_IMAGE_SIZE))}
+
+    return app
+
+
+def chunked(body: bytes) -> list[bytes]:
+    return [body[start : start + CHUNK_SIZE] for start in range(0, len(body), CHUNK_SIZE)]
+
+
+async def stream(chunks: list[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+async def measure(client: httpx.AsyncClient, path: str, chunks: list[bytes], content_type: str, requests: int) -> float:
+    started = time.process_time()
+    for _ in range(requests):
+        response = await client.post(path, content=stream(chunks), headers={"Content-Type": content_type})
+        response.raise_for_status()
+    return (time.process_time() - started) / requests
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 3, 5], help="image sizes in MB")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for size in args.sizes:
+            image = bytes(range(256)) * int(size * MB / 256)
+            form = b"".join(
+                [
+                    f"--{BOUNDARY}\r\n".encode(),
+                    b'Content-Disposition: form-data; name="image"; filename="face.jpg"\r\n',
+                    b"Content-Type: image/jpeg\r\n\r\n",
+                    image,
+                    f"\r\n--{BOUNDARY}--\r\n".encode(),
+                ]
+            )
+
+            multipart = await measure(
+                client, "/multipart", chunked(form), f"multipart/form-data; boundary={BOUNDARY}", args.requests
+            )
+            raw = await measure(client, "/raw", chunked(image), "image/jpeg", args.requests)
+            print(
+                f"{size:4.1f} MB  multipart {multipart * 1000:7.2f} ms CPU/request  "
+                f"raw {raw * 1000:7.2f} ms CPU/request  ({multipart / raw:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
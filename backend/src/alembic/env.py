@@ -11,6 +11,7 @@ from core.config import get_settings
 
 from users.models import User  # noqa
 from clients.models import Client  # noqa
+from enrollments.models import EnrollmentJob  # noqa
 
 config = context.config
 
@@ -0,0 +1,32 @@
+"""Add face id column to User model
+
+Revision ID: 7f3a2c9d4b1e
+Revises: dc44f0ef61f2
+Create Date: 2026-10-18 10:12:31.402117
+
+Existing users are indexed into the Rekognition collection by
+`python -m rekognition.backfill`. Before downgrading, run it with --delete so
+the indexed faces don't outlive the column that points to them.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7f3a2c9d4b1e"
+down_revision: str | None = "dc44f0ef61f2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("face_id", sa.String(), nullable=True))
+    op.create_unique_constraint("users_face_id_key", "users", ["face_id"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("users_face_id_key", "users", type_="unique")
+    op.drop_column("users", "face_id")
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from typing import Annotated, Literal
+
+from fastapi import Depends
+from pydantic_settings import BaseSettings
+
+
+class AWSClientSettings(BaseSettings):
+    AWS_ACCESS_KEY: str
+    AWS_SECRET_ACCESS_KEY: str
+    AWS_REGION: str = "us-east-1"
+
+    AWS_MAX_POOL_CONNECTIONS: int = 50
+    AWS_CONNECT_TIMEOUT: float = 2.0
+    AWS_READ_TIMEOUT: float = 10.0
+    AWS_RETRY_MODE: Literal["legacy", "standard", "adaptive"] = "standard"
+    AWS_MAX_ATTEMPTS: int = 3
+    AWS_TRANSPORT: Literal["threaded", "native"] = "threaded"
+
+    COGNITO_MAX_CONCURRENCY: int = 50
+    COGNITO_MAX_QUEUE: int = 500
+    REKOGNITION_MAX_CONCURRENCY: int = 50
+    REKOGNITION_MAX_QUEUE: int = 500
+    S3_MAX_CONCURRENCY: int = 50
+    S3_MAX_QUEUE: int = 500
+
+    # Requests per second each upstream is held to, unset leaves it unlimited
+    COGNITO_RATE_LIMIT: float | None = None
+    REKOGNITION_RATE_LIMIT: float | None = None
+    S3_RATE_LIMIT: float | None = None
+
+    # Rekognition is paced by a bucket that backs off when throttled and
+    # speeds up while calls succeed, REKOGNITION_RATE_LIMIT caps its rate
+    REKOGNITION_ADAPTIVE_RATE_LIMIT: bool = True
+    REKOGNITION_RATE_INITIAL: float = 10.0
+    REKOGNITION_RATE_MIN: float = 1.0
+    REKOGNITION_RATE_MAX: float = 100.0
+    REKOGNITION_RATE_INCREASE: float = 1.0
+    REKOGNITION_RATE_DECREASE: float = 0.5
+    # Attempts per throttled call and the seconds they may take altogether
+    REKOGNITION_THROTTLE_MAX_ATTEMPTS: int = 4
+    REKOGNITION_THROTTLE_BUDGET: float = 2.0
+
+    # Each upstream gets its own breaker, opened when too many of the last
+    # CIRCUIT_BREAKER_WINDOW calls failed or took over
+    # CIRCUIT_BREAKER_SLOW_CALL_DURATION seconds
+    CIRCUIT_BREAKER_ENABLED: bool = True
+    CIRCUIT_BREAKER_WINDOW: int = 50
+    CIRCUIT_BREAKER_MIN_CALLS: int = 10
+    CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5
+    CIRCUIT_BREAKER_SLOW_CALL_RATE: float = 0.8
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION: float = 5.0
+    CIRCUIT_BREAKER_OPEN_DURATION: float = 30.0
+    CIRCUIT_BREAKER_HALF_OPEN_CALLS: int = 3
+
+    # Regions Rekognition and S3 reads may fail over to from AWS_REGION, which
+    # stays the home of every write and of Cognito. Reads naming an S3 object
+    # only go to regions with a replica of the bucket in AWS_S3_REPLICA_BUCKETS
+    AWS_FAILOVER_REGIONS: list[str] = []
+    AWS_S3_REPLICA_BUCKETS: dict[str, str] = {}
+    # Endpoint per region, for stand-ins of the regional AWS endpoints
+    AWS_REGIONAL_ENDPOINTS: dict[str, str] = {}
+    AWS_REGION_WINDOW: float = 60.0
+    AWS_REGION_FAILURE_RATE: float = 0.2
+    AWS_REGION_SWITCH_MARGIN: float = 0.2
+    AWS_REGION_EXPLORE_RATE: float = 0.02
+
+
+@lru_cache
+def get_aws_client_settings() -> AWSClientSettings:
+    return AWSClientSettings()
+
+
+AWSClientSettingsDependency = Annotated[AWSClientSettings, Depends(get_aws_client_settings)]
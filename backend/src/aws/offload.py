@@ -0,0 +1,192 @@
+import asyncio
+import random
+import time
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from botocore.client import BaseClient
+from botocore.exceptions import ClientError, ConnectionError, HTTPClientError
+
+from core import deadline
+from core.circuit_breaker import CircuitBreaker
+from core.executors import UpstreamExecutor
+from core.ratelimit import AdaptiveTokenBucket, TokenBucket
+
+# Error codes AWS answers with when a caller goes over its request rate
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "SlowDown",
+}
+# Error codes of failures that may well not happen again on a retry
+TRANSIENT_ERROR_CODES = {
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "InternalServerError",
+    "InternalErrorException",
+    "ServiceUnavailable",
+}
+
+
+def is_upstream_failure(e: Exception) -> bool:
+    """Whether `e` means the upstream is unhealthy, rather than that it rejected the request"""
+    if isinstance(e, ClientError):
+        code = e.response.get("Error", {}).get("Code")
+        status_code = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 0)
+        return code in THROTTLING_ERROR_CODES or code in TRANSIENT_ERROR_CODES or status_code >= 500
+    return isinstance(e, (ConnectionError, HTTPClientError, TimeoutError))
+
+
+class OffloadedClient:
+    """Async facade over a boto3 client.
+
+    Every operation is awaited instead of called, and runs on the upstream's
+    executor so a slow AWS call never blocks the event loop. Modeled exceptions
+    are still reachable through `exceptions`, so callers keep the boto3 idioms.
+    A call still running at the request's deadline is abandoned with
+    DeadlineExceededError, its thread finishes on its own.
+    """
+
+    def __init__(self, client: BaseClient, executor: UpstreamExecutor):
+        self._client = client
+        self._executor = executor
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    @property
+    def meta(self):
+        return self._client.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        operation = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            async with deadline.bounded():
+                return await self._executor.run(operation, *args, **kwargs)
+
+        return call
+
+
+class RateLimitedClient:
+    """Async client wrapper that takes a token from `bucket` before every operation"""
+
+    def __init__(self, client: Any, bucket: TokenBucket):
+        self._client = client
+        self._bucket = bucket
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    @property
+    def meta(self):
+        return self._client.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        operation = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            await self._bucket.acquire()
+            return await operation(*args, **kwargs)
+
+        return call
+
+
+class AdaptiveClient:
+    """Async client wrapper that paces operations through an adaptive bucket.
+
+    Throttled operations lower the bucket's rate and are retried after a
+    jittered backoff, as are transient server errors, dropped connections and
+    read timeouts, as long as the retry
+    still fits in `budget` seconds from the first attempt and before the
+    request's deadline. Waiting for a token counts against the same budget,
+    so a caller is shed with UpstreamSaturatedError instead of queueing past
+    it. Other errors go straight through. The wrapped client must not retry
+    itself, or the bucket never sees the throttles, so this takes over
+    botocore's retries of network errors as well.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        bucket: AdaptiveTokenBucket,
+        max_attempts: int = 4,
+        budget: float = 2.0,
+        base_delay: float = 0.05,
+        max_delay: float = 1.0,
+    ):
+        self._client = client
+        self._bucket = bucket
+        self._max_attempts = max_attempts
+        self._budget = budget
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    @property
+    def meta(self):
+        return self._client.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        operation = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            give_up_at = time.monotonic() + deadline.timeout(self._budget)
+            for attempt in range(1, self._max_attempts + 1):
+                await self._bucket.acquire(max_wait=max(0.0, give_up_at - time.monotonic()))
+                try:
+                    response = await operation(*args, **kwargs)
+                except (ClientError, ConnectionError, HTTPClientError) as e:
+                    code = e.response.get("Error", {}).get("Code") if isinstance(e, ClientError) else None
+                    if code in THROTTLING_ERROR_CODES:
+                        self._bucket.on_throttle()
+                    elif isinstance(e, ClientError) and code not in TRANSIENT_ERROR_CODES:
+                        raise
+                    # Full jitter keeps throttled callers from retrying in lockstep
+                    delay = random.uniform(0, min(self._max_delay, self._base_delay * 2**attempt))
+                    if attempt == self._max_attempts or time.monotonic() + delay >= give_up_at:
+                        raise
+                    await asyncio.sleep(delay)
+                else:
+                    self._bucket.on_success()
+                    return response
+
+        return call
+
+
+class CircuitBreakerClient:
+    """Async client wrapper that runs every operation through `breaker`.
+
+    It wraps the others, so a call rejected by an open breaker doesn't wait for
+    a token or an executor slot, and a call the limiter retried counts once.
+    """
+
+    def __init__(self, client: Any, breaker: CircuitBreaker):
+        self._client = client
+        self._breaker = breaker
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    @property
+    def meta(self):
+        return self._client.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        operation = getattr(self._client, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            with self._breaker.guard():
+                return await operation(*args, **kwargs)
+
+        return call
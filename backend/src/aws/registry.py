@@ -0,0 +1,314 @@
+import copy
+import threading
+from typing import Annotated, Any
+
+import boto3
+import httpx
+from botocore.client import BaseClient
+from botocore.config import Config
+from fastapi import Depends, Request
+
+from aws.config import AWSClientSettings
+from aws.offload import AdaptiveClient, CircuitBreakerClient, OffloadedClient, RateLimitedClient, is_upstream_failure
+from aws.routing import REGIONAL_READ_OPERATIONS, RegionalClient, RegionRouter, replica_buckets
+from aws.transport import AsyncAWSClient
+from core.circuit_breaker import CircuitBreaker
+from core.executors import UpstreamExecutor
+from core.ratelimit import AdaptiveTokenBucket, TokenBucket
+
+COGNITO_IDP = "cognito-idp"
+REKOGNITION = "rekognition"
+S3 = "s3"
+
+SERVICES = (COGNITO_IDP, REKOGNITION, S3)
+
+AsyncClient = (
+    OffloadedClient | AsyncAWSClient | RateLimitedClient | AdaptiveClient | CircuitBreakerClient | RegionalClient
+)
+
+
+class AWSClientRegistry:
+    """Process-wide boto3 clients shared by every request handled by a worker.
+
+    boto3 clients are thread-safe once built, but building one loads the service
+    model, resolves credentials and opens a new connection pool, so the registry
+    builds each client once and hands out the same instance afterwards.
+
+    Async callers use `async_client`, which runs each operation on the
+    service's own bounded executor, or on the event loop through the native
+    transport when an `http` pool is given. Services with a `rate_limits`
+    bucket are additionally held to its request rate. An adaptive bucket also
+    takes over retrying throttled calls from botocore, so it sees every
+    throttle and can slow down.
+    """
+
+    def __init__(
+        self,
+        session: boto3.session.Session,
+        config: Config,
+        executors: dict[str, UpstreamExecutor] | None = None,
+        http: httpx.AsyncClient | None = None,
+        rate_limits: dict[str, TokenBucket] | None = None,
+        throttle_max_attempts: int = 4,
+        throttle_budget: float = 2.0,
+        breakers: dict[str, CircuitBreaker] | None = None,
+        routers: dict[str, RegionRouter] | None = None,
+        replica_buckets: dict[str, str] | None = None,
+        endpoints: dict[str, str] | None = None,
+    ):
+        self._session = session
+        self._config = config
+        self._executors = executors or {}
+        self._http = http
+        self._rate_limits = rate_limits or {}
+        self._throttle_max_attempts = throttle_max_attempts
+        self._throttle_budget = throttle_budget
+        self._breakers = breakers or {}
+        self._routers = routers or {}
+        self._replica_buckets = replica_buckets or {}
+        self._endpoints = endpoints or {}
+        self._clients: dict[tuple[str, str | None], BaseClient] = {}
+        self._async_clients: dict[tuple[str, str | None], AsyncClient] = {}
+
+        # Throttling and outages are regional, every region gets its own bucket and breaker
+        self._regional_rate_limits: dict[tuple[str, str], TokenBucket] = {}
+        self._regional_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+        for service_name, router in self._routers.items():
+            for region in router.regions[1:]:
+                if service_name in self._rate_limits:
+                    bucket = copy.deepcopy(self._rate_limits[service_name])
+                    bucket.name = f"{service_name} ({region})"
+                    self._regional_rate_limits[service_name, region] = bucket
+                if service_name in self._breakers:
+                    breaker = copy.deepcopy(self._breakers[service_name])
+                    breaker.name = f"{service_name} ({region})"
+                    self._regional_breakers[service_name, region] = breaker
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: AWSClientSettings) -> "AWSClientRegistry":
+        """Factory method to create registry from settings"""
+        session = boto3.session.Session(
+            aws_access_key_id=settings.AWS_ACCESS_KEY,
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            region_name=settings.AWS_REGION,
+        )
+        config = Config(
+            max_pool_connections=settings.AWS_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.AWS_CONNECT_TIMEOUT,
+            read_timeout=settings.AWS_READ_TIMEOUT,
+            retries={"mode": settings.AWS_RETRY_MODE, "total_max_attempts": settings.AWS_MAX_ATTEMPTS},
+        )
+        executors = {
+            COGNITO_IDP: UpstreamExecutor(COGNITO_IDP, settings.COGNITO_MAX_CONCURRENCY, settings.COGNITO_MAX_QUEUE),
+            REKOGNITION: UpstreamExecutor(
+                REKOGNITION, settings.REKOGNITION_MAX_CONCURRENCY, settings.REKOGNITION_MAX_QUEUE
+            ),
+            S3: UpstreamExecutor(S3, settings.S3_MAX_CONCURRENCY, settings.S3_MAX_QUEUE),
+        }
+        http = None
+        if settings.AWS_TRANSPORT == "native":
+            http = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=settings.AWS_MAX_POOL_CONNECTIONS),
+                timeout=httpx.Timeout(settings.AWS_READ_TIMEOUT, connect=settings.AWS_CONNECT_TIMEOUT),
+            )
+        rate_limits = {
+            service_name: TokenBucket(service_name, rate)
+            for service_name, rate in (
+                (COGNITO_IDP, settings.COGNITO_RATE_LIMIT),
+                (REKOGNITION, settings.REKOGNITION_RATE_LIMIT),
+                (S3, settings.S3_RATE_LIMIT),
+            )
+            if rate is not None
+        }
+        if settings.REKOGNITION_ADAPTIVE_RATE_LIMIT:
+            max_rate = settings.REKOGNITION_RATE_MAX
+            if settings.REKOGNITION_RATE_LIMIT is not None:
+                max_rate = min(max_rate, settings.REKOGNITION_RATE_LIMIT)
+            rate_limits[REKOGNITION] = AdaptiveTokenBucket(
+                REKOGNITION,
+                settings.REKOGNITION_RATE_INITIAL,
+                min_rate=min(settings.REKOGNITION_RATE_MIN, max_rate),
+                max_rate=max_rate,
+                increase=settings.REKOGNITION_RATE_INCREASE,
+                decrease=settings.REKOGNITION_RATE_DECREASE,
+            )
+        breakers = {}
+        if settings.CIRCUIT_BREAKER_ENABLED:
+            breakers = {
+                service_name: CircuitBreaker(
+                    service_name,
+                    is_failure=is_upstream_failure,
+                    window=settings.CIRCUIT_BREAKER_WINDOW,
+                    min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+                    failure_rate=settings.CIRCUIT_BREAKER_FAILURE_RATE,
+                    slow_call_rate=settings.CIRCUIT_BREAKER_SLOW_CALL_RATE,
+                    slow_call_duration=settings.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+                    open_duration=settings.CIRCUIT_BREAKER_OPEN_DURATION,
+                    half_open_calls=settings.CIRCUIT_BREAKER_HALF_OPEN_CALLS,
+                )
+                for service_name in SERVICES
+            }
+        routers = {}
+        if settings.AWS_FAILOVER_REGIONS:
+            routers = {
+                service_name: RegionRouter(
+                    service_name,
+                    settings.AWS_REGION,
+                    settings.AWS_FAILOVER_REGIONS,
+                    window=settings.AWS_REGION_WINDOW,
+                    failure_rate=settings.AWS_REGION_FAILURE_RATE,
+                    switch_margin=settings.AWS_REGION_SWITCH_MARGIN,
+                    explore_rate=settings.AWS_REGION_EXPLORE_RATE,
+                )
+                for service_name in REGIONAL_READ_OPERATIONS
+            }
+        return cls(
+            session,
+            config,
+            executors,
+            http,
+            rate_limits,
+            throttle_max_attempts=settings.REKOGNITION_THROTTLE_MAX_ATTEMPTS,
+            throttle_budget=settings.REKOGNITION_THROTTLE_BUDGET,
+            breakers=breakers,
+            routers=routers,
+            replica_buckets=settings.AWS_S3_REPLICA_BUCKETS,
+            endpoints=settings.AWS_REGIONAL_ENDPOINTS,
+        )
+
+    def _is_adaptive(self, service_name: str) -> bool:
+        return isinstance(self._rate_limits.get(service_name), AdaptiveTokenBucket)
+
+    def _client_config(self, service_name: str) -> Config:
+        if not self._is_adaptive(service_name):
+            return self._config
+        # A single attempt, throttles and network errors are retried by AdaptiveClient
+        return self._config.merge(Config(retries={**self._config.retries, "total_max_attempts": 1}))
+
+    def client(self, service_name: str, region: str | None = None) -> BaseClient:
+        """Return the shared client for a service, in its home region unless `region` is given"""
+        client = self._clients.get((service_name, region))
+        if client is not None:
+            return client
+
+        # boto3 sessions are not thread-safe while creating clients
+        with self._lock:
+            if (service_name, region) not in self._clients:
+                options = {}
+                if region is not None:
+                    options["region_name"] = region
+                endpoint_url = self._endpoints.get(region or self._session.region_name)
+                if endpoint_url is not None:
+                    options["endpoint_url"] = endpoint_url
+                self._clients[service_name, region] = self._session.client(
+                    service_name, config=self._client_config(service_name), **options
+                )
+            return self._clients[service_name, region]
+
+    def async_client(self, service_name: str, region: str | None = None) -> AsyncClient:
+        """Return the shared async client for a service, routed over regions when it has a router"""
+        client = self._async_clients.get((service_name, region))
+        if client is None:
+            router = self._routers.get(service_name)
+            if region is None and router is not None:
+                client = RegionalClient(
+                    router,
+                    {
+                        router.home: self._build_async_client(service_name, None),
+                        **{region: self.async_client(service_name, region) for region in router.regions[1:]},
+                    },
+                    REGIONAL_READ_OPERATIONS[service_name],
+                    localize=replica_buckets(router.home, self._replica_buckets),
+                )
+            else:
+                client = self._build_async_client(service_name, region)
+            self._async_clients[service_name, region] = client
+        return client
+
+    def _build_async_client(self, service_name: str, region: str | None) -> AsyncClient:
+        if region is None:
+            bucket = self._rate_limits.get(service_name)
+            breaker = self._breakers.get(service_name)
+        else:
+            bucket = self._regional_rate_limits.get((service_name, region))
+            breaker = self._regional_breakers.get((service_name, region))
+
+        client = OffloadedClient(self.client(service_name, region), self._executors[service_name])
+        if self._http is not None:
+            client = AsyncAWSClient(
+                self.client(service_name, region),
+                credentials=self._session.get_credentials(),
+                http=self._http,
+                fallback=client,
+                max_attempts=self._client_config(service_name).retries["total_max_attempts"],
+            )
+        if isinstance(bucket, AdaptiveTokenBucket):
+            client = AdaptiveClient(
+                client, bucket, max_attempts=self._throttle_max_attempts, budget=self._throttle_budget
+            )
+        elif bucket is not None:
+            client = RateLimitedClient(client, bucket)
+        if breaker is not None:
+            client = CircuitBreakerClient(client, breaker)
+        return client
+
+    @property
+    def cognito_idp(self) -> AsyncClient:
+        return self.async_client(COGNITO_IDP)
+
+    @property
+    def rekognition(self) -> AsyncClient:
+        return self.async_client(REKOGNITION)
+
+    @property
+    def s3(self) -> AsyncClient:
+        return self.async_client(S3)
+
+    def warm_up(self) -> None:
+        """Build every client up front so the first requests don't pay for it"""
+        for service_name in SERVICES:
+            self.client(service_name)
+            if service_name in self._routers:
+                for region in self._routers[service_name].regions[1:]:
+                    self.client(service_name, region)
+
+    def stats(self) -> dict[str, Any]:
+        stats = {service_name: executor.stats() for service_name, executor in self._executors.items()}
+        for service_name, bucket in self._rate_limits.items():
+            stats.setdefault(service_name, {})["rate_limit"] = bucket.stats()
+        for service_name, breaker in self._breakers.items():
+            stats.setdefault(service_name, {})["circuit_breaker"] = breaker.stats()
+        for service_name, router in self._routers.items():
+            service_stats = stats.setdefault(service_name, {})
+            service_stats["routing"] = router.stats()
+            for region in router.regions[1:]:
+                regional = service_stats.setdefault("regions", {}).setdefault(region, {})
+                if (service_name, region) in self._regional_rate_limits:
+                    regional["rate_limit"] = self._regional_rate_limits[service_name, region].stats()
+                if (service_name, region) in self._regional_breakers:
+                    regional["circuit_breaker"] = self._regional_breakers[service_name, region].stats()
+        return stats
+
+    def close(self) -> None:
+        """Stop the executors and close the connection pools of every client built so far"""
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown()
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+            self._async_clients.clear()
+
+    async def aclose(self) -> None:
+        """Close the native transport's connection pool, then everything else"""
+        if self._http is not None:
+            await self._http.aclose()
+        self.close()
+
+
+def get_aws_client_registry(request: Request) -> AWSClientRegistry:
+    return request.app.state.aws_clients
+
+
+AWSClientRegistryDependency = Annotated[AWSClientRegistry, Depends(get_aws_client_registry)]
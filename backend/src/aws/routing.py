@@ -0,0 +1,217 @@
+import random
+import time
+from collections import deque
+from collections.abc import Callable, Coroutine
+from typing import Any
+
+from botocore.exceptions import ClientError
+
+from aws.offload import is_upstream_failure
+from core.exceptions import DeadlineExceededError, ServiceUnavailableError
+from core.latency import LatencyHistogram
+
+# Operations that only read, and so may be served by any region holding a replica
+REGIONAL_READ_OPERATIONS = {
+    "rekognition": {"compare_faces", "detect_faces"},
+    "s3": {"get_object", "head_object"},
+}
+# Error codes of a replica missing an object, most likely one replication hasn't copied yet
+MISSING_OBJECT_ERROR_CODES = {"InvalidS3ObjectException", "NoSuchKey", "404"}
+
+
+class RegionRouter:
+    """Ranks the regions of an upstream by their recent latency and error rate.
+
+    Outcomes of the last `window` seconds are kept per region. A region whose
+    failure rate reached `failure_rate` over at least `min_calls` calls is
+    unhealthy and only tried after the healthy ones. Healthy regions are
+    ranked by median latency, the home region keeping its place until another
+    one is faster by more than `switch_margin`. Regions with no latency yet
+    rank after those with one, and `explore_rate` of the calls try a random
+    other region first so their figures stay current and a recovered region
+    is noticed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        home: str,
+        regions: list[str],
+        window: float = 60.0,
+        failure_rate: float = 0.2,
+        min_calls: int = 10,
+        switch_margin: float = 0.2,
+        explore_rate: float = 0.02,
+    ):
+        self.name = name
+        self.home = home
+        self.regions = [home, *(region for region in regions if region != home)]
+        self.window = window
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.switch_margin = switch_margin
+        self.explore_rate = explore_rate
+
+        self._latencies = {region: LatencyHistogram(window=window) for region in self.regions}
+        self._outcomes: dict[str, deque[tuple[float, bool]]] = {region: deque() for region in self.regions}
+        self._failovers = 0
+
+    def _failure_rate(self, region: str) -> float:
+        outcomes = self._outcomes[region]
+        cutoff = time.monotonic() - self.window
+        while outcomes and outcomes[0][0] < cutoff:
+            outcomes.popleft()
+        if len(outcomes) < self.min_calls:
+            return 0.0
+        return sum(failed for _, failed in outcomes) / len(outcomes)
+
+    def _score(self, region: str) -> float:
+        latency = self._latencies[region].percentile(50)
+        if latency is None:
+            return 0.0 if region == self.home else float("inf")
+        return latency if region == self.home else latency * (1 + self.switch_margin)
+
+    def order(self) -> list[str]:
+        """Regions to try, best first"""
+        healthy, unhealthy = [], []
+        for region in self.regions:
+            rate = self._failure_rate(region)
+            (healthy if rate < self.failure_rate else unhealthy).append((rate, region))
+
+        ranked = [region for _, region in sorted(healthy, key=lambda entry: self._score(entry[1]))]
+        ranked += [region for _, region in sorted(unhealthy)]
+        if len(ranked) > 1 and random.random() < self.explore_rate:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def failed_over(self) -> None:
+        self._failovers += 1
+
+    def record(self, region: str, latency: float, failed: bool) -> None:
+        self._outcomes[region].append((time.monotonic(), failed))
+        if not failed:
+            self._latencies[region].record(latency)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "order": self.order(),
+            "failovers": self._failovers,
+            "regions": {
+                region: {
+                    "failure_rate": self._failure_rate(region),
+                    "latency_p50": self._latencies[region].percentile(50),
+                    "latency_p99": self._latencies[region].percentile(99),
+                }
+                for region in self.regions
+            },
+        }
+
+
+class RegionalClient:
+    """Async client wrapper spreading read operations over regional clients.
+
+    Operations in `read_operations` go to the region `router` ranks best and
+    fail over to the next one when a region errors out, is shed or has its
+    circuit open. Parameters are passed through `localize` first, which points
+    them at the region's replica of the data, or returns None when the region
+    has none and must be skipped. A replica missing the object is not at
+    fault, replication can lag behind a recent write, so the home region is
+    tried next. Everything else goes to the home region, as does every call of
+    a service that isn't routed.
+    """
+
+    def __init__(
+        self,
+        router: RegionRouter,
+        clients: dict[str, Any],
+        read_operations: set[str],
+        localize: Callable[[str, dict], dict | None] = lambda region, params: params,
+    ):
+        self._router = router
+        self._clients = clients
+        self._read_operations = read_operations
+        self._localize = localize
+
+    @property
+    def _home(self) -> Any:
+        return self._clients[self._router.home]
+
+    @property
+    def exceptions(self):
+        return self._home.exceptions
+
+    @property
+    def meta(self):
+        return self._home.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        if name not in self._read_operations:
+            return getattr(self._home, name)
+
+        async def call(**params: Any) -> Any:
+            error: Exception | None = None
+            regions = deque(self._router.order())
+            while regions:
+                region = regions.popleft()
+                regional_params = self._localize(region, params)
+                if regional_params is None:
+                    continue
+                if error is not None:
+                    self._router.failed_over()
+
+                started = time.monotonic()
+                try:
+                    response = await getattr(self._clients[region], name)(**regional_params)
+                except DeadlineExceededError:
+                    raise
+                except Exception as e:
+                    if region != self._router.home and _is_missing_object(e):
+                        self._router.record(region, time.monotonic() - started, False)
+                        if self._router.home in regions:
+                            regions.remove(self._router.home)
+                            regions.appendleft(self._router.home)
+                        error = error or e
+                        continue
+                    if not (isinstance(e, ServiceUnavailableError) or is_upstream_failure(e)):
+                        # The region answered, the request itself is wrong
+                        self._router.record(region, time.monotonic() - started, False)
+                        raise
+                    self._router.record(region, time.monotonic() - started, True)
+                    error = error or e
+                else:
+                    self._router.record(region, time.monotonic() - started, False)
+                    return response
+            raise error
+
+        return call
+
+
+def replica_buckets(home: str, buckets: dict[str, str]) -> Callable[[str, dict], dict | None]:
+    """`localize` pointing S3 parameters at each region's replica bucket in `buckets`.
+
+    Parameters naming no bucket are fine everywhere. Ones that do can only go
+    to the home region or a region with a replica.
+    """
+
+    def localize(region: str, params: dict) -> dict | None:
+        if region == home:
+            return params
+        if region not in buckets:
+            return None if _names_bucket(params) else params
+        return _with_bucket(params, buckets[region])
+
+    return localize
+
+
+def _is_missing_object(e: Exception) -> bool:
+    return isinstance(e, ClientError) and e.response.get("Error", {}).get("Code") in MISSING_OBJECT_ERROR_CODES
+
+
+def _names_bucket(value: Any) -> bool:
+    return isinstance(value, dict) and any(key == "Bucket" or _names_bucket(item) for key, item in value.items())
+
+
+def _with_bucket(value: Any, bucket: str) -> Any:
+    if not isinstance(value, dict):
+        return value
+    return {key: bucket if key == "Bucket" else _with_bucket(item, bucket) for key, item in value.items()}
@@ -0,0 +1,168 @@
+import asyncio
+import random
+from collections.abc import Callable, Coroutine
+from typing import Any, BinaryIO
+from urllib.parse import urlsplit
+
+import httpx
+from botocore.auth import S3SigV4Auth, SigV4Auth
+from botocore.awsrequest import create_request_object, prepare_request_dict
+from botocore.client import BaseClient
+from botocore.credentials import Credentials
+from botocore.exceptions import HTTPClientError
+from botocore.model import OperationModel
+from botocore.parsers import create_parser
+from botocore.serialize import create_serializer
+
+from aws.offload import THROTTLING_ERROR_CODES, TRANSIENT_ERROR_CODES, OffloadedClient
+from core import deadline
+
+NATIVE_OPERATIONS = {
+    "cognito-idp": {
+        "initiate_auth",
+        "admin_initiate_auth",
+        "respond_to_auth_challenge",
+        "get_user",
+        "sign_up",
+        "confirm_sign_up",
+    },
+    "rekognition": {"compare_faces", "detect_faces", "search_faces_by_image"},
+    "s3": {"put_object", "delete_object"},
+}
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRYABLE_ERROR_CODES = THROTTLING_ERROR_CODES | TRANSIENT_ERROR_CODES
+
+
+class AsyncAWSClient:
+    """Async-native client for the AWS operations on the request hot path.
+
+    Requests are serialized, signed (SigV4) and parsed with botocore's own
+    machinery, but sent over a shared httpx connection pool on the event loop,
+    so an in-flight call costs a socket rather than a thread. Operations outside
+    NATIVE_OPERATIONS fall back to the threaded client, and errors are raised as
+    the same modeled exceptions boto3 would raise. A call is cut short at the
+    request's deadline, and retries that can't start before it aren't made.
+    """
+
+    def __init__(
+        self,
+        client: BaseClient,
+        credentials: Credentials,
+        http: httpx.AsyncClient,
+        fallback: OffloadedClient,
+        max_attempts: int = 3,
+    ):
+        self._client = client
+        self._credentials = credentials
+        self._http = http
+        self._fallback = fallback
+        self._max_attempts = max_attempts
+
+        service_model = client.meta.service_model
+        self._service_name = service_model.service_name
+        self._operations = NATIVE_OPERATIONS.get(self._service_name, set())
+        self._serializer = create_serializer(service_model.protocol, include_validation=True)
+        self._parser = create_parser(service_model.protocol)
+
+    @property
+    def exceptions(self):
+        return self._client.exceptions
+
+    @property
+    def meta(self):
+        return self._client.meta
+
+    def __getattr__(self, name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+        if name not in self._operations:
+            return getattr(self._fallback, name)
+
+        async def call(**params: Any) -> dict:
+            return await self._call(name, params)
+
+        return call
+
+    async def upload_fileobj(self, fileobj: BinaryIO, bucket: str, key: str) -> None:
+        """Single-request upload, face images are far below the multipart limits"""
+        if self._service_name != "s3":
+            raise AttributeError("upload_fileobj")
+        await self._call("put_object", {"Bucket": bucket, "Key": key, "Body": fileobj.read()})
+
+    async def _call(self, method_name: str, params: dict) -> dict:
+        service_model = self._client.meta.service_model
+        operation_model = service_model.operation_model(self._client.meta.method_to_api_mapping[method_name])
+
+        async with deadline.bounded():
+            for attempt in range(1, self._max_attempts + 1):
+                delay = random.random() * min(2**attempt * 0.05, 2.0)
+                try:
+                    status_code, parsed = await self._send(operation_model, params)
+                except httpx.TransportError as e:
+                    if attempt == self._max_attempts or not deadline.allows(delay):
+                        raise HTTPClientError(error=e) from e
+                else:
+                    if status_code < 300:
+                        return parsed
+                    if (
+                        attempt == self._max_attempts
+                        or not self._is_retryable(status_code, parsed)
+                        or not deadline.allows(delay)
+                    ):
+                        error_code = parsed.get("Error", {}).get("Code")
+                        raise self._client.exceptions.from_code(error_code)(parsed, operation_model.name)
+
+                await asyncio.sleep(delay)
+
+    async def _send(self, operation_model: OperationModel, params: dict) -> tuple[int, dict]:
+        request_dict = self._serializer.serialize_to_request(params, operation_model)
+        endpoint_url = self._endpoint_url(request_dict, params)
+        prepare_request_dict(request_dict, endpoint_url=endpoint_url, user_agent="face-link")
+        request = create_request_object(request_dict)
+
+        if not self._is_unsigned(operation_model):
+            self._signer().add_auth(request)
+
+        prepared = request.prepare()
+        response = await self._http.request(
+            prepared.method,
+            prepared.url,
+            headers=dict(prepared.headers.items()),
+            content=prepared.body,
+        )
+        response_dict = {
+            "status_code": response.status_code,
+            "headers": response.headers,
+            "body": response.content,
+        }
+        return response.status_code, self._parser.parse(response_dict, operation_model.output_shape)
+
+    def _endpoint_url(self, request_dict: dict, params: dict) -> str:
+        endpoint_url = self._client.meta.endpoint_url
+        bucket = params.get("Bucket")
+        if self._service_name != "s3" or not bucket or "." in bucket:
+            return endpoint_url
+
+        # Use virtual-hosted addressing on AWS, keep path-style for custom endpoints
+        parts = urlsplit(endpoint_url)
+        if not parts.netloc.endswith("amazonaws.com"):
+            return endpoint_url
+        request_dict["url_path"] = request_dict["url_path"].removeprefix(f"/{bucket}") or "/"
+        return f"{parts.scheme}://{bucket}.{parts.netloc}"
+
+    def _signer(self) -> SigV4Auth:
+        credentials = self._credentials.get_frozen_credentials()
+        signer_cls = S3SigV4Auth if self._service_name == "s3" else SigV4Auth
+        return signer_cls(
+            credentials,
+            self._client.meta.service_model.signing_name,
+            self._client.meta.region_name,
+        )
+
+    @staticmethod
+    def _is_unsigned(operation_model: OperationModel) -> bool:
+        auth = getattr(operation_model, "auth", None) or []
+        return operation_model.auth_type == "none" or auth == ["smithy.api#noAuth"]
+
+    @staticmethod
+    def _is_retryable(status_code: int, parsed: dict) -> bool:
+        return status_code in RETRYABLE_STATUS_CODES or parsed.get("Error", {}).get("Code") in RETRYABLE_ERROR_CODES
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from typing import Any
+
+import jwt
+
+from core.config import get_settings
+
+
+def token_key(access_token: str) -> str:
+    """Cache key of a token, so tokens themselves are never held by the cache"""
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+
+def token_claims(access_token: str) -> dict:
+    """The token's claims, empty when it can't be read.
+
+    The signature is not checked, the claims only bound how long a profile
+    Cognito returned for the token is reused and which profiles a sign out
+    drops.
+    """
+    try:
+        return jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return {}
+
+
+def token_expiry(access_token: str) -> float | None:
+    """The token's `exp` as a Unix time, None when it can't be read"""
+    exp = token_claims(access_token).get("exp")
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+class ProfileCache:
+    """In-process LRU cache of Cognito `get_user` profiles per access token.
+
+    A profile is reused for `ttl` seconds, never past its token's expiry, and
+    the least recently used ones are evicted past `max_size`. Concurrent
+    misses for one token share a single lookup. Failed lookups aren't cached.
+    Invalidating a token drops every cached profile of its user, as a global
+    sign out revokes all of the user's tokens.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # key -> (expires_at on the monotonic clock, username, profile)
+        self._entries: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    async def get(self, access_token: str, load: Callable[[], Awaitable[dict]]) -> dict:
+        key = token_key(access_token)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[2]
+            del self._entries[key]
+
+        self._misses += 1
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, access_token, load))
+            self._loading[key] = task
+        else:
+            self._coalesced += 1
+        # A caller giving up doesn't cancel the lookup the others wait on
+        return await asyncio.shield(task)
+
+    async def _load(self, key: str, access_token: str, load: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            profile = await load()
+        finally:
+            # Unless the token was invalidated while loading
+            current = self._loading.get(key) is asyncio.current_task()
+            if current:
+                del self._loading[key]
+        if current:
+            self._store(key, access_token, profile)
+        return profile
+
+    def _store(self, key: str, access_token: str, profile: dict) -> None:
+        ttl = self.ttl
+        expiry = token_expiry(access_token)
+        if expiry is not None:
+            ttl = min(ttl, expiry - time.time())
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (time.monotonic() + ttl, profile["username"], profile)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, access_token: str) -> None:
+        """Forget every cached profile of the token's user, cached for this token or not.
+
+        The user is read from the token's `username` and `sub` claims. A forged
+        token can at worst make some profiles be looked up again.
+        """
+        key = token_key(access_token)
+        self._loading.pop(key, None)
+        entry = self._entries.pop(key, None)
+        self._invalidations += 1
+
+        claims = token_claims(access_token)
+        usernames = {claims.get("username"), claims.get("sub")} - {None}
+        if entry is not None:
+            usernames.add(entry[1])
+        for other in [other for other, (_, name, _) in self._entries.items() if name in usernames]:
+            del self._entries[other]
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "coalesced": self._coalesced,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+
+@lru_cache
+def get_profile_cache() -> ProfileCache:
+    settings = get_settings()
+    return ProfileCache(ttl=settings.PROFILE_CACHE_TTL, max_size=settings.PROFILE_CACHE_SIZE)
@@ -1,8 +1,8 @@
-from typing import Annotated, Optional
-import boto3
+from typing import Annotated
 from fastapi import Depends
 from botocore.exceptions import ClientError
 
+from aws.registry import AsyncClient, AWSClientRegistryDependency
 from cognito.utils import calculate_secret_hash
 from core.config import SettingsDependency
 from cognito.exceptions import PasswordValidationError
@@ -16,28 +16,21 @@ class CognitoRepo:
         user_pool_id: str,
         client_id: str,
         client_secret: str,
-        aws_region: str,
-        aws_access_key_id: Optional[str] = None,
-        aws_secret_access_key: Optional[str] = None,
+        cognito_idp: AsyncClient,
     ):
         self.user_pool_id = user_pool_id
         self.client_id = client_id
         self.client_secret = client_secret
 
-        self._cognito_idp = boto3.client(
-            "cognito-idp",
-            region_name=aws_region,
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-        )
+        self._cognito_idp = cognito_idp
 
     def _secret_hash(self, email: str) -> str:
         return calculate_secret_hash(email, self.client_id, self.client_secret)
 
-    def signup(self, email: str, pwd: str) -> dict:
+    async def signup(self, email: str, pwd: str) -> dict:
         """Register a new user in Cognito"""
         try:
-            response = self._cognito_idp.sign_up(
+            response = await self._cognito_idp.sign_up(
                 ClientId=self.client_id,
                 Username=email,
                 Password=pwd,
@@ -51,10 +44,10 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def confirm_signup(self, email: str, code: str) -> dict:
+    async def confirm_signup(self, email: str, code: str) -> dict:
         """Confirm user registration with verification code"""
         try:
-            response = self._cognito_idp.confirm_sign_up(
+            response = await self._cognito_idp.confirm_sign_up(
                 ClientId=self.client_id,
                 Username=email,
                 ConfirmationCode=code,
@@ -64,10 +57,10 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def signin(self, email: str, pwd: str) -> dict:
+    async def signin(self, email: str, pwd: str) -> dict:
         """Authenticate user and return tokens"""
         try:
-            response = self._cognito_idp.initiate_auth(
+            response = await self._cognito_idp.initiate_auth(
                 ClientId=self.client_id,
                 AuthFlow="USER_PASSWORD_AUTH",
                 AuthParameters={
@@ -80,10 +73,10 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def initiate_face_auth(self, email: str) -> dict:
+    async def initiate_face_auth(self, email: str) -> dict:
         """Authenticate user and return tokens"""
         try:
-            response = self._cognito_idp.admin_initiate_auth(
+            response = await self._cognito_idp.admin_initiate_auth(
                 UserPoolId=self.user_pool_id,
                 ClientId=self.client_id,
                 AuthFlow="CUSTOM_AUTH",
@@ -96,10 +89,10 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def respond_to_face_auth(self, email: str, challenge_name: str, session: str, answer: str) -> dict:
+    async def respond_to_face_auth(self, email: str, challenge_name: str, session: str, answer: str) -> dict:
         """Respond to face authentication challenge"""
         try:
-            response = self._cognito_idp.respond_to_auth_challenge(
+            response = await self._cognito_idp.respond_to_auth_challenge(
                 ClientId=self.client_id,
                 ChallengeName=challenge_name,
                 Session=session,
@@ -113,27 +106,27 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def logout(self, access_token: str) -> dict:
+    async def logout(self, access_token: str) -> dict:
         """Global sign out user"""
         try:
-            response = self._cognito_idp.global_sign_out(AccessToken=access_token)
+            response = await self._cognito_idp.global_sign_out(AccessToken=access_token)
             return response
         except ClientError as e:
             raise e
 
-    def get_user_profile(self, access_token: str) -> dict:
+    async def get_user_profile(self, access_token: str) -> dict:
         """Get user profile information"""
         try:
-            response = self._cognito_idp.get_user(AccessToken=access_token)
+            response = await self._cognito_idp.get_user(AccessToken=access_token)
             user_attrs = {attr["Name"]: attr["Value"] for attr in response["UserAttributes"]}
             return {"username": response["Username"], "attributes": user_attrs}
         except ClientError as e:
             raise e
 
-    def change_password(self, access_token: str, old_password: str, new_password: str) -> dict:
+    async def change_password(self, access_token: str, old_password: str, new_password: str) -> dict:
         """Change user password"""
         try:
-            response = self._cognito_idp.change_password(
+            response = await self._cognito_idp.change_password(
                 AccessToken=access_token,
                 PreviousPassword=old_password,
                 ProposedPassword=new_password,
@@ -142,18 +135,18 @@ class CognitoRepo:
         except ClientError as e:
             raise e
 
-    def forgot_password(self, email: str) -> dict:
+    async def forgot_password(self, email: str) -> dict:
         """Initiate forgot password flow"""
         try:
-            response = self._cognito_idp.forgot_password(ClientId=self.client_id, Username=email)
+            response = await self._cognito_idp.forgot_password(ClientId=self.client_id, Username=email)
             return response
         except ClientError as e:
             raise e
 
-    def confirm_forgot_password(self, email: str, code: str, new_password: str) -> dict:
+    async def confirm_forgot_password(self, email: str, code: str, new_password: str) -> dict:
         """Complete forgot password flow"""
         try:
-            response = self._cognito_idp.confirm_forgot_password(
+            response = await self._cognito_idp.confirm_forgot_password(
                 ClientId=self.client_id,
                 Username=email,
                 ConfirmationCode=code,
@@ -164,15 +157,13 @@ class CognitoRepo:
             raise e
 
 
-def get_cognito_repo(settings: SettingsDependency) -> CognitoRepo:
+def get_cognito_repo(settings: SettingsDependency, aws_clients: AWSClientRegistryDependency) -> CognitoRepo:
     """Dependency injection for CognitoRepo"""
     return CognitoRepo(
         user_pool_id=settings.AWS_COGNITO_USER_POOL_ID,
         client_id=settings.AWS_COGNITO_CLIENT_ID,
         client_secret=settings.AWS_COGNITO_CLIENT_SECRET,
-        aws_region=settings.AWS_REGION,
-        aws_access_key_id=settings.AWS_ACCESS_KEY,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        cognito_idp=aws_clients.cognito_idp,
     )
 
 
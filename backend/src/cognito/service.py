@@ -2,6 +2,7 @@ from typing import Annotated
 from fastapi import Depends
 from botocore.exceptions import ClientError
 
+from cognito.cache import ProfileCache, get_profile_cache
 from cognito.exceptions import (
     ConfirmSignupError,
     ExpiredCodeError,
@@ -15,13 +16,14 @@ from cognito.repository import CognitoRepoDependency
 class CognitoTokenService:
     """Service layer for Cognito operations"""
 
-    def __init__(self, repo: CognitoRepoDependency):
+    def __init__(self, repo: CognitoRepoDependency, profiles: ProfileCache | None = None):
         self.repo = repo
+        self.profiles = profiles
 
-    def signup(self, email: str, pwd: str) -> dict:
+    async def signup(self, email: str, pwd: str) -> dict:
         """Register a new user"""
         try:
-            return self.repo.signup(email, pwd)
+            return await self.repo.signup(email, pwd)
         except ClientError as e:
             if e.response["Error"]["Code"] == "InvalidPasswordException":
                 raise InvalidPasswordError(e.response["Error"]["Message"])
@@ -29,10 +31,10 @@ class CognitoTokenService:
                 raise SignUpError("User already exists")
             raise SignUpError(f"Failed to sign up: {str(e)}")
 
-    def confirm_signup(self, user: str, code: str) -> dict:
+    async def confirm_signup(self, user: str, code: str) -> dict:
         """Confirm user registration"""
         try:
-            return self.repo.confirm_signup(user, code)
+            return await self.repo.confirm_signup(user, code)
         except ClientError as e:
             if e.response["Error"]["Code"] == "ExpiredCodeException":
                 raise ExpiredCodeError("Verification code has expired")
@@ -40,10 +42,10 @@ class CognitoTokenService:
                 raise ConfirmSignupError("Invalid verification code")
             raise ConfirmSignupError(f"Failed to confirm signup: {str(e)}")
 
-    def signin(self, email: str, pwd: str) -> dict:
+    async def signin(self, email: str, pwd: str) -> dict:
         """Authenticate user and return tokens"""
         try:
-            return self.repo.signin(email, pwd)
+            return await self.repo.signin(email, pwd)
         except ClientError as e:
             if e.response["Error"]["Code"] == "NotAuthorizedException":
                 raise NotAuthorizedError("Invalid credentials")
@@ -51,28 +53,35 @@ class CognitoTokenService:
                 raise NotAuthorizedError("User is not confirmed")
             raise NotAuthorizedError(f"Authentication failed: {str(e)}")
 
-    def logout(self, access_token: str) -> dict:
+    async def logout(self, access_token: str) -> dict:
         """Sign out user globally"""
         try:
-            return self.repo.logout(access_token)
+            return await self.repo.logout(access_token)
         except ClientError as e:
             if e.response["Error"]["Code"] == "NotAuthorizedException":
                 raise NotAuthorizedError("Invalid or expired token")
             raise NotAuthorizedError(f"Logout failed: {str(e)}")
-
-    def get_user_profile(self, access_token: str) -> dict:
-        """Get current user profile"""
+        finally:
+            # Once signed out the user's tokens stop working in Cognito, stop accepting them here too.
+            # Lookups still in flight are dropped, later ones fail in Cognito.
+            if self.profiles is not None:
+                self.profiles.invalidate(access_token)
+
+    async def get_user_profile(self, access_token: str) -> dict:
+        """Get current user profile, from the profile cache when there is one"""
         try:
-            return self.repo.get_user_profile(access_token)
+            if self.profiles is not None:
+                return await self.profiles.get(access_token, lambda: self.repo.get_user_profile(access_token))
+            return await self.repo.get_user_profile(access_token)
         except ClientError as e:
             if e.response["Error"]["Code"] == "NotAuthorizedException":
                 raise NotAuthorizedError("Token is invalid or expired")
             raise NotAuthorizedError(f"Failed to get user profile: {str(e)}")
 
-    def change_password(self, access_token: str, old_password: str, new_password: str) -> dict:
+    async def change_password(self, access_token: str, old_password: str, new_password: str) -> dict:
         """Change user password"""
         try:
-            return self.repo.change_password(access_token, old_password, new_password)
+            return await self.repo.change_password(access_token, old_password, new_password)
         except ClientError as e:
             if e.response["Error"]["Code"] == "NotAuthorizedException":
                 raise NotAuthorizedError("Invalid credentials or token")
@@ -80,19 +89,19 @@ class CognitoTokenService:
                 raise InvalidPasswordError(e.response["Error"]["Message"])
             raise NotAuthorizedError(f"Failed to change password: {str(e)}")
 
-    def forgot_password(self, email: str) -> dict:
+    async def forgot_password(self, email: str) -> dict:
         """Initiate forgot password process"""
         try:
-            return self.repo.forgot_password(email)
+            return await self.repo.forgot_password(email)
         except ClientError as e:
             if e.response["Error"]["Code"] == "UserNotFoundException":
                 raise NotAuthorizedError("User not found")
             raise NotAuthorizedError(f"Failed to initiate password reset: {str(e)}")
 
-    def confirm_forgot_password(self, email: str, code: str, new_password: str) -> dict:
+    async def confirm_forgot_password(self, email: str, code: str, new_password: str) -> dict:
         """Complete forgot password process"""
         try:
-            return self.repo.confirm_forgot_password(email, code, new_password)
+            return await self.repo.confirm_forgot_password(email, code, new_password)
         except ClientError as e:
             if e.response["Error"]["Code"] == "ExpiredCodeException":
                 raise ExpiredCodeError("Reset code has expired")
@@ -102,23 +111,38 @@ class CognitoTokenService:
                 raise InvalidPasswordError(e.response["Error"]["Message"])
             raise NotAuthorizedError(f"Failed to reset password: {str(e)}")
 
-    def signin_via_face(self, email: str, image_bytes: bytes, answer: str) -> dict:
+    async def signin_via_face(self, email: str, image_bytes: bytes, answer: str) -> dict:
         """Authenticate user and return tokens"""
+        challenge = await self.initiate_face_auth(email)
+        return await self.respond_to_face_auth(email, challenge, answer)
+
+    async def initiate_face_auth(self, email: str) -> dict:
+        """Start a CUSTOM_AUTH session and return its challenge"""
+        try:
+            return await self.repo.initiate_face_auth(email)
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "UserNotFoundException":
+                raise NotAuthorizedError("User not found")
+            raise NotAuthorizedError(f"Failed to start face authentication: {e}")
+
+    async def respond_to_face_auth(self, email: str, challenge: dict, answer: str) -> dict:
+        """Answer the challenge of a CUSTOM_AUTH session and return tokens"""
         try:
-            response = self.repo.initiate_face_auth(email)
-            return self.repo.respond_to_face_auth(
+            return await self.repo.respond_to_face_auth(
                 email=email,
-                challenge_name=response["ChallengeName"],
-                session=response["Session"],
+                challenge_name=challenge["ChallengeName"],
+                session=challenge["Session"],
                 answer=answer,
             )
         except ClientError as e:
-            raise e
+            if e.response["Error"]["Code"] == "NotAuthorizedException":
+                raise NotAuthorizedError("Face authentication was not accepted")
+            raise NotAuthorizedError(f"Face authentication failed: {e}")
 
 
 def get_cognito_token_service(repo: CognitoRepoDependency) -> CognitoTokenService:
     """Dependency injection for CognitoTokenService"""
-    return CognitoTokenService(repo)
+    return CognitoTokenService(repo, get_profile_cache())
 
 
 CognitoTokenServiceDependency = Annotated[CognitoTokenService, Depends(get_cognito_token_service)]
@@ -6,27 +6,37 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from cognito.exceptions import NotAuthorizedError
 from cognito.schemas import Profile
 from cognito.service import CognitoTokenService, CognitoTokenServiceDependency
+from cognito.verifier import CognitoTokenVerifierDependency
+from core.config import SettingsDependency
 
 BearerTokenDependency = Annotated[HTTPAuthorizationCredentials, Depends(HTTPBearer())]
 
 
-def validate_jwt_token(
+async def validate_jwt_token(
     token: str,
     cognito: CognitoTokenService,
 ) -> dict:
     """Validate JWT token using Cognito service."""
     try:
-        return cognito.get_user_profile(token)
+        return await cognito.get_user_profile(token)
     except NotAuthorizedError as e:
         raise HTTPException(status_code=401, detail=str(e))
 
 
-def get_current_user(
+async def get_current_user(
+    settings: SettingsDependency,
     cognito: CognitoTokenServiceDependency,
+    verifier: CognitoTokenVerifierDependency,
     token: BearerTokenDependency,
 ) -> Profile:
     """Get current user from JWT token."""
-    user_data = validate_jwt_token(token=token.credentials, cognito=cognito)
+    if settings.AWS_COGNITO_TOKEN_VERIFICATION == "local":
+        try:
+            return await verifier.get_profile(token.credentials, cognito.get_user_profile)
+        except NotAuthorizedError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+
+    user_data = await validate_jwt_token(token=token.credentials, cognito=cognito)
     return Profile(
         username=user_data["username"],
         sub=user_data["attributes"]["sub"],
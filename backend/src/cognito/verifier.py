@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
+from pathlib import Path
+from typing import Annotated
+
+import httpx
+import jwt
+from fastapi import Depends
+
+from cognito.exceptions import NotAuthorizedError
+from cognito.schemas import Profile
+from core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Cognito `get_user` for an access token, as CognitoTokenService.get_user_profile returns it
+ProfileLookup = Callable[[str], Awaitable[dict]]
+
+
+class JWKSSource(ABC):
+    @abstractmethod
+    async def fetch(self) -> dict:
+        """Return the key set as a JWKS document"""
+
+
+class RemoteJWKSSource(JWKSSource):
+    """Reads `jwks_uri` from the user pool's OpenID metadata and downloads the key set"""
+
+    def __init__(self, metadata_url: str, timeout: float = 5.0):
+        self.metadata_url = metadata_url
+        self.timeout = timeout
+
+    async def fetch(self) -> dict:
+        async with httpx.AsyncClient(timeout=self.timeout) as http:
+            metadata = await http.get(self.metadata_url)
+            metadata.raise_for_status()
+            jwks = await http.get(metadata.json()["jwks_uri"])
+            jwks.raise_for_status()
+            return jwks.json()
+
+
+class FileJWKSSource(JWKSSource):
+    """Reads the key set from a local file, for offline or air-gapped deployments"""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    async def fetch(self) -> dict:
+        return json.loads(self.path.read_text())
+
+
+class JWKSCache:
+    """In-memory cache of the user pool signing keys.
+
+    Keys are loaded lazily and reloaded only when a token names a `kid` the cache
+    doesn't know (Cognito rotated its keys), at most once per `min_refresh_interval`
+    so tokens with made-up `kid`s can't turn into a request flood.
+    """
+
+    def __init__(self, source: JWKSSource, min_refresh_interval: float = 60.0):
+        self.source = source
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._refreshed_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: str) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is None:
+            await self.refresh()
+            key = self._keys.get(kid)
+        if key is None:
+            raise NotAuthorizedError("Token is signed with an unknown key")
+        return key
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            if self._refreshed_at is not None and time.monotonic() - self._refreshed_at < self.min_refresh_interval:
+                return
+
+            try:
+                jwks = jwt.PyJWKSet.from_dict(await self.source.fetch())
+            except (httpx.HTTPError, OSError, ValueError, KeyError, jwt.PyJWKSetError) as e:
+                # Not counted as a refresh, the next token retries instead of being rejected for a while
+                logger.error(f"Failed to refresh Cognito JWKS: {e}")
+                return
+            self._keys = {key.key_id: key for key in jwks.keys}
+            self._refreshed_at = time.monotonic()
+
+
+class CognitoTokenVerifier:
+    """Verifies Cognito access tokens locally instead of calling `get_user` on every request.
+
+    Access tokens carry no email, so a user's email is looked up with
+    `get_user` once and reused for `email_ttl` seconds, for at most
+    `max_emails` users.
+    """
+
+    def __init__(
+        self,
+        keys: JWKSCache,
+        issuer: str,
+        client_id: str,
+        token_use: str = "access",
+        leeway: float = 0,
+        email_ttl: float = 3600.0,
+        max_emails: int = 10_000,
+    ):
+        self.keys = keys
+        self.issuer = issuer
+        self.client_id = client_id
+        self.token_use = token_use
+        self.leeway = leeway
+        self.email_ttl = email_ttl
+        self.max_emails = max_emails
+        # sub -> (expires_at on the monotonic clock, email, email_verified)
+        self._emails: OrderedDict[str, tuple[float, str, bool]] = OrderedDict()
+
+    async def verify(self, token: str) -> dict:
+        """Check signature, issuer, audience, token use and expiry, and return the claims"""
+        try:
+            header = jwt.get_unverified_header(token)
+            if header.get("alg") != "RS256":
+                raise NotAuthorizedError("Token is not signed with RS256")
+
+            key = await self.keys.get_key(header.get("kid"))
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=["RS256"],
+                issuer=self.issuer,
+                leeway=self.leeway,
+                options={"require": ["exp", "iat", "iss", "sub", "token_use"], "verify_aud": False},
+            )
+        except jwt.PyJWTError as e:
+            raise NotAuthorizedError(f"Token is invalid or expired: {e}") from e
+
+        if claims["token_use"] != self.token_use:
+            raise NotAuthorizedError(f"Expected {self.token_use} token, got {claims['token_use']}")
+
+        # Access tokens carry `client_id`, ID tokens carry `aud`
+        if claims.get("client_id", claims.get("aud")) != self.client_id:
+            raise NotAuthorizedError("Token was issued for another client")
+
+        return claims
+
+    async def get_profile(self, token: str, lookup: ProfileLookup) -> Profile:
+        """Verify the token and build its user's profile, using `lookup` for an email the token lacks"""
+        claims = await self.verify(token)
+        if "email" in claims:
+            # ID tokens
+            email, email_verified = claims["email"], bool(claims.get("email_verified", False))
+        else:
+            email, email_verified = await self._get_email(claims["sub"], token, lookup)
+
+        return Profile(
+            sub=claims["sub"],
+            username=claims.get("cognito:username", claims.get("username")),
+            email=email,
+            email_verified=email_verified,
+        )
+
+    async def _get_email(self, sub: str, token: str, lookup: ProfileLookup) -> tuple[str, bool]:
+        entry = self._emails.get(sub)
+        if entry is not None and entry[0] > time.monotonic():
+            self._emails.move_to_end(sub)
+            return entry[1], entry[2]
+
+        attributes = (await lookup(token))["attributes"]
+        email, email_verified = attributes["email"], attributes.get("email_verified", "false").lower() == "true"
+        self._emails[sub] = (time.monotonic() + self.email_ttl, email, email_verified)
+        self._emails.move_to_end(sub)
+        while len(self._emails) > self.max_emails:
+            self._emails.popitem(last=False)
+        return email, email_verified
+
+
+@lru_cache
+def get_token_verifier() -> CognitoTokenVerifier:
+    settings: Settings = get_settings()
+    if settings.AWS_COGNITO_JWKS_PATH is not None:
+        source = FileJWKSSource(settings.AWS_COGNITO_JWKS_PATH)
+    else:
+        source = RemoteJWKSSource(settings.AWS_COGNITO_SERVER_METADATA_URL)
+
+    return CognitoTokenVerifier(
+        keys=JWKSCache(source),
+        issuer=settings.AWS_COGNITO_ISSUER,
+        client_id=settings.AWS_COGNITO_CLIENT_ID,
+    )
+
+
+CognitoTokenVerifierDependency = Annotated[CognitoTokenVerifier, Depends(get_token_verifier)]
@@ -0,0 +1,97 @@
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from core.exceptions import ServiceUnavailableError
+
+
+class ByteBudget:
+    """Per-process cap on the bytes held by in-flight requests.
+
+    A request reserves its size before buffering anything. When the budget is
+    spent it waits, first come first served, up to `max_wait` seconds for
+    earlier requests to release theirs, and is then shed with
+    ServiceUnavailableError instead of pushing the worker past its memory limit.
+    Reservations larger than the whole budget are clamped to it, so they run
+    alone rather than never.
+    """
+
+    def __init__(self, name: str, capacity: int, max_wait: float, retry_after: int = 1):
+        self.name = name
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+
+        self._waiters: deque[tuple[int, asyncio.Future]] = deque()
+        self._in_use = 0
+        self._high_water = 0
+        self._admitted = 0
+        self._waited = 0
+        self._shed = 0
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int) -> AsyncIterator[None]:
+        nbytes = min(nbytes, self.capacity)
+        await self._acquire(nbytes)
+        try:
+            yield
+        finally:
+            self._release(nbytes)
+
+    async def _acquire(self, nbytes: int) -> None:
+        if not self._waiters and self._in_use + nbytes <= self.capacity:
+            self._grant(nbytes)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (nbytes, future)
+        self._waiters.append(waiter)
+        self._waited += 1
+        try:
+            async with asyncio.timeout(self.max_wait):
+                await future
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait ended, hand the bytes back
+                self._release(nbytes)
+            else:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+            if isinstance(e, TimeoutError):
+                self._shed += 1
+                raise ServiceUnavailableError(
+                    f"Too many {self.name} in flight, try again later", retry_after=self.retry_after
+                ) from e
+            raise
+
+    def _grant(self, nbytes: int) -> None:
+        self._in_use += nbytes
+        self._high_water = max(self._high_water, self._in_use)
+        self._admitted += 1
+
+    def _release(self, nbytes: int) -> None:
+        self._in_use -= nbytes
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_use + self._waiters[0][0] <= self.capacity:
+            nbytes, future = self._waiters.popleft()
+            if future.done():
+                # Cancelled, its task hasn't run its cleanup yet
+                continue
+            self._grant(nbytes)
+            future.set_result(None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self._in_use,
+            "high_water": self._high_water,
+            "waiting": len(self._waiters),
+            "admitted": self._admitted,
+            "waited": self._waited,
+            "shed": self._shed,
+        }
@@ -0,0 +1,164 @@
+import math
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from enum import StrEnum
+from typing import Any
+
+from core.exceptions import CircuitOpenError, DeadlineExceededError, ServiceUnavailableError
+
+
+class CircuitState(StrEnum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fails calls to an unhealthy upstream fast instead of letting them wait it out.
+
+    While closed, the outcome of the last `window` calls is kept. Once at least
+    `min_calls` of them are in and the share of failures reaches
+    `failure_rate`, or the share slower than `slow_call_duration` seconds
+    reaches `slow_call_rate`, the breaker opens and every call is rejected with
+    CircuitOpenError for `open_duration` seconds. It then lets
+    `half_open_calls` probe calls through, closing again once they all succeed
+    in time and reopening on the first one that doesn't.
+
+    `is_failure` tells upstream failures from errors the upstream answered
+    properly (a bad parameter, an unknown user), which count as successes.
+    Calls shed before reaching the upstream (ServiceUnavailableError) and
+    cancelled calls don't count either way, calls cut off by their request's
+    deadline only count if slow.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        is_failure: Callable[[Exception], bool] = lambda e: True,
+        window: int = 50,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_rate: float = 0.8,
+        slow_call_duration: float = 5.0,
+        open_duration: float = 30.0,
+        half_open_calls: int = 3,
+    ):
+        self.name = name
+        self.is_failure = is_failure
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+
+        self._state = CircuitState.CLOSED
+        # Bumped on every transition, outcomes of calls let in before it are dropped
+        self._generation = 0
+        self._outcomes: deque[tuple[bool, bool]] = deque(maxlen=window)
+        self._failures = 0
+        self._slow_calls = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._opened = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state == CircuitState.OPEN and time.monotonic() - self._opened_at >= self.open_duration:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """Run the enclosed call through the breaker and record its outcome"""
+        generation = self._admit()
+        started = time.monotonic()
+        try:
+            yield
+        except DeadlineExceededError:
+            # Cut off by its request's deadline, it counts as slow if it ran long enough
+            self._record(generation, time.monotonic() - started, False)
+            raise
+        except ServiceUnavailableError:
+            self._release(generation)
+            raise
+        except Exception as e:
+            self._record(generation, time.monotonic() - started, self.is_failure(e))
+            raise
+        except BaseException:
+            self._release(generation)
+            raise
+        else:
+            self._record(generation, time.monotonic() - started, False)
+
+    def _admit(self) -> int:
+        state = self.state
+        if state == CircuitState.OPEN:
+            self._rejected += 1
+            retry_after = math.ceil(self._opened_at + self.open_duration - time.monotonic())
+            raise CircuitOpenError(f"Upstream {self.name} is unavailable, try again later", retry_after=retry_after)
+        if state == CircuitState.HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self._rejected += 1
+                raise CircuitOpenError(f"Upstream {self.name} is unavailable, try again later", retry_after=1)
+            self._probes += 1
+        return self._generation
+
+    def _release(self, generation: int) -> None:
+        if generation == self._generation and self._state == CircuitState.HALF_OPEN:
+            self._probes -= 1
+
+    def _record(self, generation: int, duration: float, failed: bool) -> None:
+        if generation != self._generation:
+            return
+        slow = duration > self.slow_call_duration
+
+        if self._state == CircuitState.HALF_OPEN:
+            if failed or slow:
+                self._transition(CircuitState.OPEN)
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CircuitState.CLOSED)
+            return
+
+        if len(self._outcomes) == self._outcomes.maxlen:
+            evicted_failed, evicted_slow = self._outcomes[0]
+            self._failures -= evicted_failed
+            self._slow_calls -= evicted_slow
+        self._outcomes.append((failed, slow))
+        self._failures += failed
+        self._slow_calls += slow
+
+        calls = len(self._outcomes)
+        if calls >= self.min_calls and (
+            self._failures / calls >= self.failure_rate or self._slow_calls / calls >= self.slow_call_rate
+        ):
+            self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState) -> None:
+        self._state = state
+        self._generation += 1
+        self._probes = 0
+        self._probe_successes = 0
+        if state == CircuitState.OPEN:
+            self._opened += 1
+            self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._failures = 0
+        self._slow_calls = 0
+
+    def stats(self) -> dict[str, Any]:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "failure_rate": self._failures / calls if calls else 0.0,
+            "slow_call_rate": self._slow_calls / calls if calls else 0.0,
+            "opened": self._opened,
+            "rejected": self._rejected,
+        }
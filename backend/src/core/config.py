@@ -1,4 +1,6 @@
 from functools import lru_cache
+from pathlib import Path
+from typing import Literal
 
 from fastapi import Depends
 from pydantic_settings import BaseSettings
@@ -29,6 +31,53 @@ class Settings(BaseSettings):
     AWS_COGNITO_CLIENT_ID: str
     AWS_COGNITO_CLIENT_SECRET: str
     AWS_COGNITO_USER_POOL_ID: str
+    AWS_COGNITO_TOKEN_VERIFICATION: Literal["remote", "local"] = "remote"
+    AWS_COGNITO_JWKS_PATH: Path | None = None
+    # Seconds a Cognito profile is reused for the same access token (never past
+    # its expiry), and how many tokens' profiles are kept
+    PROFILE_CACHE_TTL: float = 60.0
+    PROFILE_CACHE_SIZE: int = 10_000
+
+    FACE_SIGNIN_SPECULATIVE_AUTH: bool = False
+    # Frames a face login may send at once, and how many of them are compared concurrently
+    FACE_SIGNIN_MAX_FRAMES: int = 4
+    FACE_SIGNIN_FRAME_CONCURRENCY: int = 2
+    # Frames scored locally in best-shot mode (a longer MJPEG clip is sampled), and how many of them get compared
+    FACE_BURST_MAX_FRAMES: int = 10
+    FACE_BURST_BEST_FRAMES: int = 2
+    # Seconds a /validate_face ticket lets /register_user_face skip face detection
+    FACE_VALIDATION_TICKET_TTL: int = 300
+
+    # Largest accepted face image upload, the request body limit adds multipart overhead on top
+    MAX_IMAGE_SIZE: int = 10 * 1024 * 1024
+    # Image bytes a worker may buffer across all in-flight face requests, and how long a request waits for room
+    IMAGE_BUDGET_BYTES: int = 256 * 1024 * 1024
+    IMAGE_BUDGET_MAX_WAIT: float = 2.0
+
+    # Seconds a request may take before it is answered with 504, per path for the listed ones
+    REQUEST_TIMEOUT: float = 30.0
+    ROUTE_TIMEOUTS: dict[str, float] = {
+        "/registration/signin": 10.0,
+        "/registration/signin_via_face": 10.0,
+        "/registration/signin_via_face_burst": 15.0,
+        "/registration/signin_via_face_only": 10.0,
+        "/registration/check_face_auth": 10.0,
+        "/registration/me": 5.0,
+    }
+
+    # Bearer token /metrics requires. Unset, anyone who can reach the app reads its counters (upstream
+    # health, profile cache size and hit rate, no tokens or users), so keep the endpoint internal then
+    METRICS_TOKEN: str | None = None
+
+    @property
+    def MAX_UPLOAD_SIZE(self) -> int:
+        """Largest total of image bytes one request may carry"""
+        return self.MAX_IMAGE_SIZE * self.FACE_SIGNIN_MAX_FRAMES
+
+    @property
+    def MAX_BURST_UPLOAD_SIZE(self) -> int:
+        """Largest total of image bytes a best-shot login may carry"""
+        return self.MAX_IMAGE_SIZE * self.FACE_BURST_MAX_FRAMES
 
     @property
     def DATABASE_URI(self) -> str:
@@ -41,6 +90,10 @@ class Settings(BaseSettings):
             database=self.DB_NAME,
         ).render_as_string(hide_password=False)
 
+    @property
+    def AWS_COGNITO_ISSUER(self) -> str:
+        return f"https://cognito-idp.{self.AWS_REGION}.amazonaws.com/{self.AWS_COGNITO_USER_POOL_ID}"
+
     @property
     def AWS_COGNITO_SERVER_METADATA_URL(self) -> str:
         return f"https://cognito-idp.{get_settings().AWS_REGION}.amazonaws.com/{get_settings().AWS_COGNITO_USER_POOL_ID}/.well-known/openid-configuration"
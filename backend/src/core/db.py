@@ -1,14 +1,48 @@
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from core import deadline
 from core.config import get_settings
-from typing import Annotated, AsyncGenerator, TypeAlias
+from typing import Annotated, Any, AsyncGenerator, TypeAlias
 
 
 engine = create_async_engine(get_settings().DATABASE_URI)
 
 
+class DeadlineSession(AsyncSession):
+    """AsyncSession whose statements fail with DeadlineExceededError at the request's deadline.
+
+    Every repository runs its queries through here, so none of them waits on
+    the database past the time its request has left. Commit and rollback
+    aren't bounded, a transaction is never left half-finished by the deadline.
+    """
+
+    async def execute(self, *args: Any, **kwargs: Any) -> Any:
+        async with deadline.bounded():
+            return await super().execute(*args, **kwargs)
+
+    async def scalar(self, *args: Any, **kwargs: Any) -> Any:
+        async with deadline.bounded():
+            return await super().scalar(*args, **kwargs)
+
+    async def scalars(self, *args: Any, **kwargs: Any) -> Any:
+        async with deadline.bounded():
+            return await super().scalars(*args, **kwargs)
+
+    async def get(self, *args: Any, **kwargs: Any) -> Any:
+        async with deadline.bounded():
+            return await super().get(*args, **kwargs)
+
+    async def flush(self, *args: Any, **kwargs: Any) -> None:
+        async with deadline.bounded():
+            await super().flush(*args, **kwargs)
+
+    async def refresh(self, *args: Any, **kwargs: Any) -> None:
+        async with deadline.bounded():
+            await super().refresh(*args, **kwargs)
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSession(engine) as session:
+    async with DeadlineSession(engine) as session:
         yield session
 
 
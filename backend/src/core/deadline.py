@@ -0,0 +1,126 @@
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.exceptions import DeadlineExceededError
+
+# time.monotonic() by which the current request must be answered
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+def remaining() -> float | None:
+    """Seconds left before the current request's deadline, None outside of one"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout(default: float) -> float:
+    """`default` seconds, or less when the current request's deadline comes sooner"""
+    left = remaining()
+    return default if left is None else max(0.0, min(default, left))
+
+
+def allows(delay: float) -> bool:
+    """Whether a retry `delay` seconds from now would still start before the current request's deadline"""
+    left = remaining()
+    return left is None or delay < left
+
+
+def check() -> None:
+    """Raise DeadlineExceededError when the current request's deadline has passed"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceededError("Request deadline exceeded")
+
+
+@contextmanager
+def within(seconds: float) -> Iterator[None]:
+    """Give the enclosed code at most `seconds`, never more than an enclosing deadline allows"""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@asynccontextmanager
+async def bounded() -> AsyncIterator[None]:
+    """Cut the enclosed awaits short with DeadlineExceededError at the current request's deadline"""
+    left = remaining()
+    if left is None:
+        yield
+        return
+
+    check()
+    try:
+        async with asyncio.timeout(left):
+            yield
+    except TimeoutError as e:
+        raise DeadlineExceededError("Request deadline exceeded") from e
+
+
+class DeadlineMiddleware:
+    """Give every HTTP request a deadline and answer 504 once it has passed.
+
+    The deadline is `route_timeouts[path]` seconds for the listed paths and
+    `default_timeout` for the others. Upstream and database calls read it to
+    bound their own timeouts and retries, and fail with DeadlineExceededError
+    when it passes. A handler still running `grace` seconds after the deadline
+    is cancelled and answered with 504 here, unless it already started its
+    response.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_timeout: float,
+        route_timeouts: dict[str, float] | None = None,
+        grace: float = 0.25,
+    ):
+        self.app = app
+        self.default_timeout = default_timeout
+        self.route_timeouts = route_timeouts or {}
+        self.grace = grace
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = self.route_timeouts.get(scope["path"], self.default_timeout)
+        response_started = False
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        with within(seconds):
+            try:
+                async with asyncio.timeout(seconds + self.grace):
+                    await self.app(scope, receive, tracking_send)
+            except TimeoutError:
+                if response_started:
+                    raise
+                await self._timed_out(send)
+
+    async def _timed_out(self, send: Send) -> None:
+        body = json.dumps({"detail": "Request deadline exceeded"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
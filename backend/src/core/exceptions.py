@@ -1,2 +1,22 @@
 class UnitOfWorkError(Exception):
     pass
+
+
+class ServiceUnavailableError(Exception):
+    """Raised when a dependency can't take more work right now"""
+
+    def __init__(self, message: str, retry_after: int | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamSaturatedError(ServiceUnavailableError):
+    """Raised when an upstream executor queue is full"""
+
+
+class DeadlineExceededError(ServiceUnavailableError):
+    """Raised when a request runs out of its time budget"""
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    """Raised when an upstream's circuit breaker is open"""
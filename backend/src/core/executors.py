@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+from core.exceptions import UpstreamSaturatedError
+
+T = TypeVar("T")
+
+
+class UpstreamExecutor:
+    """Runs blocking upstream calls on a dedicated thread pool.
+
+    At most `max_concurrency` calls run at once and at most `max_queue` more may
+    wait for a thread. Anything beyond that is rejected immediately with
+    UpstreamSaturatedError instead of piling up behind a slow upstream.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix=f"upstream-{name}")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    async def run(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        """Run `fn` on the pool, failing fast when the queue is full"""
+        with self._lock:
+            if self._pending >= self.max_concurrency + self.max_queue:
+                self._rejected += 1
+                raise UpstreamSaturatedError(f"Upstream {self.name} is overloaded, try again later", retry_after=1)
+            self._pending += 1
+
+        enqueued_at = time.perf_counter()
+        context = contextvars.copy_context()
+
+        def call() -> T:
+            self._started(time.perf_counter() - enqueued_at)
+            try:
+                return context.run(partial(fn, *args, **kwargs))
+            finally:
+                self._finished()
+
+        # Released on the pool's future, which only completes once the call has
+        # run or was cancelled before starting. A caller cancelled mid-call
+        # leaves the thread busy, so it keeps counting against the cap.
+        future = self._pool.submit(call)
+        future.add_done_callback(self._released)
+        return await asyncio.wrap_future(future)
+
+    def _started(self, waited: float) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self._wait_time_total += waited
+            self._wait_time_max = max(self._wait_time_max, waited)
+
+    def _finished(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def _released(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._in_flight
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": self._pending - self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_time_avg_ms": self._wait_time_total / started * 1000 if started else 0.0,
+                "wait_time_max_ms": self._wait_time_max * 1000,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
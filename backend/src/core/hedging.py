@@ -0,0 +1,94 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+from core.latency import LatencyHistogram
+
+T = TypeVar("T")
+
+
+class HedgingPolicy:
+    """Sends a second identical call when the first is slower than usual.
+
+    A call that hasn't answered after the `percentile`th latency recently
+    observed gets a hedge, the first success wins and the other call is
+    cancelled. If one fails the other is still awaited, the error is raised
+    only once both have. Every call earns `budget` of a hedge, and a hedge is
+    only sent with a whole one saved up, so at most about `budget` extra calls
+    are made per call. No hedges are sent before `min_samples` latencies are
+    known, nor sooner than `min_delay` seconds into a call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        latencies: LatencyHistogram,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        max_credit: float = 10.0,
+    ):
+        self.name = name
+        self.latencies = latencies
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_credit = max_credit
+
+        self._credit = 0.0
+        self._calls = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._over_budget = 0
+
+    def hedge_delay(self) -> float | None:
+        if self.latencies.count() < self.min_samples:
+            return None
+        return max(self.min_delay, self.latencies.percentile(self.percentile) or 0.0)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        self._calls += 1
+        self._credit = min(self.max_credit, self._credit + self.budget)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(call())
+        pending = {primary}
+        delay = self.hedge_delay()
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    if self._credit >= 1:
+                        self._credit -= 1
+                        self._hedged += 1
+                        pending.add(asyncio.ensure_future(call()))
+                    else:
+                        self._over_budget += 1
+
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.record(time.monotonic() - started)
+                        if task is not primary:
+                            self._hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "hedged": self._hedged,
+            "hedge_wins": self._hedge_wins,
+            "over_budget": self._over_budget,
+            "hedge_delay": self.hedge_delay(),
+            "latency": self.latencies.stats(),
+        }
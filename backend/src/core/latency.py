@@ -0,0 +1,81 @@
+import math
+import time
+from typing import Any
+
+
+class LatencyHistogram:
+    """Rolling histogram of call latencies over the last `window` seconds.
+
+    Latencies fall into buckets growing by `growth` from `min_latency` up, so a
+    percentile is off by at most that factor whatever the scale. The window is
+    split into `slices` that are cleared as they age out, which keeps
+    recording O(1) and forgets an old latency spike within one window.
+    """
+
+    def __init__(
+        self,
+        window: float = 60.0,
+        slices: int = 6,
+        min_latency: float = 0.001,
+        max_latency: float = 60.0,
+        growth: float = 1.1,
+    ):
+        self.window = window
+        self.min_latency = min_latency
+        self.growth = growth
+
+        self._slice_duration = window / slices
+        self._bucket_count = math.ceil(math.log(max_latency / min_latency, growth)) + 1
+        self._slices = [[0] * self._bucket_count for _ in range(slices)]
+        self._slice_counts = [0] * slices
+        # Index of the slice period each slot last held
+        self._slice_periods = [0] * slices
+
+    def _bucket(self, latency: float) -> int:
+        if latency <= self.min_latency:
+            return 0
+        return min(self._bucket_count - 1, math.ceil(math.log(latency / self.min_latency, self.growth)))
+
+    def _current_slot(self) -> int:
+        period = int(time.monotonic() / self._slice_duration)
+        slot = period % len(self._slices)
+        if self._slice_periods[slot] != period:
+            self._slices[slot] = [0] * self._bucket_count
+            self._slice_counts[slot] = 0
+            self._slice_periods[slot] = period
+        return slot
+
+    def record(self, latency: float) -> None:
+        slot = self._current_slot()
+        self._slices[slot][self._bucket(latency)] += 1
+        self._slice_counts[slot] += 1
+
+    def _live_slots(self) -> list[int]:
+        period = int(time.monotonic() / self._slice_duration)
+        return [slot for slot, last in enumerate(self._slice_periods) if period - last < len(self._slices)]
+
+    def count(self) -> int:
+        return sum(self._slice_counts[slot] for slot in self._live_slots())
+
+    def percentile(self, percentile: float) -> float | None:
+        """Upper bound of the bucket holding the `percentile`th latency, None before any"""
+        slots = self._live_slots()
+        total = sum(self._slice_counts[slot] for slot in slots)
+        if total == 0:
+            return None
+
+        rank = math.ceil(total * percentile / 100)
+        seen = 0
+        for bucket in range(self._bucket_count):
+            seen += sum(self._slices[slot][bucket] for slot in slots)
+            if seen >= rank:
+                return self.min_latency * self.growth**bucket
+        return self.min_latency * self.growth ** (self._bucket_count - 1)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "count": self.count(),
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
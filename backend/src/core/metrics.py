@@ -0,0 +1,32 @@
+import logging
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MetricsSource = Callable[[], dict[str, Any]]
+
+
+class MetricsRegistry:
+    """In-process registry of named metric sources, snapshotted on demand."""
+
+    def __init__(self) -> None:
+        self._sources: dict[str, MetricsSource] = {}
+
+    def register(self, name: str, source: MetricsSource) -> None:
+        self._sources[name] = source
+
+    def unregister(self, name: str) -> None:
+        self._sources.pop(name, None)
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        snapshot = {}
+        for name, source in self._sources.items():
+            try:
+                snapshot[name] = source()
+            except Exception:
+                logger.exception(f"Failed to collect metrics from {name}")
+        return snapshot
+
+
+metrics = MetricsRegistry()
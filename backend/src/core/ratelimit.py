@@ -0,0 +1,143 @@
+import asyncio
+import math
+import time
+from typing import Any
+
+from core.exceptions import UpstreamSaturatedError
+
+
+class TokenBucket:
+    """Async token bucket holding callers to `rate` acquisitions per second on average.
+
+    Up to `burst` acquisitions go through back to back after a quiet period.
+    Beyond that each caller reserves the next free token and sleeps until it
+    is due, so callers are served in arrival order without a lock or a
+    background refill task.
+    """
+
+    def __init__(self, name: str, rate: float, burst: int | None = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.name = name
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._acquired = 0
+        self._waited = 0
+        self._shed = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, max_wait: float | None = None) -> None:
+        """Take a token, waiting for it at most `max_wait` seconds.
+
+        A caller whose token isn't due within `max_wait` is shed with
+        UpstreamSaturatedError right away instead of sleeping first.
+        """
+        self._refill()
+        # The balance goes negative by the tokens promised to earlier waiters plus this one
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        if max_wait is not None and delay > max_wait:
+            self._shed += 1
+            raise UpstreamSaturatedError(
+                f"Upstream {self.name} is rate limited, try again later", retry_after=math.ceil(delay)
+            )
+
+        self._tokens -= 1
+        self._acquired += 1
+        if delay == 0:
+            return
+
+        self._waited += 1
+        self._wait_time_total += delay
+        self._wait_time_max = max(self._wait_time_max, delay)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Give the reservation back so later callers don't wait for it
+            self._tokens += 1
+            raise
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "acquired": self._acquired,
+            "waited": self._waited,
+            "shed": self._shed,
+            "wait_time_avg": self._wait_time_total / self._waited if self._waited else 0.0,
+            "wait_time_max": self._wait_time_max,
+        }
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate follows the upstream's throttling, AIMD style.
+
+    Every successful call raises the rate by `increase / rate`, so while calls
+    flow at the current rate it grows by `increase` requests per second each
+    second. A throttle multiplies it by `decrease`, at most once per
+    `cooldown` seconds since the calls in flight when the upstream started
+    throttling would otherwise cut it again and again. The rate settles just
+    under the upstream's limit instead of swinging between full speed and a
+    burst of throttles.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        cooldown: float = 1.0,
+    ):
+        if not 0 < min_rate <= max_rate:
+            raise ValueError("rates must satisfy 0 < min_rate <= max_rate")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease must be between 0 and 1")
+        super().__init__(name, min(max(rate, min_rate), max_rate))
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self._decreased_at = -math.inf
+        self._throttles = 0
+        self._decreases = 0
+
+    def on_success(self) -> None:
+        self._set_rate(self.rate + self.increase / self.rate)
+
+    def on_throttle(self) -> None:
+        self._throttles += 1
+        now = time.monotonic()
+        if now - self._decreased_at < self.cooldown:
+            return
+        self._decreased_at = now
+        self._decreases += 1
+        self._set_rate(self.rate * self.decrease)
+
+    def _set_rate(self, rate: float) -> None:
+        # Tokens accrued so far count at the old rate
+        self._refill()
+        self.rate = min(max(rate, self.min_rate), self.max_rate)
+        self.burst = max(1, int(self.rate))
+        self._tokens = min(self._tokens, self.burst)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **super().stats(),
+            "min_rate": self.min_rate,
+            "max_rate": self.max_rate,
+            "throttles": self._throttles,
+            "decreases": self._decreases,
+        }
@@ -5,7 +5,7 @@ from fastapi import Depends
 from sqlmodel import Session
 
 from core.db import get_session
-from core.exceptions import UnitOfWorkError
+from core.exceptions import ServiceUnavailableError, UnitOfWorkError
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +20,10 @@ class UnitOfWork:
     async def __aexit__(self, exc_type, exc_value, traceback):
         if exc_type is not None:
             await self.rollback()
+            if issubclass(exc_type, ServiceUnavailableError) or not issubclass(exc_type, Exception):
+                # Overload, a missed deadline or cancellation is not a failed transaction
+                return False
+
             logger.error("Transaction failed", exc_info=(exc_type, exc_value, traceback))
             raise UnitOfWorkError(
                 f"Rolling back transaction due to exception: {exc_type.__name__} {exc_value}"
@@ -0,0 +1,139 @@
+from functools import lru_cache
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Request, UploadFile, status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.admission import ByteBudget
+from core.config import get_settings
+
+# Room for the multipart boundary, part headers and the small form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+RAW_IMAGE_CONTENT_TYPES = {"application/octet-stream", "image/jpeg", "image/png"}
+MJPEG_CONTENT_TYPES = {"video/x-motion-jpeg", "multipart/x-mixed-replace", "image/jpeg"}
+
+
+def payload_too_large(limit: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"Request body exceeds {limit} bytes",
+    )
+
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies over `max_body_size` bytes with 413 while they stream in.
+
+    The listed paths get their own limit from `route_limits` instead.
+
+    A declared Content-Length over the limit is refused before the app runs.
+    Otherwise received bytes are counted and reading stops with 413 at the
+    chunk that crosses the limit, so an oversized upload is neither buffered
+    nor spooled to disk in full.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int, route_limits: dict[str, int] | None = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.route_limits = route_limits or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.route_limits.get(scope["path"], self.max_body_size)
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > limit:
+            await self._reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise payload_too_large(limit)
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            response_started |= message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            # Raised from outside the app's exception handling, e.g. by another middleware reading the body
+            if e.status_code != status.HTTP_413_CONTENT_TOO_LARGE or response_started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, limit: int) -> None:
+        response = JSONResponse(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            content={"detail": f"Request body exceeds {limit} bytes"},
+        )
+        await response(scope, receive, send)
+
+
+async def read_upload(file: UploadFile, max_size: int) -> bytes:
+    """Read an uploaded file in one piece, refusing it with 413 if it's over `max_size` bytes.
+
+    The multipart parser has already spooled the part to disk past 1 MB, so the
+    returned bytes are the only in-memory copy of the upload; pass them on as
+    is rather than wrapping them in another buffer.
+    """
+    if file.size is not None and file.size > max_size:
+        raise payload_too_large(max_size)
+
+    data = await file.read(max_size + 1)
+    if len(data) > max_size:
+        raise payload_too_large(max_size)
+    return data
+
+
+async def read_body(request: Request, max_size: int, content_types: set[str] = RAW_IMAGE_CONTENT_TYPES) -> bytes:
+    """Read a raw image request body chunk by chunk, refusing it with 413 once it's over `max_size` bytes.
+
+    Skips multipart parsing altogether; the chunks are joined once at the end.
+    """
+    content_type = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    if content_type not in content_types:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Send the image as a multipart file or a raw body of type {', '.join(sorted(content_types))}",
+        )
+
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size:
+        raise payload_too_large(max_size)
+
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_size:
+            raise payload_too_large(max_size)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def expected_body_size(request: Request, max_size: int) -> int:
+    """Bytes to reserve for a raw body before reading it, the limit when the length isn't declared"""
+    content_length = request.headers.get("content-length", "")
+    return min(int(content_length), max_size) if content_length.isdigit() else max_size
+
+
+@lru_cache
+def get_image_budget() -> ByteBudget:
+    settings = get_settings()
+    return ByteBudget("face images", settings.IMAGE_BUDGET_BYTES, settings.IMAGE_BUDGET_MAX_WAIT)
+
+
+ImageBudgetDependency = Annotated[ByteBudget, Depends(get_image_budget)]
@@ -0,0 +1,250 @@
+"""Bulk face enrollment of existing users from a manifest of photos.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python -m enrollments.bulk badges.csv --concurrency 16 --rekognition-rate 20
+
+The manifest is a CSV file with `email` and `image` columns, or JSON lines with
+the same keys. Relative image paths are resolved against the manifest's
+directory. Every row goes through RegisterUserFaceCommand, like a
+/register_user_face call for that user. Malformed rows are reported as failed
+with their line number, they don't stop the run.
+
+Each row's outcome is appended to the report (`<manifest>.report.jsonl` by
+default) as soon as it is known, and the report doubles as the checkpoint.
+A rerun skips rows already registered or rejected for good, and retries the
+ones that failed on something transient. --retry-failed retries every failed
+row.
+
+Point AWS_ENDPOINT_URL at a local stand-in (LocalStack, moto server) and set
+REKOGNITION_BACKEND=local to run without AWS. The local backend needs a face
+model in FACE_EMBEDDING_EXTRACTOR, or FACE_ALLOW_REFERENCE_EXTRACTOR=true for a
+dry run that doesn't recognize faces.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from aws.config import get_aws_client_settings
+from aws.registry import AWSClientRegistry
+from core.config import get_settings
+from core.db import engine
+from enrollments.commands import RegisterCommandFactory, is_permanent, load_face_index, register_face_commands
+from faces.normalize import get_image_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestRow(BaseModel):
+    line: int
+    email: str
+    image: Path | None
+    # Why the row can't be registered, when it is malformed
+    error: str | None = None
+
+
+class RowResult(BaseModel):
+    line: int
+    email: str
+    image: str
+    status: Literal["registered", "failed"]
+    error: str | None = None
+    # Whether a rerun should try the row again
+    retryable: bool = False
+    duration: float = 0.0
+
+
+def read_manifest(path: Path) -> Iterator[ManifestRow]:
+    """Yield the manifest's rows lazily, so a large one is never held in memory at once"""
+    with path.open(newline="") as manifest:
+        if path.suffix in (".jsonl", ".ndjson"):
+            records = ((line, parse_json_record(text)) for line, text in enumerate(manifest, start=1) if text.strip())
+        else:
+            # Line 1 holds the header
+            records = enumerate(csv.DictReader(manifest), start=2)
+
+        for line, record in records:
+            yield manifest_row(path, line, record)
+
+
+def parse_json_record(text: str) -> dict | None:
+    try:
+        record = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def manifest_row(path: Path, line: int, record: dict | None) -> ManifestRow:
+    if record is None:
+        return ManifestRow(line=line, email="", image=None, error="Not a JSON object")
+
+    email, image = record.get("email"), record.get("image")
+    if not isinstance(email, str) or not email or not isinstance(image, str) or not image:
+        return ManifestRow(
+            line=line,
+            email=email if isinstance(email, str) else "",
+            image=None,
+            error="Row needs an email and an image",
+        )
+
+    image_path = Path(image)
+    return ManifestRow(
+        line=line, email=email, image=image_path if image_path.is_absolute() else path.parent / image_path
+    )
+
+
+def read_checkpoint(report: Path) -> dict[str, RowResult]:
+    """Latest outcome per email from a previous run's report"""
+    results = {}
+    if report.exists():
+        with report.open() as lines:
+            for text in lines:
+                if text.strip():
+                    result = RowResult.model_validate_json(text)
+                    results[result.email] = result
+    return results
+
+
+class BulkEnrollment:
+    """Registers manifest rows through RegisterUserFaceCommand, `concurrency` rows at a time"""
+
+    def __init__(
+        self,
+        commands: RegisterCommandFactory,
+        sessions: Callable[[], AsyncSession],
+        report: Path,
+        concurrency: int = 8,
+        retry_failed: bool = False,
+    ):
+        self.commands = commands
+        self.sessions = sessions
+        self.report = report
+        self.concurrency = concurrency
+        self.retry_failed = retry_failed
+        self.counts: Counter[str] = Counter()
+
+    def should_run(self, row: ManifestRow, done: dict[str, RowResult]) -> bool:
+        previous = done.get(row.email)
+        if previous is None:
+            return True
+        if previous.status == "registered":
+            return False
+        return previous.retryable or self.retry_failed
+
+    def pending(self, rows: Iterable[ManifestRow]) -> Iterator[ManifestRow]:
+        done = read_checkpoint(self.report)
+        for row in rows:
+            if self.should_run(row, done):
+                yield row
+            else:
+                self.counts["skipped"] += 1
+
+    async def run(self, rows: Iterable[ManifestRow]) -> Counter[str]:
+        pending = self.pending(rows)
+        with self.report.open("a") as report:
+
+            async def worker() -> None:
+                # Workers share the generator, so rows are read only as fast as they are registered
+                for row in pending:
+                    result = await self.register(row)
+                    self.counts[result.status] += 1
+                    report.write(result.model_dump_json() + "\n")
+                    report.flush()
+
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+
+        return self.counts
+
+    async def register(self, row: ManifestRow) -> RowResult:
+        started = time.perf_counter()
+        result = RowResult(line=row.line, email=row.email, image=str(row.image or ""), status="registered")
+        if row.error is not None:
+            result.status, result.error = "failed", f"Malformed row: {row.error}"
+            return result
+
+        try:
+            image = await asyncio.to_thread(row.image.read_bytes)
+        except OSError as e:
+            result.status, result.error = "failed", f"Can't read image: {e}"
+            return result
+
+        try:
+            async with self.sessions() as session:
+                await self.commands(session).execute(row.email, image)
+        except Exception as e:
+            if is_permanent(e):
+                result.status, result.error = "failed", str(e)
+            else:
+                logger.warning(f"Row {row.line} ({row.email}) failed: {e!r}", exc_info=True)
+                result.status, result.error, result.retryable = "failed", str(e) or repr(e), True
+
+        result.duration = time.perf_counter() - started
+        return result
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifest", type=Path, help="CSV or JSONL file of email and image path")
+    parser.add_argument(
+        "--report", type=Path, help="per-row results, also read to resume (default <manifest>.report.jsonl)"
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="rows registered at once")
+    parser.add_argument("--retry-failed", action="store_true", help="also retry rows that failed permanently")
+    parser.add_argument("--cognito-rate", type=float, help="Cognito requests per second")
+    parser.add_argument("--rekognition-rate", type=float, help="Rekognition requests per second")
+    parser.add_argument("--s3-rate", type=float, help="S3 requests per second")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    rate_limits = {
+        "COGNITO_RATE_LIMIT": args.cognito_rate,
+        "REKOGNITION_RATE_LIMIT": args.rekognition_rate,
+        "S3_RATE_LIMIT": args.s3_rate,
+    }
+    aws_settings = get_aws_client_settings().model_copy(
+        update={name: rate for name, rate in rate_limits.items() if rate is not None}
+    )
+    aws_clients = AWSClientRegistry.from_settings(aws_settings)
+    aws_clients.warm_up()
+    images = get_image_pipeline()
+    await load_face_index(engine)
+    commands, _ = register_face_commands(get_settings(), aws_clients, images)
+
+    report = args.report or args.manifest.with_suffix(".report.jsonl")
+    enrollment = BulkEnrollment(
+        commands, async_sessionmaker(engine), report, concurrency=args.concurrency, retry_failed=args.retry_failed
+    )
+    started = time.perf_counter()
+    try:
+        counts = await enrollment.run(read_manifest(args.manifest))
+        elapsed = time.perf_counter() - started
+        processed = counts["registered"] + counts["failed"]
+        print(
+            f"registered {counts['registered']}  failed {counts['failed']}  skipped {counts['skipped']}  "
+            f"in {elapsed:.1f}s ({processed / elapsed:.1f} rows/s), report: {report}"
+        )
+        print(json.dumps(aws_clients.stats(), indent=2))
+    finally:
+        images.shutdown()
+        await aws_clients.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+from collections.abc import Callable
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+import s3.exceptions as s3_exceptions
+from aws.offload import is_upstream_failure
+from aws.registry import AWSClientRegistry
+from cognito.repository import get_cognito_repo
+from cognito.service import get_cognito_token_service
+from core.config import Settings
+from core.exceptions import ServiceUnavailableError
+from core.unit_of_work import UnitOfWork
+from faces.exceptions import FaceProcessingError
+from faces.normalize import ImagePipeline
+from registration.exceptions import ServiceError
+from registration.service import RegisterUserFaceCommand, get_register_user_face_command
+from rekognition.config import get_rekognition_settings
+from rekognition.exceptions import RekognitionLimitExceededError
+from rekognition.repository import get_rekognition_repository
+from rekognition.service import get_face_matching_backend, get_local_embedding_backend, get_rekognition_service
+from s3.config import get_s3_config
+from s3.service import S3Service, get_s3_service
+from users.exceptions import UserNotFoundError
+from users.repo import UserRepository
+
+# Registration failures retrying can't fix
+PERMANENT_ERRORS = (ServiceError, FaceProcessingError, s3_exceptions.ImageTooLargeError, UserNotFoundError)
+# Causes that are worth retrying even once wrapped in one of them: overload, throttling, S3 and the database
+TRANSIENT_ERRORS = (
+    ServiceUnavailableError,
+    RekognitionLimitExceededError,
+    s3_exceptions.S3ServiceError,
+    OperationalError,
+    InterfaceError,
+)
+
+RegisterCommandFactory = Callable[[AsyncSession], RegisterUserFaceCommand]
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether retrying the registration that raised `error` can't succeed.
+
+    RegisterUserFaceCommand reports a throttled DetectFaces or a failed
+    transaction as ServiceError, so the chain of causes decides, not the
+    outermost type.
+    """
+    if not isinstance(error, PERMANENT_ERRORS):
+        return False
+
+    cause: BaseException | None = error
+    while cause is not None:
+        if isinstance(cause, TRANSIENT_ERRORS) or (isinstance(cause, Exception) and is_upstream_failure(cause)):
+            return False
+        cause = cause.__cause__
+    return True
+
+
+def register_face_commands(
+    settings: Settings, aws_clients: AWSClientRegistry, images: ImagePipeline
+) -> tuple[RegisterCommandFactory, S3Service]:
+    """Wire RegisterUserFaceCommand outside a request, one command per session"""
+    rekognition_settings = get_rekognition_settings()
+    cognito = get_cognito_token_service(get_cognito_repo(settings, aws_clients))
+    rekognition = get_rekognition_service(
+        get_face_matching_backend(
+            get_rekognition_repository(aws_clients.rekognition, rekognition_settings), rekognition_settings
+        )
+    )
+    s3 = get_s3_service(get_s3_config(), aws_clients.s3)
+
+    def commands(session: AsyncSession) -> RegisterUserFaceCommand:
+        return get_register_user_face_command(
+            settings, UnitOfWork(session), cognito, UserRepository(session), rekognition, s3, images
+        )
+
+    return commands, s3
+
+
+async def load_face_index(engine: AsyncEngine) -> None:
+    """Load the local backend's index, registering into it replaces a user's previous face"""
+    if get_rekognition_settings().REKOGNITION_BACKEND != "local":
+        return
+    async with AsyncSession(engine) as session:
+        await get_local_embedding_backend().load_index(UserRepository(session).iter_face_embeddings())
@@ -0,0 +1,26 @@
+from functools import lru_cache
+from typing import Annotated
+
+from fastapi import Depends
+from pydantic_settings import BaseSettings
+
+
+class EnrollmentSettings(BaseSettings):
+    # Prefix of the S3 keys queued images are staged under until their job is done
+    ENROLLMENT_STAGING_PREFIX: str = "enrollments/"
+    # Registrations a worker process runs at once
+    ENROLLMENT_WORKER_CONCURRENCY: int = 4
+    # Seconds an idle worker waits before looking for new jobs again
+    ENROLLMENT_POLL_INTERVAL: float = 1.0
+    # Seconds after which a running job whose worker went away is claimed again
+    ENROLLMENT_JOB_LEASE: int = 300
+    # Attempts a job gets when registration keeps failing for transient reasons
+    ENROLLMENT_MAX_ATTEMPTS: int = 3
+
+
+@lru_cache
+def get_enrollment_settings() -> EnrollmentSettings:
+    return EnrollmentSettings()
+
+
+EnrollmentSettingsDependency = Annotated[EnrollmentSettings, Depends(get_enrollment_settings)]
@@ -0,0 +1,2 @@
+class EnrollmentJobNotFoundError(Exception):
+    pass
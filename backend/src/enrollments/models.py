@@ -0,0 +1,40 @@
+import uuid
+from datetime import datetime
+from enum import StrEnum
+
+from sqlmodel import Column, DateTime, Field, Index, Integer, SQLModel, String, func
+
+
+class EnrollmentStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class EnrollmentJob(SQLModel, table=True):
+    """A face registration waiting for, or done by, the enrollment worker"""
+
+    __tablename__ = "enrollment_jobs"
+    __table_args__ = (Index("ix_enrollment_jobs_status_created_at", "status", "created_at"),)
+
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    email: str = Field(sa_column=Column(String, nullable=False, index=True))
+    # Staged upload the worker registers, deleted once the job is done
+    image_key: str = Field(sa_column=Column(String, nullable=False))
+    status: str = Field(
+        default=EnrollmentStatus.QUEUED,
+        sa_column=Column(String, nullable=False, server_default=EnrollmentStatus.QUEUED),
+    )
+    attempts: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    error: str | None = Field(default=None, sa_column=Column(String))
+    created_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    )
+    updated_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    )
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (EnrollmentStatus.SUCCEEDED, EnrollmentStatus.FAILED)
@@ -0,0 +1,68 @@
+import uuid
+from datetime import timedelta
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+
+from core.db import get_session
+from core.repository import SQLModelRepository
+from enrollments.exceptions import EnrollmentJobNotFoundError
+from enrollments.models import EnrollmentJob, EnrollmentStatus
+
+
+class EnrollmentJobRepository(SQLModelRepository):
+    model = EnrollmentJob
+
+    async def get_for_user(self, id: uuid.UUID, email: str) -> EnrollmentJob:
+        jobs = await super().filter(id=id, email=email)
+        if not jobs:
+            raise EnrollmentJobNotFoundError(f"Enrollment job {id} is not found")
+        return jobs[0]
+
+    async def claim(self, limit: int, lease: int) -> list[EnrollmentJob]:
+        """Mark up to `limit` of the oldest claimable jobs running and return them.
+
+        Rows another worker is claiming at the same moment are skipped instead of
+        waited on (FOR UPDATE SKIP LOCKED), so concurrent workers never get the
+        same job. A job left running for longer than `lease` seconds is claimed
+        again, the worker that had it is assumed gone.
+        """
+        expired = and_(
+            EnrollmentJob.status == EnrollmentStatus.RUNNING,
+            EnrollmentJob.updated_at < func.now() - timedelta(seconds=lease),
+        )
+        claimable = (
+            select(EnrollmentJob.id)
+            .where(or_(EnrollmentJob.status == EnrollmentStatus.QUEUED, expired))
+            .order_by(EnrollmentJob.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.session.execute(
+            update(EnrollmentJob)
+            .where(EnrollmentJob.id.in_(claimable.scalar_subquery()))
+            .values(status=EnrollmentStatus.RUNNING, attempts=EnrollmentJob.attempts + 1, updated_at=func.now())
+            .returning(EnrollmentJob)
+        )
+        await self.session.flush()
+        return list(result.scalars().all())
+
+    async def finish(self, id: uuid.UUID, status: EnrollmentStatus, error: str | None = None) -> None:
+        """Record the outcome of an attempt, QUEUED hands the job back for another one"""
+        await self.session.execute(
+            update(EnrollmentJob)
+            .where(EnrollmentJob.id == id)
+            .values(status=status, error=error, updated_at=func.now())
+        )
+        await self.session.flush()
+
+
+def get_enrollment_job_repository(
+    session: Annotated[Session, Depends(get_session)],
+) -> EnrollmentJobRepository:
+    return EnrollmentJobRepository(session)
+
+
+EnrollmentJobRepositoryDependency = Annotated[EnrollmentJobRepository, Depends(get_enrollment_job_repository)]
@@ -0,0 +1,17 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+from enrollments.models import EnrollmentStatus
+
+
+class EnrollmentJobStatus(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: uuid.UUID
+    status: EnrollmentStatus
+    attempts: int
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,65 @@
+import uuid
+from typing import Annotated
+
+from fastapi import Depends
+
+import s3.exceptions as s3_exceptions
+from core.config import SettingsDependency
+from core.exceptions import UnitOfWorkError
+from core.unit_of_work import UnitOfWork, UnitOfWorkDependency
+from enrollments.config import EnrollmentSettings, EnrollmentSettingsDependency
+from enrollments.repo import EnrollmentJobRepository, EnrollmentJobRepositoryDependency
+from enrollments.schemas import EnrollmentJobStatus
+from registration.exceptions import ServiceError
+from s3.service import S3Service, S3ServiceDependency
+
+
+class EnrollmentService:
+    """Queues face registrations for the enrollment worker and reports their progress"""
+
+    def __init__(
+        self,
+        uow: UnitOfWork,
+        jobs: EnrollmentJobRepository,
+        s3: S3Service,
+        settings: EnrollmentSettings,
+        max_image_size: int = 10 * 1024 * 1024,
+    ):
+        self.uow = uow
+        self.jobs = jobs
+        self.s3 = s3
+        self.settings = settings
+        self.max_image_size = max_image_size
+
+    async def enqueue(self, email: str, image: bytes) -> EnrollmentJobStatus:
+        """Stage the image and queue its registration, the job only becomes visible once both are done"""
+        if len(image) > self.max_image_size:
+            raise s3_exceptions.ImageTooLargeError("Image is too large")
+
+        job_id = uuid.uuid4()
+        try:
+            async with self.uow:
+                job = await self.jobs.create(
+                    {"id": job_id, "email": email, "image_key": f"{self.settings.ENROLLMENT_STAGING_PREFIX}{job_id}"}
+                )
+                await self.s3.upload_object(key=job.image_key, file=image)
+                return EnrollmentJobStatus.model_validate(job)
+        except UnitOfWorkError as e:
+            raise ServiceError(f"Failed to queue face registration: {e}") from e
+
+    async def get(self, job_id: uuid.UUID, email: str) -> EnrollmentJobStatus:
+        """Status of one of the user's jobs, other users' jobs are reported as not found"""
+        return EnrollmentJobStatus.model_validate(await self.jobs.get_for_user(job_id, email))
+
+
+def get_enrollment_service(
+    core_settings: SettingsDependency,
+    settings: EnrollmentSettingsDependency,
+    uow: UnitOfWorkDependency,
+    jobs: EnrollmentJobRepositoryDependency,
+    s3: S3ServiceDependency,
+) -> EnrollmentService:
+    return EnrollmentService(uow, jobs, s3, settings, max_image_size=core_settings.MAX_IMAGE_SIZE)
+
+
+EnrollmentServiceDependency = Annotated[EnrollmentService, Depends(get_enrollment_service)]
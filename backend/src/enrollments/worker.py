@@ -0,0 +1,184 @@
+"""Enrollment worker, registers the faces queued through /register_user_face_async.
+
+Run from the backend directory, as many processes as needed:
+
+    PYTHONPATH=src python -m enrollments.worker
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+import s3.exceptions as s3_exceptions
+from aws.config import get_aws_client_settings
+from aws.registry import AWSClientRegistry
+from core.config import get_settings
+from core.db import engine
+from enrollments.commands import RegisterCommandFactory, is_permanent, load_face_index, register_face_commands
+from enrollments.config import EnrollmentSettings, get_enrollment_settings
+from enrollments.models import EnrollmentJob, EnrollmentStatus
+from enrollments.repo import EnrollmentJobRepository
+from faces.normalize import get_image_pipeline
+from s3.service import S3Service
+
+logger = logging.getLogger(__name__)
+
+
+class EnrollmentWorker:
+    """Claims queued enrollment jobs and registers their faces, a bounded number at a time.
+
+    Each registration runs the same RegisterUserFaceCommand the synchronous
+    route does, on its own session. Permanent failures (a rejected image, an
+    unknown user) fail the job at once, anything else hands it back to the
+    queue until ENROLLMENT_MAX_ATTEMPTS is reached.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        commands: RegisterCommandFactory,
+        s3: S3Service,
+        settings: EnrollmentSettings,
+    ):
+        # Claimed jobs are read after the claiming transaction commits
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.commands = commands
+        self.s3 = s3
+        self.settings = settings
+
+        self._running: set[asyncio.Task] = set()
+        self._claimed = 0
+        self._succeeded = 0
+        self._failed = 0
+        self._retried = 0
+
+    async def run(self, stop: asyncio.Event | None = None, until_idle: bool = False) -> None:
+        """Process jobs until `stop` is set, or the queue is empty when `until_idle`"""
+        stop = stop or asyncio.Event()
+        try:
+            while not stop.is_set():
+                free = self.settings.ENROLLMENT_WORKER_CONCURRENCY - len(self._running)
+                for job in await self.claim(free) if free > 0 else []:
+                    task = asyncio.create_task(self.process(job))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+
+                if not self._running and until_idle:
+                    return
+                await self._wait(stop)
+        finally:
+            # Let running registrations finish, a job cut short would wait out its lease
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _wait(self, stop: asyncio.Event) -> None:
+        """Sleep until a slot frees up, the poll interval passes or the worker is stopped"""
+        stopping = asyncio.ensure_future(stop.wait())
+        try:
+            await asyncio.wait(
+                {stopping, *self._running},
+                timeout=self.settings.ENROLLMENT_POLL_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            stopping.cancel()
+
+    async def claim(self, limit: int) -> list[EnrollmentJob]:
+        try:
+            async with self.sessions() as session, session.begin():
+                jobs = await EnrollmentJobRepository(session).claim(limit, self.settings.ENROLLMENT_JOB_LEASE)
+        except Exception:
+            logger.exception("Failed to claim enrollment jobs")
+            return []
+
+        self._claimed += len(jobs)
+        return jobs
+
+    async def process(self, job: EnrollmentJob) -> None:
+        try:
+            await self.register(job)
+        except Exception:
+            # Most likely the database, the job is claimed again once its lease expires
+            logger.exception(f"Failed to record the outcome of enrollment job {job.id}")
+
+    async def register(self, job: EnrollmentJob) -> None:
+        if job.attempts > self.settings.ENROLLMENT_MAX_ATTEMPTS:
+            # Its worker went away on the last attempt
+            await self.finish(job, EnrollmentStatus.FAILED, job.error or "Enrollment did not complete")
+            return
+
+        try:
+            image = await self.s3.download_object(job.image_key)
+            async with self.sessions() as session:
+                await self.commands(session).execute(job.email, image)
+        except Exception as e:
+            if is_permanent(e):
+                logger.info(f"Enrollment job {job.id} failed: {e}")
+                await self.finish(job, EnrollmentStatus.FAILED, str(e))
+                return
+
+            logger.warning(f"Enrollment job {job.id} attempt {job.attempts} failed: {e!r}", exc_info=True)
+            if job.attempts >= self.settings.ENROLLMENT_MAX_ATTEMPTS:
+                await self.finish(job, EnrollmentStatus.FAILED, str(e))
+            else:
+                self._retried += 1
+                await self.finish(job, EnrollmentStatus.QUEUED, str(e))
+        else:
+            await self.finish(job, EnrollmentStatus.SUCCEEDED)
+
+    async def finish(self, job: EnrollmentJob, status: EnrollmentStatus, error: str | None = None) -> None:
+        async with self.sessions() as session, session.begin():
+            await EnrollmentJobRepository(session).finish(job.id, status, error)
+
+        if status == EnrollmentStatus.QUEUED:
+            return
+        if status == EnrollmentStatus.SUCCEEDED:
+            self._succeeded += 1
+        else:
+            self._failed += 1
+
+        try:
+            await self.s3.delete_object(key=job.image_key)
+        except s3_exceptions.S3ServiceError as e:
+            logger.info(f"Failed to delete staged image of enrollment job {job.id}: {e}")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "concurrency": self.settings.ENROLLMENT_WORKER_CONCURRENCY,
+            "running": len(self._running),
+            "claimed": self._claimed,
+            "succeeded": self._succeeded,
+            "failed": self._failed,
+            "retried": self._retried,
+        }
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    aws_clients = AWSClientRegistry.from_settings(get_aws_client_settings())
+    aws_clients.warm_up()
+    images = get_image_pipeline()
+    await load_face_index(engine)
+    commands, s3 = register_face_commands(get_settings(), aws_clients, images)
+
+    worker = EnrollmentWorker(engine, commands, s3, get_enrollment_settings())
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    logger.info(f"Enrollment worker started with concurrency {worker.settings.ENROLLMENT_WORKER_CONCURRENCY}")
+    try:
+        await worker.run(stop)
+    finally:
+        logger.info(f"Enrollment worker stopped: {worker.stats()}")
+        images.shutdown()
+        await aws_clients.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,169 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+from pydantic import BaseModel
+
+from faces.exceptions import FaceProcessingError, ImageDecodeError
+from faces.quality import QualityReport, QualityScreen, grayscale, measure_pixels
+
+JPEG_START = b"\xff\xd8\xff"
+
+# Share of the gradient energy left outside the subject box on each side
+SUBJECT_ENERGY_TAIL = 0.1
+SHARPNESS_WEIGHT = 0.5
+FACE_SIZE_WEIGHT = 0.25
+POSE_WEIGHT = 0.25
+
+
+class FrameScore(BaseModel):
+    """Local measurements of one burst frame, `score` ranks it within its burst"""
+
+    index: int
+    quality: QualityReport | None = None
+    # Share of the frame covered by the box holding most of its detail, a proxy for face size
+    face_size: float = 0.0
+    # Left-right symmetry of that box from 0 to 1, frontal faces are close to 1
+    pose: float = 0.0
+    score: float = 0.0
+    rejected: str | None = None
+
+
+class BurstSelection(BaseModel):
+    frames: int
+    chosen: list[FrameScore]
+    rejected: dict[int, str]
+
+
+def split_mjpeg(data: bytes, max_frames: int) -> list[bytes]:
+    """Cut an MJPEG stream (concatenated JPEGs, with or without multipart headers) into frames.
+
+    Longer clips are sampled evenly down to `max_frames`.
+    """
+    frames = []
+    start = data.find(JPEG_START)
+    while start != -1:
+        end = _jpeg_end(data, start)
+        if end == -1:
+            # Corrupt or truncated frame, pick up at the next start of image
+            start = data.find(JPEG_START, start + len(JPEG_START))
+            continue
+        frames.append(data[start:end])
+        start = data.find(JPEG_START, end)
+
+    if len(frames) > max_frames:
+        picked = np.linspace(0, len(frames) - 1, max_frames).round().astype(int)
+        frames = [frames[i] for i in picked]
+    return frames
+
+
+def _jpeg_end(data: bytes, start: int) -> int:
+    """Offset just past the EOI of the JPEG starting at `start`, -1 if it's malformed or cut short.
+
+    Segments are skipped by their length, so the SOI and EOI of an EXIF
+    thumbnail embedded in one don't end the frame.
+    """
+    position = start + 2
+    while position + 1 < len(data):
+        if data[position] != 0xFF:
+            return -1
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            position += 1
+        elif marker == 0xD9:
+            return position + 2
+        elif 0xD0 <= marker <= 0xD7 or marker == 0x01:
+            position += 2
+        elif marker == 0xDA:
+            position += 2 + int.from_bytes(data[position + 2 : position + 4], "big")
+            position = _scan_end(data, position)
+        else:
+            position += 2 + int.from_bytes(data[position + 2 : position + 4], "big")
+    return -1
+
+
+def _scan_end(data: bytes, position: int) -> int:
+    """Offset of the marker ending the entropy-coded data at `position`, skipping stuffed bytes and restarts"""
+    while (position := data.find(b"\xff", position)) != -1 and position + 1 < len(data):
+        following = data[position + 1]
+        if following != 0x00 and not 0xD0 <= following <= 0xD7:
+            return position
+        position += 2
+    return len(data)
+
+
+def measure_frame(index: int, image: bytes, analysis_size: int = 640) -> FrameScore:
+    """Decode a frame at analysis size and measure its quality, subject size and symmetry"""
+    try:
+        with Image.open(BytesIO(image)) as img:
+            width, height = img.size
+            img.draft("L", (analysis_size, analysis_size))
+            pixels = grayscale(img, analysis_size)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return FrameScore(index=index, rejected=ImageDecodeError.reason)
+
+    face_size, pose = measure_subject(pixels)
+    return FrameScore(index=index, quality=measure_pixels(pixels, width, height), face_size=face_size, pose=pose)
+
+
+def measure_subject(pixels: np.ndarray) -> tuple[float, float]:
+    """Locate the subject as the box holding most gradient energy, return its area share and symmetry"""
+    if min(pixels.shape) < 3:
+        return 0.0, 0.0
+
+    energy = np.abs(np.diff(pixels, axis=0))[:, :-1] + np.abs(np.diff(pixels, axis=1))[:-1, :]
+    total = energy.sum()
+    if total <= 0:
+        return 0.0, 0.0
+
+    top, bottom = _span(energy.sum(axis=1) / total)
+    left, right = _span(energy.sum(axis=0) / total)
+    face_size = (bottom - top) * (right - left) / energy.size
+
+    subject = pixels[top:bottom, left:right]
+    centered = subject - subject.mean()
+    mirrored = centered[:, ::-1]
+    norm = np.sqrt((centered**2).sum() * (mirrored**2).sum())
+    pose = float((centered * mirrored).sum() / norm) if norm > 0 else 0.0
+    return float(face_size), max(pose, 0.0)
+
+
+def _span(profile: np.ndarray) -> tuple[int, int]:
+    cumulative = np.cumsum(profile)
+    start = int(np.searchsorted(cumulative, SUBJECT_ENERGY_TAIL))
+    end = int(np.searchsorted(cumulative, 1 - SUBJECT_ENERGY_TAIL)) + 1
+    return start, max(end, start + 1)
+
+
+def select_frames(scores: list[FrameScore], quality: QualityScreen, count: int) -> BurstSelection:
+    """Rank the frames that pass the quality screen and keep the best `count`.
+
+    Sharpness and face size count relative to the best frame of the burst, so
+    the ranking adapts to the camera and lighting the burst was taken with.
+    """
+    eligible = []
+    for frame in scores:
+        if frame.rejected is None and quality.settings.FACE_QUALITY_SCREEN_ENABLED:
+            try:
+                quality.validate(frame.quality)
+            except FaceProcessingError as e:
+                frame.rejected = getattr(e, "reason", "other")
+        if frame.rejected is None:
+            eligible.append(frame)
+
+    if eligible:
+        sharpest = max(frame.quality.sharpness for frame in eligible) or 1.0
+        largest = max(frame.face_size for frame in eligible) or 1.0
+        for frame in eligible:
+            frame.score = (
+                SHARPNESS_WEIGHT * frame.quality.sharpness / sharpest
+                + FACE_SIZE_WEIGHT * frame.face_size / largest
+                + POSE_WEIGHT * frame.pose
+            )
+
+    return BurstSelection(
+        frames=len(scores),
+        chosen=sorted(eligible, key=lambda frame: frame.score, reverse=True)[:count],
+        rejected={frame.index: frame.rejected for frame in scores if frame.rejected is not None},
+    )
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import Annotated, Literal
+
+from fastapi import Depends
+from pydantic_settings import BaseSettings
+
+
+class FaceQualitySettings(BaseSettings):
+    FACE_QUALITY_SCREEN_ENABLED: bool = True
+
+    # Shorter edge of the uploaded image, in pixels
+    FACE_QUALITY_MIN_RESOLUTION: int = 200
+    # Measured on the grayscale image downscaled to FACE_QUALITY_ANALYSIS_SIZE
+    FACE_QUALITY_ANALYSIS_SIZE: int = 640
+    FACE_QUALITY_MIN_SHARPNESS: float = 25.0
+    FACE_QUALITY_MIN_BRIGHTNESS: float = 40.0
+    FACE_QUALITY_MAX_BRIGHTNESS: float = 220.0
+    FACE_QUALITY_MIN_CONTRAST: float = 15.0
+
+
+@lru_cache
+def get_face_quality_settings() -> FaceQualitySettings:
+    return FaceQualitySettings()
+
+
+FaceQualitySettingsDependency = Annotated[FaceQualitySettings, Depends(get_face_quality_settings)]
+
+
+class FaceImageSettings(BaseSettings):
+    # Rekognition only accepts JPEG and PNG, WEBP suits the local backend and storage
+    FACE_IMAGE_FORMAT: Literal["JPEG", "WEBP"] = "JPEG"
+    FACE_IMAGE_QUALITY: int = 90
+    # Longer edge after downscaling, Rekognition needs faces of at least 80px on it
+    FACE_IMAGE_MAX_EDGE: int = 1280
+    FACE_IMAGE_CROP_TO_FACE: bool = False
+    # Share of the face bounding box kept around it on every side when cropping
+    FACE_IMAGE_CROP_MARGIN: float = 0.5
+    # Decoding runs in this many worker processes, 0 runs it on a thread instead
+    FACE_IMAGE_WORKERS: int = 2
+
+
+@lru_cache
+def get_face_image_settings() -> FaceImageSettings:
+    return FaceImageSettings()
+
+
+FaceImageSettingsDependency = Annotated[FaceImageSettings, Depends(get_face_image_settings)]
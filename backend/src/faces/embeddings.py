@@ -0,0 +1,78 @@
+from abc import ABC, abstractmethod
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from faces.exceptions import ImageDecodeError
+
+EMBEDDING_DTYPE = np.float32
+
+
+class FaceEmbeddingExtractor(ABC):
+    """Turns an image into fixed-length face embeddings"""
+
+    dim: int
+
+    @abstractmethod
+    def detect(self, image: bytes) -> list[dict]:
+        """Return the detected faces in Rekognition's FaceDetails shape"""
+
+    @abstractmethod
+    def extract(self, image: bytes) -> np.ndarray:
+        """Return an L2-normalized (faces, dim) embedding matrix"""
+
+
+class ReferenceEmbeddingExtractor(FaceEmbeddingExtractor):
+    """Deterministic stand-in for a face embedding model.
+
+    The whole frame is treated as one face: it's converted to grayscale, downscaled,
+    standardized and projected with a fixed seeded random matrix. The same image
+    always yields the same embedding, which makes the local backend testable
+    offline. It does not recognize faces and must not guard real accounts, the
+    local backend only runs on it with FACE_ALLOW_REFERENCE_EXTRACTOR set.
+    """
+
+    def __init__(self, dim: int = 128, size: int = 32, seed: int = 0):
+        self.dim = dim
+        self.size = size
+        rng = np.random.default_rng(seed)
+        self._projection = (rng.standard_normal((size * size, dim)) / np.sqrt(dim)).astype(EMBEDDING_DTYPE)
+
+    def detect(self, image: bytes) -> list[dict]:
+        self._pixels(image)
+        return [{"BoundingBox": {"Width": 1.0, "Height": 1.0, "Left": 0.0, "Top": 0.0}, "Confidence": 100.0}]
+
+    def extract(self, image: bytes) -> np.ndarray:
+        pixels = self._pixels(image)
+        pixels -= pixels.mean()
+        std = pixels.std()
+        if std > 0:
+            pixels /= std
+        return normalize((pixels @ self._projection)[np.newaxis, :])
+
+    def _pixels(self, image: bytes) -> np.ndarray:
+        try:
+            with Image.open(BytesIO(image)) as img:
+                frame = ImageOps.exif_transpose(img).convert("L").resize((self.size, self.size), Image.BILINEAR)
+        except (UnidentifiedImageError, OSError, ValueError) as e:
+            raise ImageDecodeError("Failed to decode image") from e
+        return np.asarray(frame, dtype=EMBEDDING_DTYPE).ravel()
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return (embeddings / np.maximum(norms, np.finfo(EMBEDDING_DTYPE).eps)).astype(EMBEDDING_DTYPE)
+
+
+def cosine_similarity(probes: np.ndarray, gallery: np.ndarray) -> np.ndarray:
+    """(probes, gallery) similarity matrix of two L2-normalized embedding matrices"""
+    return probes @ gallery.T
+
+
+def to_bytes(embedding: np.ndarray) -> bytes:
+    return np.ascontiguousarray(embedding, dtype=EMBEDDING_DTYPE).tobytes()
+
+
+def from_bytes(data: bytes, dim: int) -> np.ndarray:
+    return np.frombuffer(data, dtype=EMBEDDING_DTYPE).reshape(-1, dim)
@@ -0,0 +1,28 @@
+class FaceProcessingError(Exception):
+    """Base exception for local face processing"""
+
+
+class ImageDecodeError(FaceProcessingError):
+    """Raised when an image can't be decoded"""
+
+    reason = "undecodable"
+
+
+class ImageQualityError(FaceProcessingError):
+    """Raised when an image is certain to fail face detection or matching"""
+
+
+class ResolutionTooLowError(ImageQualityError):
+    reason = "resolution"
+
+
+class BlurryImageError(ImageQualityError):
+    reason = "sharpness"
+
+
+class BadExposureError(ImageQualityError):
+    reason = "exposure"
+
+
+class LowContrastError(ImageQualityError):
+    reason = "contrast"
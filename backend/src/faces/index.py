@@ -0,0 +1,219 @@
+import math
+import threading
+
+import numpy as np
+
+from faces.embeddings import EMBEDDING_DTYPE, normalize
+from faces.store import EmbeddingStore
+
+CODE_DTYPE = np.int8
+CODE_MAX = 127
+BATCH_SIZE = 65536
+
+
+def _grow(array: np.ndarray, capacity: int, fill: int = 0) -> np.ndarray:
+    if capacity <= len(array):
+        return array
+    grown = np.full((max(capacity, 2 * len(array), 16), *array.shape[1:]), fill, dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class IVFIndex:
+    """Approximate nearest-neighbour search over the embeddings of an EmbeddingStore.
+
+    Live rows are partitioned around `nlist` centroids trained with spherical
+    k-means (IVF). A query scans only the `nprobe` partitions whose centroids are
+    closest, using 8-bit scalar-quantized copies packed per partition, and
+    re-ranks the best `rerank` candidates exactly against the stored embeddings.
+
+    Incremental adds go to the nearest existing centroid, so partitions drift
+    out of balance as the gallery grows; `build` retrains them from scratch.
+    """
+
+    def __init__(self, store: EmbeddingStore, nlist: int = 0, nprobe: int = 16, rerank: int = 32, seed: int = 0):
+        self.store = store
+        self.dim = store.dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.seed = seed
+        self._lock = threading.RLock()
+        self._reset(np.zeros((1, self.dim), dtype=EMBEDDING_DTYPE), self._default_scale())
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, id: int) -> bool:
+        return self.store.row(id) is not None
+
+    def build(self, retrain: bool = True) -> None:
+        """Partition every live row of the store, training new centroids unless `retrain` is False"""
+        with self._lock:
+            self.store.refresh()
+            rows = np.sort(self.store.live_rows())
+            centroids, scale = self._centroids, self._scale
+            if retrain:
+                sample = self._sample(rows)
+                centroids, scale = self._train(sample, len(rows)), self._train_scale(sample)
+
+            assignment = np.empty(len(rows), dtype=np.int64)
+            for start in range(0, len(rows), BATCH_SIZE):
+                batch = self._load(rows[start : start + BATCH_SIZE])
+                assignment[start : start + BATCH_SIZE] = np.argmax(batch @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            sizes = np.bincount(assignment, minlength=len(centroids))
+            bounds = np.concatenate([[0], np.cumsum(sizes)])
+
+            self._reset(centroids, scale)
+            self._partition_of = np.full(len(self.store.ids), -1, dtype=np.int32)
+            self._slot_of = np.zeros(len(self.store.ids), dtype=np.int64)
+            for partition in range(len(centroids)):
+                members = rows[order[bounds[partition] : bounds[partition + 1]]]
+                self._partition_rows[partition] = members
+                self._partition_codes[partition] = self._encode(self._load(members))
+                self._partition_of[members] = partition
+                self._slot_of[members] = np.arange(len(members))
+            self._partition_sizes = sizes.astype(np.int64)
+
+    def add(self, id: int, vector: np.ndarray) -> None:
+        """Insert or replace the embedding stored under `id`"""
+        with self._lock:
+            self.store.append(id, vector)
+            self.sync()
+
+    def remove(self, id: int) -> bool:
+        with self._lock:
+            removed = self.store.delete(id) is not None
+            self.sync()
+            return removed
+
+    def sync(self) -> None:
+        """Apply writes made to the store since the last sync, including other processes' writes"""
+        with self._lock:
+            added, removed = self.store.refresh()
+            if self.store.generation != self._generation:
+                self.build(retrain=False)
+                return
+
+            for row in added:
+                self._insert(row)
+            for row in removed:
+                self._remove(row)
+
+    def compact(self, min_dead_ratio: float = 0.0) -> bool:
+        """Compact the store once tombstones make up `min_dead_ratio` of it"""
+        with self._lock:
+            if not self.store.compact(min_dead_ratio):
+                return False
+            self.build(retrain=False)
+            return True
+
+    def search(self, query: np.ndarray, k: int = 1) -> list[tuple[int, float]]:
+        """Return up to `k` (id, cosine similarity) pairs, best first"""
+        query = normalize(np.asarray(query, dtype=EMBEDDING_DTYPE).reshape(1, self.dim))[0]
+
+        with self._lock:
+            nprobe = min(self.nprobe, len(self._centroids))
+            probed = np.argpartition(-(self._centroids @ query), nprobe - 1)[:nprobe]
+            rows = np.concatenate([self._partition_rows[p][: self._partition_sizes[p]] for p in probed])
+            codes = np.concatenate([self._partition_codes[p][: self._partition_sizes[p]] for p in probed])
+            if len(rows) == 0:
+                return []
+
+            coarse = codes.astype(EMBEDDING_DTYPE) @ (query / self._scale)
+            if len(rows) > self.rerank:
+                candidates = rows[np.argpartition(-coarse, self.rerank - 1)[: self.rerank]]
+            else:
+                candidates = rows
+
+            exact = self._load(candidates) @ query
+            best = np.argsort(-exact)[:k]
+            return [(int(self.store.ids[candidates[i]]), float(exact[i])) for i in best]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.store.stats(),
+                "nlist": len(self._centroids),
+                "nprobe": min(self.nprobe, len(self._centroids)),
+                "largest_partition": int(self._partition_sizes.max()),
+            }
+
+    def _reset(self, centroids: np.ndarray, scale: np.ndarray) -> None:
+        self._generation = self.store.generation
+        self._centroids = centroids
+        self._scale = scale
+        self._partition_of = np.empty(0, dtype=np.int32)
+        self._slot_of = np.empty(0, dtype=np.int64)
+        self._partition_rows = [np.empty(0, dtype=np.int64) for _ in range(len(centroids))]
+        self._partition_codes = [np.empty((0, self.dim), dtype=CODE_DTYPE) for _ in range(len(centroids))]
+        self._partition_sizes = np.zeros(len(centroids), dtype=np.int64)
+
+    def _load(self, rows: np.ndarray) -> np.ndarray:
+        return np.asarray(self.store.vectors[rows], dtype=EMBEDDING_DTYPE)
+
+    def _insert(self, row: int) -> None:
+        vector = self._load(np.array([row]))
+        partition = int(np.argmax(vector @ self._centroids.T))
+        self._partition_of = _grow(self._partition_of, row + 1, fill=-1)
+        self._slot_of = _grow(self._slot_of, row + 1)
+
+        slot = self._partition_sizes[partition]
+        self._partition_rows[partition] = _grow(self._partition_rows[partition], slot + 1)
+        self._partition_codes[partition] = _grow(self._partition_codes[partition], slot + 1)
+        self._partition_rows[partition][slot] = row
+        self._partition_codes[partition][slot] = self._encode(vector)[0]
+        self._partition_sizes[partition] = slot + 1
+        self._partition_of[row] = partition
+        self._slot_of[row] = slot
+
+    def _remove(self, row: int) -> None:
+        if row >= len(self._partition_of) or self._partition_of[row] < 0:
+            return
+
+        partition, slot = self._partition_of[row], self._slot_of[row]
+        last = self._partition_sizes[partition] - 1
+        if slot != last:
+            moved = self._partition_rows[partition][last]
+            self._partition_rows[partition][slot] = moved
+            self._partition_codes[partition][slot] = self._partition_codes[partition][last]
+            self._slot_of[moved] = slot
+        self._partition_sizes[partition] = last
+        self._partition_of[row] = -1
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors * self._scale), -CODE_MAX, CODE_MAX).astype(CODE_DTYPE)
+
+    def _default_scale(self) -> np.ndarray:
+        # Components of random unit vectors are ~N(0, 1/dim), four sigma covers them
+        return np.full(self.dim, CODE_MAX * math.sqrt(self.dim) / 4, dtype=EMBEDDING_DTYPE)
+
+    def _sample(self, rows: np.ndarray, size: int = BATCH_SIZE) -> np.ndarray:
+        if len(rows) > size:
+            rows = np.sort(np.random.default_rng(self.seed).choice(rows, size, replace=False))
+        return self._load(rows)
+
+    def _train_scale(self, sample: np.ndarray) -> np.ndarray:
+        if len(sample) < 1024:
+            return self._default_scale()
+        bound = np.maximum(np.quantile(np.abs(sample), 0.999, axis=0), np.finfo(EMBEDDING_DTYPE).eps)
+        return (CODE_MAX / bound).astype(EMBEDDING_DTYPE)
+
+    def _train(self, sample: np.ndarray, size: int, iterations: int = 10) -> np.ndarray:
+        nlist = self.nlist or (int(math.sqrt(size)) if size >= 1024 else 1)
+        nlist = max(1, min(nlist, len(sample)))
+        if nlist == 1:
+            return np.zeros((1, self.dim), dtype=EMBEDDING_DTYPE)
+
+        rng = np.random.default_rng(self.seed)
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize(sums)
+
+        return centroids
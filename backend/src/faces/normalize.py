@@ -0,0 +1,153 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache, partial
+from io import BytesIO
+from typing import Annotated
+
+from fastapi import Depends
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+from pydantic import BaseModel
+
+from faces.burst import BurstSelection, measure_frame, select_frames
+from faces.config import FaceImageSettings, get_face_image_settings
+from faces.exceptions import ImageDecodeError
+from faces.quality import QualityReport, QualityScreen, get_quality_screen, measure_decoded
+
+
+class NormalizedImage(BaseModel):
+    data: bytes
+    width: int
+    height: int
+    quality: QualityReport
+
+
+def _decode_errors():
+    return (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError)
+
+
+def _encode(img: Image.Image, format: str, quality: int) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format=format, quality=quality)
+    return buffer.getvalue()
+
+
+def normalize_image(image: bytes, max_edge: int, format: str, quality: int, analysis_size: int) -> NormalizedImage:
+    """Decode once, measure quality, apply EXIF orientation, downscale and re-encode.
+
+    An upload that is already upright, small enough and in `format` is passed
+    through unchanged rather than recompressed.
+    """
+    try:
+        with Image.open(BytesIO(image)) as img:
+            width, height = img.size
+            orientation = img.getexif().get(ExifTags.Base.Orientation, 1)
+            # Lets the JPEG decoder scale down while decoding instead of after
+            img.draft("RGB", (max_edge, max_edge))
+            report = measure_decoded(img, width, height, analysis_size)
+
+            if img.format == format and orientation == 1 and max(width, height) <= max_edge:
+                return NormalizedImage(data=image, width=width, height=height, quality=report)
+
+            upright = ImageOps.exif_transpose(img).convert("RGB")
+            upright.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            return NormalizedImage(
+                data=_encode(upright, format, quality),
+                width=upright.width,
+                height=upright.height,
+                quality=report,
+            )
+    except _decode_errors() as e:
+        raise ImageDecodeError("Failed to decode image") from e
+
+
+def crop_to_box(image: bytes, bounding_box: dict, margin: float, format: str, quality: int) -> bytes:
+    """Crop to a Rekognition BoundingBox (ratios of the image size) grown by `margin` on every side"""
+    try:
+        with Image.open(BytesIO(image)) as img:
+            width, height = img.size
+            left = bounding_box["Left"] - margin * bounding_box["Width"]
+            top = bounding_box["Top"] - margin * bounding_box["Height"]
+            right = bounding_box["Left"] + (1 + margin) * bounding_box["Width"]
+            bottom = bounding_box["Top"] + (1 + margin) * bounding_box["Height"]
+            box = (
+                max(0, round(left * width)),
+                max(0, round(top * height)),
+                min(width, round(right * width)),
+                min(height, round(bottom * height)),
+            )
+            return _encode(img.convert("RGB").crop(box), format, quality)
+    except _decode_errors() as e:
+        raise ImageDecodeError("Failed to decode image") from e
+
+
+class ImagePipeline:
+    """Turns an upload into the image sent to every upstream call.
+
+    Decoding, quality measurement and re-encoding run in one step on a process
+    pool, so the CPU work neither holds the API workers' GIL nor is repeated
+    per upstream call.
+    """
+
+    def __init__(self, settings: FaceImageSettings, quality: QualityScreen, executor: Executor | None = None):
+        self.settings = settings
+        self.quality = quality
+        self._executor = executor
+
+    async def normalize(self, image: bytes, upstream_calls: int = 1) -> bytes:
+        """Return the normalized image, raising a FaceProcessingError if it fails the quality screen"""
+        try:
+            normalized = await self._run(
+                normalize_image,
+                image,
+                self.settings.FACE_IMAGE_MAX_EDGE,
+                self.settings.FACE_IMAGE_FORMAT,
+                self.settings.FACE_IMAGE_QUALITY,
+                self.quality.settings.FACE_QUALITY_ANALYSIS_SIZE,
+            )
+        except ImageDecodeError as e:
+            self.quality.reject(e, upstream_calls)
+            raise
+
+        self.quality.enforce(normalized.quality, upstream_calls)
+        return normalized.data
+
+    async def crop_to_face(self, image: bytes, bounding_box: dict) -> bytes:
+        if not self.settings.FACE_IMAGE_CROP_TO_FACE:
+            return image
+        return await self._run(
+            crop_to_box,
+            image,
+            bounding_box,
+            self.settings.FACE_IMAGE_CROP_MARGIN,
+            self.settings.FACE_IMAGE_FORMAT,
+            self.settings.FACE_IMAGE_QUALITY,
+        )
+
+    async def select_best(self, frames: list[bytes], count: int) -> BurstSelection:
+        """Score a burst of frames on the pool and pick the `count` worth an upstream comparison"""
+        analysis_size = self.quality.settings.FACE_QUALITY_ANALYSIS_SIZE
+        scores = await asyncio.gather(
+            *(self._run(measure_frame, index, frame, analysis_size) for index, frame in enumerate(frames))
+        )
+        return select_frames(scores, self.quality, count)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+
+@lru_cache
+def get_image_pipeline() -> ImagePipeline:
+    settings: FaceImageSettings = get_face_image_settings()
+    executor = None
+    if settings.FACE_IMAGE_WORKERS > 0:
+        # Forking a process that already runs threads can deadlock the children
+        executor = ProcessPoolExecutor(settings.FACE_IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return ImagePipeline(settings, get_quality_screen(), executor)
+
+
+ImagePipelineDependency = Annotated[ImagePipeline, Depends(get_image_pipeline)]
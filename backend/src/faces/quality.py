@@ -0,0 +1,125 @@
+from collections import Counter
+from functools import lru_cache
+from io import BytesIO
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+from pydantic import BaseModel
+
+from faces.config import FaceQualitySettings, get_face_quality_settings
+from faces.exceptions import (
+    BadExposureError,
+    BlurryImageError,
+    FaceProcessingError,
+    ImageDecodeError,
+    LowContrastError,
+    ResolutionTooLowError,
+)
+
+
+class QualityReport(BaseModel):
+    width: int
+    height: int
+    sharpness: float
+    brightness: float
+    contrast: float
+
+
+def measure_quality(image: bytes, analysis_size: int = 640) -> QualityReport:
+    """Decode the image and measure what decides whether a face can be found on it.
+
+    Sharpness is the variance of the Laplacian, brightness the mean and contrast
+    the standard deviation of the grayscale image, all on 0-255 pixel values
+    after downscaling to `analysis_size` so they don't depend on the upload size.
+    """
+    try:
+        with Image.open(BytesIO(image)) as img:
+            width, height = img.size
+            # Lets the JPEG decoder scale down while decoding instead of after
+            img.draft("L", (analysis_size, analysis_size))
+            return measure_decoded(img, width, height, analysis_size)
+    except (UnidentifiedImageError, OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageDecodeError("Failed to decode image") from e
+
+
+def measure_decoded(img: Image.Image, width: int, height: int, analysis_size: int = 640) -> QualityReport:
+    """`measure_quality` of an already decoded image whose original size was `width`x`height`"""
+    return measure_pixels(grayscale(img, analysis_size), width, height)
+
+
+def grayscale(img: Image.Image, analysis_size: int = 640) -> np.ndarray:
+    """0-255 grayscale pixels of the image downscaled to fit `analysis_size`"""
+    gray = img.convert("L")
+    gray.thumbnail((analysis_size, analysis_size))
+    return np.asarray(gray, dtype=np.float32)
+
+
+def measure_pixels(pixels: np.ndarray, width: int, height: int) -> QualityReport:
+    laplacian = pixels[:-2, 1:-1] + pixels[2:, 1:-1] + pixels[1:-1, :-2] + pixels[1:-1, 2:] - 4 * pixels[1:-1, 1:-1]
+    return QualityReport(
+        width=width,
+        height=height,
+        sharpness=float(laplacian.var()) if laplacian.size else 0.0,
+        brightness=float(pixels.mean()),
+        contrast=float(pixels.std()),
+    )
+
+
+class QualityScreen:
+    """Rejects frames that are certain to fail before they cost an upstream call"""
+
+    def __init__(self, settings: FaceQualitySettings):
+        self.settings = settings
+        self._checked = 0
+        self._rejected: Counter[str] = Counter()
+        self._upstream_calls_saved = 0
+
+    def enforce(self, report: QualityReport, upstream_calls: int = 1) -> None:
+        """Raise a FaceProcessingError for a hopeless image.
+
+        `upstream_calls` is how many calls the caller would have made with it,
+        counted as saved when the image is rejected.
+        """
+        if not self.settings.FACE_QUALITY_SCREEN_ENABLED:
+            return
+
+        try:
+            self.validate(report)
+        except FaceProcessingError as e:
+            self.reject(e, upstream_calls)
+            raise
+        self._checked += 1
+
+    def reject(self, error: FaceProcessingError, upstream_calls: int = 1) -> None:
+        self._checked += 1
+        self._rejected[getattr(error, "reason", "other")] += 1
+        self._upstream_calls_saved += upstream_calls
+
+    def validate(self, report: QualityReport) -> None:
+        settings = self.settings
+        if min(report.width, report.height) < settings.FACE_QUALITY_MIN_RESOLUTION:
+            raise ResolutionTooLowError(
+                f"Image is {report.width}x{report.height}, "
+                f"its shorter edge must be at least {settings.FACE_QUALITY_MIN_RESOLUTION} pixels"
+            )
+        if report.brightness < settings.FACE_QUALITY_MIN_BRIGHTNESS:
+            raise BadExposureError("Image is too dark")
+        if report.brightness > settings.FACE_QUALITY_MAX_BRIGHTNESS:
+            raise BadExposureError("Image is overexposed")
+        if report.contrast < settings.FACE_QUALITY_MIN_CONTRAST:
+            raise LowContrastError("Image has too little contrast")
+        if report.sharpness < settings.FACE_QUALITY_MIN_SHARPNESS:
+            raise BlurryImageError("Image is too blurry")
+
+    def stats(self) -> dict:
+        return {
+            "checked": self._checked,
+            "rejected": sum(self._rejected.values()),
+            "rejected_by_reason": dict(self._rejected),
+            "upstream_calls_saved": self._upstream_calls_saved,
+        }
+
+
+@lru_cache
+def get_quality_screen() -> QualityScreen:
+    return QualityScreen(get_face_quality_settings())
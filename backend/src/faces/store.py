@@ -0,0 +1,352 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from faces.embeddings import normalize
+
+logger = logging.getLogger(__name__)
+
+STORE_DTYPE = np.float16
+ID_DTYPE = np.int64
+
+
+class EmbeddingStore(ABC):
+    """Append-only gallery of L2-normalized float16 face embeddings.
+
+    Every write appends a row. Re-enrolling an id appends its new embedding and
+    tombstones the old row, deleting only tombstones, so row numbers stay
+    stable until `compact` rewrites the gallery as a new `generation`.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.generation = 0
+        self._reset()
+
+    @property
+    @abstractmethod
+    def vectors(self) -> np.ndarray:
+        """(rows, dim) embeddings, including tombstoned rows"""
+
+    @property
+    @abstractmethod
+    def ids(self) -> np.ndarray:
+        """Owner id of every row"""
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def row(self, id: int) -> int | None:
+        return self._rows.get(id)
+
+    def live_rows(self) -> np.ndarray:
+        return np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+
+    @abstractmethod
+    def append(self, id: int, vector: np.ndarray) -> tuple[int, int | None]:
+        """Store the embedding of `id`, returning its row and the row it replaced"""
+
+    @abstractmethod
+    def delete(self, id: int) -> int | None:
+        """Tombstone the row of `id`, returning it"""
+
+    @abstractmethod
+    def seed(self, ids: np.ndarray, vectors: np.ndarray) -> bool:
+        """Bulk load an empty store, returning False if it already had rows"""
+
+    def refresh(self) -> tuple[list[int], list[int]]:
+        """Return the rows added and removed since the last call, including other processes' writes.
+
+        A different `generation` afterwards means the store was compacted and
+        all row numbers changed.
+        """
+        changes = self._added, self._removed
+        self._added, self._removed = [], []
+        return changes
+
+    def compact(self, min_dead_ratio: float = 0.0) -> bool:
+        """Rewrite the live rows, dropping tombstones, once they make up `min_dead_ratio`"""
+        return False
+
+    def stats(self) -> dict:
+        rows = len(self._alive)
+        return {
+            "generation": self.generation,
+            "rows": rows,
+            "live": len(self._rows),
+            "tombstones": rows - len(self._rows),
+        }
+
+    def _reset(self) -> None:
+        self._rows: dict[int, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._added: list[int] = []
+        self._removed: list[int] = []
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        return normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)).astype(STORE_DTYPE)
+
+    def _dead_ratio(self) -> float:
+        return 1 - len(self._rows) / len(self._alive) if len(self._alive) else 0.0
+
+    def _track(self, start: int, ids: np.ndarray, tombstones: np.ndarray) -> None:
+        """Update the id-to-row index with appended rows and tombstones"""
+        if len(ids):
+            alive = np.zeros(start + len(ids), dtype=bool)
+            alive[: len(self._alive)] = self._alive
+            alive[start:] = True
+            self._alive = alive
+
+        self._added.extend(range(start, start + len(ids)))
+        for row, id in enumerate(ids.tolist(), start):
+            self._rows[id] = row
+
+        for row in tombstones.tolist():
+            if self._alive[row]:
+                self._alive[row] = False
+                self._removed.append(row)
+                id = int(self.ids[row])
+                if self._rows.get(id) == row:
+                    del self._rows[id]
+
+
+class MemoryEmbeddingStore(EmbeddingStore):
+    """Process-local store, rebuilt from the database on every start"""
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+        self._vectors = np.empty((0, dim), dtype=STORE_DTYPE)
+        self._ids = np.empty(0, dtype=ID_DTYPE)
+        self._size = 0
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: self._size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[: self._size]
+
+    def append(self, id: int, vector: np.ndarray) -> tuple[int, int | None]:
+        replaced = self.row(id)
+        row = self._size
+        if row == len(self._ids):
+            self._vectors = np.concatenate([self._vectors, np.empty((max(row, 16), self.dim), STORE_DTYPE)])
+            self._ids = np.concatenate([self._ids, np.empty(max(row, 16), ID_DTYPE)])
+        self._vectors[row] = self._encode(vector)[0]
+        self._ids[row] = id
+        self._size += 1
+        self._track(row, np.array([id]), np.array([] if replaced is None else [replaced]))
+        return row, replaced
+
+    def delete(self, id: int) -> int | None:
+        row = self.row(id)
+        if row is not None:
+            self._track(self._size, np.empty(0, ID_DTYPE), np.array([row]))
+        return row
+
+    def seed(self, ids: np.ndarray, vectors: np.ndarray) -> bool:
+        if self._size:
+            return False
+        self._vectors = self._encode(vectors)
+        self._ids = np.asarray(ids, dtype=ID_DTYPE)
+        self._size = len(self._ids)
+        self._track(0, self._ids, np.empty(0, ID_DTYPE))
+        return True
+
+
+class MappedEmbeddingStore(EmbeddingStore):
+    """Store kept in a directory and memory-mapped read-only.
+
+    Each generation is three append-only files: float16 vectors, the owner id
+    of every row and tombstoned row numbers. Processes mapping the same
+    directory share the vector pages through the OS page cache; writes and
+    compaction are serialized with an exclusive `flock`, and `refresh` reads
+    what other processes appended since the last call. Compaction writes the
+    next generation and switches `CURRENT` with an atomic rename. A writer
+    that died mid-append leaves a partial row behind, which the next writer
+    cuts off before appending so vectors and ids stay aligned.
+    """
+
+    def __init__(self, path: Path, dim: int):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._thread_lock = threading.Lock()
+        super().__init__(dim)
+        self._vectors = np.empty((0, dim), dtype=STORE_DTYPE)
+        self._ids = np.empty(0, dtype=ID_DTYPE)
+        self._tombstones_read = 0
+        with self._locked():
+            if not (self.path / "CURRENT").exists():
+                self._switch(0)
+            self.generation = self._current_generation()
+            self._repair()
+            self._load()
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids
+
+    def append(self, id: int, vector: np.ndarray) -> tuple[int, int | None]:
+        encoded = self._encode(vector)
+        with self._locked():
+            self._refresh()
+            self._repair()
+            replaced = self.row(id)
+            row = len(self._ids)
+            self._write("vectors", encoded)
+            self._write("ids", np.array([id], dtype=ID_DTYPE))
+            if replaced is not None:
+                self._write("tombstones", np.array([replaced], dtype=ID_DTYPE))
+            self._refresh()
+        return row, replaced
+
+    def delete(self, id: int) -> int | None:
+        with self._locked():
+            self._refresh()
+            row = self.row(id)
+            if row is not None:
+                self._repair()
+                self._write("tombstones", np.array([row], dtype=ID_DTYPE))
+                self._refresh()
+        return row
+
+    def seed(self, ids: np.ndarray, vectors: np.ndarray) -> bool:
+        with self._locked():
+            self._refresh()
+            if len(self._ids):
+                return False
+            self._repair()
+            self._write("vectors", self._encode(vectors))
+            self._write("ids", np.asarray(ids, dtype=ID_DTYPE))
+            self._refresh()
+        return True
+
+    def refresh(self) -> tuple[list[int], list[int]]:
+        with self._locked(fcntl.LOCK_SH):
+            self._refresh()
+            return super().refresh()
+
+    def compact(self, min_dead_ratio: float = 0.0) -> bool:
+        with self._locked():
+            self._refresh()
+            if self._dead_ratio() <= min_dead_ratio:
+                return False
+
+            generation = self.generation + 1
+            for name in ("vectors", "ids", "tombstones"):
+                # Leftovers of a compaction that crashed before switching over
+                self._file(name, generation).unlink(missing_ok=True)
+
+            live = np.sort(self.live_rows())
+            for start in range(0, len(live), 65536):
+                rows = live[start : start + 65536]
+                self._write("vectors", np.asarray(self._vectors[rows]), generation)
+                self._write("ids", self._ids[rows], generation)
+            for name in ("vectors", "ids", "tombstones"):
+                self._file(name, generation).touch()
+                with open(self._file(name, generation), "rb+") as f:
+                    os.fsync(f.fileno())
+
+            previous = self.generation
+            self._switch(generation)
+            self._load()
+
+            # Processes still mapping the old files keep their pages until they refresh
+            for name in ("vectors", "ids", "tombstones"):
+                self._file(name, previous).unlink(missing_ok=True)
+
+        logger.info(f"Compacted face embedding store to generation {generation} ({len(live)} rows)")
+        return True
+
+    def stats(self) -> dict:
+        return {**super().stats(), "bytes": self._file("vectors", self.generation).stat().st_size}
+
+    @contextmanager
+    def _locked(self, operation: int = fcntl.LOCK_EX) -> Iterator[None]:
+        # flock excludes other processes, threads of this one take the thread lock first
+        with self._thread_lock, open(self.path / "LOCK", "a") as lock_file:
+            fcntl.flock(lock_file, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _file(self, name: str, generation: int) -> Path:
+        suffix = "f16" if name == "vectors" else "i64"
+        return self.path / f"{name}-{generation}.{suffix}"
+
+    def _write(self, name: str, data: np.ndarray, generation: int | None = None) -> None:
+        with open(self._file(name, self.generation if generation is None else generation), "ab") as f:
+            f.write(np.ascontiguousarray(data).tobytes())
+
+    def _repair(self) -> None:
+        """Cut the current generation's files back to their last complete row"""
+        id_size = np.dtype(ID_DTYPE).itemsize
+        vector_size = np.dtype(STORE_DTYPE).itemsize * self.dim
+        rows = min(self._size("vectors") // vector_size, self._size("ids") // id_size)
+        self._truncate("vectors", rows * vector_size)
+        self._truncate("ids", rows * id_size)
+        self._truncate("tombstones", self._size("tombstones") // id_size * id_size)
+
+    def _size(self, name: str) -> int:
+        file = self._file(name, self.generation)
+        return file.stat().st_size if file.exists() else 0
+
+    def _truncate(self, name: str, size: int) -> None:
+        if self._size(name) > size:
+            logger.warning(f"Dropping a partially written {name} row from the face embedding store at {self.path}")
+            os.truncate(self._file(name, self.generation), size)
+
+    def _switch(self, generation: int) -> None:
+        current = self.path / "CURRENT.tmp"
+        current.write_text(json.dumps({"generation": generation, "dim": self.dim}))
+        os.replace(current, self.path / "CURRENT")
+
+    def _current_generation(self) -> int:
+        current = json.loads((self.path / "CURRENT").read_text())
+        if current["dim"] != self.dim:
+            raise ValueError(f"Store at {self.path} holds {current['dim']}-dimensional embeddings, not {self.dim}")
+        return current["generation"]
+
+    def _load(self) -> None:
+        self.generation = self._current_generation()
+        self._reset()
+        self._ids = np.empty(0, dtype=ID_DTYPE)
+        self._tombstones_read = 0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        if self._current_generation() != self.generation:
+            self._load()
+            return
+
+        start = len(self._ids)
+        # Rows are complete once both their vector and id are written
+        vectors = self._map("vectors", STORE_DTYPE, self.dim)
+        ids = self._map("ids", ID_DTYPE)
+        rows = min(len(vectors), len(ids))
+        self._ids, self._vectors = ids[:rows], vectors[:rows]
+        tombstones = self._map("tombstones", ID_DTYPE)[self._tombstones_read :]
+        self._tombstones_read += len(tombstones)
+        self._track(start, self._ids[start:], tombstones)
+
+    def _map(self, name: str, dtype: np.dtype, width: int = 1) -> np.ndarray:
+        file = self._file(name, self.generation)
+        rows = self._size(name) // (np.dtype(dtype).itemsize * width)
+        shape = (rows, width) if width > 1 else (rows,)
+        if rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(file, dtype=dtype, mode="r", shape=shape)
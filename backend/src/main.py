@@ -1,20 +1,118 @@
+import asyncio
+import logging
+import secrets
+import time
+from contextlib import asynccontextmanager
+from typing import Annotated
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from aws.config import get_aws_client_settings
+from aws.registry import AWSClientRegistry
 from clients.routes import router as clients_router
-from core.config import get_settings
+from cognito.cache import get_profile_cache
+from core.config import SettingsDependency, get_settings
+from core.db import engine
+from core.deadline import DeadlineMiddleware
+from core.exceptions import DeadlineExceededError, ServiceUnavailableError
+from core.metrics import metrics
+from core.uploads import MULTIPART_OVERHEAD, BodySizeLimitMiddleware, get_image_budget
 from core.tags import tags_metadata, Tags
+from faces.normalize import get_image_pipeline
+from faces.quality import get_quality_screen
 from registration.routes import router as registration_router
+from rekognition.config import RekognitionSettings, get_rekognition_settings
+from rekognition.service import get_compare_faces_hedging, get_local_embedding_backend
+from users.repo import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+async def load_face_index() -> None:
+    backend = get_local_embedding_backend()
+    async with AsyncSession(engine) as session:
+        size = await backend.load_index(UserRepository(session).iter_face_embeddings())
+    logger.info(f"Loaded {size} face embeddings into the identification index")
+    metrics.register("face_index", backend.index.stats)
+
+
+async def maintain_face_index(settings: RekognitionSettings) -> None:
+    """Pick up other workers' registrations and compact the store in the background"""
+    backend = get_local_embedding_backend()
+    index = backend.index
+    compacted_at = time.monotonic()
+    while True:
+        await asyncio.sleep(settings.FACE_INDEX_SYNC_INTERVAL)
+        try:
+            if settings.FACE_STORE_PATH is None:
+                # The in-memory store only sees this worker's writes, the database has everyone's
+                async with AsyncSession(engine) as session:
+                    await backend.resync(UserRepository(session).iter_face_embeddings())
+            else:
+                await asyncio.to_thread(index.sync)
+            if time.monotonic() - compacted_at >= settings.FACE_STORE_COMPACTION_INTERVAL:
+                compacted_at = time.monotonic()
+                await asyncio.to_thread(index.compact, settings.FACE_STORE_COMPACTION_RATIO)
+        except Exception:
+            logger.exception("Face index maintenance failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.aws_clients = AWSClientRegistry.from_settings(get_aws_client_settings())
+    app.state.aws_clients.warm_up()
+    metrics.register("upstreams", app.state.aws_clients.stats)
+    metrics.register("face_quality", get_quality_screen().stats)
+    metrics.register("image_budget", get_image_budget().stats)
+    metrics.register("profile_cache", get_profile_cache().stats)
+    hedging = get_compare_faces_hedging()
+    if hedging is not None:
+        metrics.register("compare_faces_hedging", hedging.stats)
+
+    maintenance = None
+    rekognition_settings = get_rekognition_settings()
+    if rekognition_settings.REKOGNITION_BACKEND == "local":
+        await load_face_index()
+        maintenance = asyncio.create_task(maintain_face_index(rekognition_settings))
+
+    yield
+
+    if maintenance is not None:
+        maintenance.cancel()
+    metrics.unregister("face_index")
+    metrics.unregister("face_quality")
+    metrics.unregister("image_budget")
+    metrics.unregister("compare_faces_hedging")
+    metrics.unregister("profile_cache")
+    get_image_pipeline().shutdown()
+    metrics.unregister("upstreams")
+    await app.state.aws_clients.aclose()
+
 
 app = FastAPI(
     title="Authentication API",
     description="API for handling user authentication and registration",
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
 )
 
 settings = get_settings()
 
+app.add_middleware(
+    DeadlineMiddleware,
+    default_timeout=settings.REQUEST_TIMEOUT,
+    route_timeouts=settings.ROUTE_TIMEOUTS,
+)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    route_limits={"/registration/signin_via_face_burst": settings.MAX_BURST_UPLOAD_SIZE + MULTIPART_OVERHEAD},
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
@@ -27,6 +125,21 @@ app.include_router(registration_router, prefix="/registration")
 app.include_router(clients_router, prefix="/clients")
 
 
+@app.exception_handler(ServiceUnavailableError)
+async def service_unavailable_handler(request: Request, exc: ServiceUnavailableError) -> JSONResponse:
+    headers = {"Retry-After": str(exc.retry_after)} if exc.retry_after is not None else None
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers=headers,
+    )
+
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> JSONResponse:
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+
 @app.get("/")
 async def root():
     return "Welcome!"
@@ -37,6 +150,21 @@ async def health():
     return {"status": "ok"}
 
 
+def require_metrics_token(
+    settings: SettingsDependency,
+    credentials: Annotated[HTTPAuthorizationCredentials | None, Depends(HTTPBearer(auto_error=False))],
+) -> None:
+    if settings.METRICS_TOKEN is None:
+        return
+    if credentials is None or not secrets.compare_digest(credentials.credentials, settings.METRICS_TOKEN):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+
+
+@app.get("/metrics", tags=[Tags.HEALTH], dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
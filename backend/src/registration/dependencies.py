@@ -1,13 +1,23 @@
 import logging
+from collections.abc import AsyncIterator
 from typing import Optional
 
-from fastapi import Depends
+from fastapi import Depends, File, Form, Header, UploadFile
 from fastapi.exceptions import HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security.utils import get_authorization_scheme_param
 from starlette.requests import Request
-from starlette.status import HTTP_403_FORBIDDEN
-
+from starlette.status import HTTP_403_FORBIDDEN, HTTP_422_UNPROCESSABLE_CONTENT
+
+from core.config import SettingsDependency
+from core.uploads import (
+    MJPEG_CONTENT_TYPES,
+    ImageBudgetDependency,
+    expected_body_size,
+    read_body,
+    read_upload,
+)
+from faces.burst import split_mjpeg
 from registration.schemas import CookieProfile
 from tokens.utils import decode_jwt
 
@@ -107,12 +117,109 @@ CookieBearerTokenDependency = Annotated[
 def get_user_from_cookie(token: CookieBearerTokenDependency) -> CookieProfile:
     try:
         encrypted_token = decode_jwt(token.credentials)
-        return CookieProfile(
+        profile = CookieProfile(
             email=encrypted_token["email"],
         )
     except Exception as e:
         logger.error(f"Error decoding token: {e}")
         raise HTTPException(status_code=403, detail=str(e)) from e
 
+    # Other tokens signed with the same key, e.g. face validation tickets, are no identity
+    if encrypted_token.get("token_type") != "access":
+        raise HTTPException(status_code=403, detail="Not an identity token")
+    return profile
+
 
 UserFromCookieDependency = Annotated[CookieProfile, Depends(get_user_from_cookie)]
+
+
+def upload_size(file: UploadFile, max_size: int) -> int:
+    return min(file.size, max_size) if file.size is not None else max_size
+
+
+async def read_image_upload(
+    request: Request,
+    settings: SettingsDependency,
+    budget: ImageBudgetDependency,
+    image: Annotated[UploadFile | None, File(description="Or send the image as a raw image/jpeg body")] = None,
+) -> AsyncIterator[bytes]:
+    """The face image, from a multipart `image` file or a raw image body.
+
+    Its bytes count against the worker's image budget until the request is done.
+    """
+    if image is not None:
+        async with budget.reserve(upload_size(image, settings.MAX_IMAGE_SIZE)):
+            yield await read_upload(image, settings.MAX_IMAGE_SIZE)
+        return
+
+    async with budget.reserve(expected_body_size(request, settings.MAX_IMAGE_SIZE)):
+        yield await read_body(request, settings.MAX_IMAGE_SIZE)
+
+
+ImageUploadDependency = Annotated[bytes, Depends(read_image_upload)]
+
+
+async def read_face_frames(
+    request: Request,
+    settings: SettingsDependency,
+    budget: ImageBudgetDependency,
+    image: Annotated[
+        list[UploadFile] | None,
+        File(description="One or more frames of the same login, or a single raw image/jpeg body"),
+    ] = None,
+) -> AsyncIterator[list[bytes]]:
+    """Frames of a face login, from repeated multipart `image` files or a raw image body"""
+    if not image:
+        async with budget.reserve(expected_body_size(request, settings.MAX_IMAGE_SIZE)):
+            yield [await read_body(request, settings.MAX_IMAGE_SIZE)]
+        return
+
+    if len(image) > settings.FACE_SIGNIN_MAX_FRAMES:
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"At most {settings.FACE_SIGNIN_MAX_FRAMES} frames can be sent at once",
+        )
+
+    async with budget.reserve(sum(upload_size(frame, settings.MAX_IMAGE_SIZE) for frame in image)):
+        yield [await read_upload(frame, settings.MAX_IMAGE_SIZE) for frame in image]
+
+
+FaceFramesDependency = Annotated[list[bytes], Depends(read_face_frames)]
+
+
+async def read_burst_frames(
+    request: Request,
+    settings: SettingsDependency,
+    budget: ImageBudgetDependency,
+    image: Annotated[
+        list[UploadFile] | None, File(description="Frames of a short burst, or a raw MJPEG clip body")
+    ] = None,
+) -> AsyncIterator[list[bytes]]:
+    """Frames of a best-shot login, from repeated multipart `image` files or a raw MJPEG clip"""
+    if not image:
+        async with budget.reserve(expected_body_size(request, settings.MAX_BURST_UPLOAD_SIZE)):
+            clip = await read_body(request, settings.MAX_BURST_UPLOAD_SIZE, MJPEG_CONTENT_TYPES)
+            yield split_mjpeg(clip, settings.FACE_BURST_MAX_FRAMES)
+        return
+
+    if len(image) > settings.FACE_BURST_MAX_FRAMES:
+        raise HTTPException(
+            status_code=HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"At most {settings.FACE_BURST_MAX_FRAMES} frames can be sent at once",
+        )
+
+    async with budget.reserve(sum(upload_size(frame, settings.MAX_IMAGE_SIZE) for frame in image)):
+        yield [await read_upload(frame, settings.MAX_IMAGE_SIZE) for frame in image]
+
+
+BurstFramesDependency = Annotated[list[bytes], Depends(read_burst_frames)]
+
+
+def get_face_ticket(
+    ticket: str | None = Form(None, description="Ticket from /validate_face for this image"),
+    x_face_ticket: str | None = Header(None, description="The ticket, when the image is sent as a raw body"),
+) -> str | None:
+    return ticket or x_face_ticket
+
+
+FaceTicketDependency = Annotated[str | None, Depends(get_face_ticket)]
@@ -6,3 +6,7 @@ class FaceVerificationNotEnabledError(ServiceError):
     """Raised when face verification is not enabled for a user"""
 
     pass
+
+
+class InvalidFaceTicketError(ServiceError):
+    """Raised when a face validation ticket is expired, forged or issued for another image or user"""
@@ -1,12 +1,21 @@
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
+import uuid
+
+from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import JSONResponse
 
 import tokens as token_utils
 from cognito.user_dependency import CurrentUserDependency
 from core.tags import Tags
+from enrollments.exceptions import EnrollmentJobNotFoundError
+from enrollments.models import EnrollmentStatus
+from enrollments.service import EnrollmentServiceDependency
 from registration.decorators import protected_route
 from registration.dependencies import (
     PERSON_IDENTITY_COOKIE_NAME,
+    BurstFramesDependency,
+    FaceFramesDependency,
+    FaceTicketDependency,
+    ImageUploadDependency,
     UserFromCookieDependency,
 )
 from registration.exceptions import ServiceError
@@ -19,7 +28,9 @@ from registration.service import (
     GetUserProfileCommandDependency,
     RegisterUserCommandDependency,
     RegisterUserFaceCommandDependency,
+    SigninViaFaceBurstCommandDependency,
     SigninViaFaceCommandDependency,
+    SigninViaFaceOnlyCommandDependency,
     SigninViaPasswordCommandDependency,
 )
 from users.schemas import CreateUser
@@ -98,15 +109,32 @@ async def signin(
     return response
 
 
+@router.post("/validate_face", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
+@protected_route
+async def validate_face(
+    register_face_command: RegisterUserFaceCommandDependency,
+    current_user: CurrentUserDependency,
+    image: ImageUploadDependency,
+) -> JSONResponse:
+    """Check a face image can be registered, returning a ticket for registering that same image."""
+    ticket = await register_face_command.validate(current_user.email, image)
+
+    return JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={"ticket": ticket, "expires_in": register_face_command.ticket_ttl},
+    )
+
+
 @router.post("/register_user_face", status_code=status.HTTP_201_CREATED, tags=[Tags.DIRECT_AUTH])
 @protected_route
 async def register_user_face(
     register_face_command: RegisterUserFaceCommandDependency,
     current_user: CurrentUserDependency,
-    image: UploadFile = File(...),
+    image: ImageUploadDependency,
+    ticket: FaceTicketDependency,
 ) -> JSONResponse:
-    image_bytes = await image.read()
-    await register_face_command.execute(current_user.email, image_bytes)
+    """Register the user's face, skipping face detection when a /validate_face ticket for the image is sent."""
+    await register_face_command.execute(current_user.email, image, ticket)
 
     response = JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -125,15 +153,60 @@ async def register_user_face(
     return response
 
 
+@router.post("/register_user_face_async", status_code=status.HTTP_202_ACCEPTED, tags=[Tags.DIRECT_AUTH])
+@protected_route
+async def register_user_face_async(
+    enrollments: EnrollmentServiceDependency,
+    current_user: CurrentUserDependency,
+    image: ImageUploadDependency,
+    request: Request,
+) -> JSONResponse:
+    """Queue the user's face for registration by the enrollment worker, poll the returned job for the outcome."""
+    job = await enrollments.enqueue(current_user.email, image)
+    status_url = request.url_for("get_face_enrollment", job_id=job.id)
+
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={**job.model_dump(mode="json"), "status_url": str(status_url)},
+        headers={"Location": str(status_url)},
+    )
+
+
+@router.get("/face_enrollments/{job_id}", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
+async def get_face_enrollment(
+    job_id: uuid.UUID,
+    enrollments: EnrollmentServiceDependency,
+    current_user: CurrentUserDependency,
+) -> JSONResponse:
+    """Status of a queued face registration, sets the identity cookie once it succeeded."""
+    try:
+        job = await enrollments.get(job_id, current_user.email)
+    except EnrollmentJobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e)) from e
+
+    response = JSONResponse(status_code=status.HTTP_200_OK, content=job.model_dump(mode="json"))
+    if job.status == EnrollmentStatus.SUCCEEDED:
+        cookie = token_utils.generate_access_token(payload={"email": current_user.email})
+        response.set_cookie(
+            key=PERSON_IDENTITY_COOKIE_NAME,
+            value=f"Bearer {cookie.token}",
+            httponly=True,
+            secure=True,
+            expires=cookie.expires_in,
+        )
+
+    return response
+
+
 @router.post("/signin_via_face", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
 @protected_route
 async def signin_via_face(
     signin_via_face_command: SigninViaFaceCommandDependency,
     user: UserFromCookieDependency,
-    image: UploadFile = File(...),
+    frames: FaceFramesDependency,
 ) -> JSONResponse:
-    image_bytes = await image.read()
-    credentials = await signin_via_face_command.execute(user.email, image_bytes)
+    """Sign in by face, logging in on the first of the sent frames that matches."""
+    credentials = await signin_via_face_command.execute(user.email, *frames)
 
     response = JSONResponse(
         status_code=status.HTTP_200_OK,
@@ -158,6 +231,76 @@ async def signin_via_face(
     return response
 
 
+@router.post("/signin_via_face_burst", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
+@protected_route
+async def signin_via_face_burst(
+    signin_via_face_burst_command: SigninViaFaceBurstCommandDependency,
+    user: UserFromCookieDependency,
+    frames: BurstFramesDependency,
+) -> JSONResponse:
+    """Sign in by face from a short burst, comparing only the best-scored frames.
+
+    The response reports the frames that were compared with their scores, and
+    why the others were dropped.
+    """
+    credentials, selection = await signin_via_face_burst_command.execute(user.email, frames)
+
+    response = JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "message": "Login successful",
+            "access_token": credentials["AuthenticationResult"]["AccessToken"],
+            "refresh_token": credentials["AuthenticationResult"]["RefreshToken"],
+            "expires_in": credentials["AuthenticationResult"]["ExpiresIn"],
+            "token_type": credentials["AuthenticationResult"]["TokenType"],
+            "best_shot": selection.model_dump(mode="json"),
+        },
+    )
+
+    cookie = token_utils.generate_access_token(payload={"email": user.email})
+    response.set_cookie(
+        key=PERSON_IDENTITY_COOKIE_NAME,
+        value=f"Bearer {cookie.token}",
+        httponly=True,
+        secure=True,
+        expires=cookie.expires_in,
+    )
+
+    return response
+
+
+@router.post("/signin_via_face_only", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
+@protected_route
+async def signin_via_face_only(
+    signin_via_face_only_command: SigninViaFaceOnlyCommandDependency,
+    image: ImageUploadDependency,
+) -> JSONResponse:
+    """Sign in by face without the identity cookie, matching against all registered users."""
+    email, credentials = await signin_via_face_only_command.execute(image)
+
+    response = JSONResponse(
+        status_code=status.HTTP_200_OK,
+        content={
+            "message": "Login successful",
+            "access_token": credentials["AuthenticationResult"]["AccessToken"],
+            "refresh_token": credentials["AuthenticationResult"]["RefreshToken"],
+            "expires_in": credentials["AuthenticationResult"]["ExpiresIn"],
+            "token_type": credentials["AuthenticationResult"]["TokenType"],
+        },
+    )
+
+    cookie = token_utils.generate_access_token(payload={"email": email})
+    response.set_cookie(
+        key=PERSON_IDENTITY_COOKIE_NAME,
+        value=f"Bearer {cookie.token}",
+        httponly=True,
+        secure=True,
+        expires=cookie.expires_in,
+    )
+
+    return response
+
+
 @router.get("/me", status_code=status.HTTP_200_OK, tags=[Tags.DIRECT_AUTH])
 @protected_route
 async def get_user_profile(
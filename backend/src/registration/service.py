@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 from typing import Annotated, Any
@@ -10,15 +11,45 @@ import s3.exceptions as s3_exceptions
 from clients import exceptions as client_exceptions
 from clients.service import ClientService, ClientServiceDependency
 from cognito.service import CognitoTokenService, CognitoTokenServiceDependency
-from core.exceptions import UnitOfWorkError
+from core.config import SettingsDependency
+from core.exceptions import ServiceUnavailableError, UnitOfWorkError
 from core.unit_of_work import UnitOfWork, UnitOfWorkDependency
+from faces.burst import BurstSelection
+from faces.exceptions import FaceProcessingError
+from faces.normalize import ImagePipeline, ImagePipelineDependency
 from registration.exceptions import ServiceError
+from registration.tickets import FaceTicket, image_digest, issue_face_ticket, verify_face_ticket
+from rekognition.schemas import FaceEnrollment, FaceReference
 from rekognition.service import RekognitionService, RekognitionServiceDependency
 from s3.service import S3Service, S3ServiceDependency
 from users.exceptions import UserNotFoundError
 from users.models import User
 from users.repo import UserRepository, UserRepositoryDependency
 
+logger = logging.getLogger(__name__)
+
+FACE_VERIFIED_ANSWER = "face_verified"
+
+
+async def normalize_image(images: ImagePipeline | None, image: bytes, upstream_calls: int) -> bytes:
+    """Return the image to send upstream, rejecting one that can't pass face detection before any call"""
+    if images is None:
+        return image
+
+    try:
+        return await images.normalize(image, upstream_calls)
+    except FaceProcessingError as e:
+        raise ServiceError(f"Image rejected: {e}") from e
+
+
+def face_reference(user: User) -> FaceReference:
+    return FaceReference(
+        key=user.s3_face_image_key,
+        user_id=user.id,
+        face_id=user.face_id,
+        embedding=user.face_embedding,
+    )
+
 
 class RegisterCommand(ABC):
     @abstractmethod
@@ -36,7 +67,7 @@ class RegisterUserCommand(RegisterCommand):
         async with self.uow:
             user = await self.users.create(user_data)
             try:
-                self.cognito.signup(user_data["email"], user_data["password"])
+                await self.cognito.signup(user_data["email"], user_data["password"])
             except cognito_exceptions.SignUpError as e:
                 raise ServiceError(f"Cognito signup failed: {e}") from e
 
@@ -67,7 +98,7 @@ class RegisterUserToClientCommand(RegisterCommand):
 
             try:
                 await self.clients.link_user_to_client(user_data["client_id"], user.id)
-                self.cognito.signup(user_data["email"], user_data["password"])
+                await self.cognito.signup(user_data["email"], user_data["password"])
 
             except client_exceptions.ClientNotFoundError as e:
                 raise ServiceError(f"Client does not exist: {e}") from e
@@ -101,6 +132,8 @@ class RegisterUserFaceCommand(RegisterCommand):
         rekognition: RekognitionService,
         s3: S3Service,
         max_image_size: int = 10 * 1024 * 1024,
+        images: ImagePipeline | None = None,
+        ticket_ttl: int = 300,
     ):
         self.uow = uow
         self.cognito = cognito
@@ -108,40 +141,97 @@ class RegisterUserFaceCommand(RegisterCommand):
         self.rekognition = rekognition
         self.s3 = s3
         self.max_image_size = max_image_size
+        self.images = images
+        self.ticket_ttl = ticket_ttl
 
-    async def execute(self, email: str, image: bytes) -> User:
-        try:
-            return await self.register_face(email, image)
-        except UnitOfWorkError as e:
-            await self.rollback(email)
-            raise ServiceError(f"Failed to register user face: {e}") from e
+    async def execute(self, email: str, image: bytes, ticket: str | None = None) -> User:
+        return await self.register_face(email, image, ticket)
 
-    async def register_face(self, email: str, image: bytes) -> User:
+    async def validate(self, email: str, image: bytes) -> str:
+        """Detect and validate the face, returning a ticket that lets `execute` skip doing it again"""
+        digest = await image_digest(image)
+        # A rejected image saves DetectFaces
+        _, bounding_box = await self.inspect_face(image, upstream_calls=1)
+        return issue_face_ticket(FaceTicket(email=email, digest=digest, bounding_box=bounding_box), self.ticket_ttl)
+
+    async def inspect_face(self, image: bytes, upstream_calls: int) -> tuple[bytes, dict]:
+        """Normalize the image and check it holds exactly one usable face, returning its bounding box"""
         if len(image) > self.max_image_size:
             raise s3_exceptions.ImageTooLargeError("Image is too large")
 
+        image = await normalize_image(self.images, image, upstream_calls)
+
         try:
-            face_details = self.rekognition.detect_face_details(image)
+            face_details = await self.rekognition.detect_face_details(image)
             self.validate_face_on_registration(face_details)
         except rekognition_exceptions.RekognitionClientError as e:
             raise ServiceError(f"Failed to register user face: {e}") from e
 
-        async with self.uow:
-            user = await self.users.get_by_email(email)
-            await self.users.update(user.id, {"face_image_key": user.s3_face_image_key})
-            self.s3.upload_object(key=user.s3_face_image_key, file=image)
-
-            return user
-
-    async def rollback(self, email: str) -> None:
-        with self.uow:
-            user = await self.users.get_by_email(email)
-            await self.users.update(user.id, {"face_image_key": None})
-
+        return image, face_details["FaceDetails"][0]["BoundingBox"]
+
+    async def register_face(self, email: str, image: bytes, ticket: str | None = None) -> User:
+        if ticket is None:
+            # A rejected image saves DetectFaces and the S3 upload
+            image, bounding_box = await self.inspect_face(image, upstream_calls=2)
+        else:
+            if len(image) > self.max_image_size:
+                raise s3_exceptions.ImageTooLargeError("Image is too large")
+            bounding_box = verify_face_ticket(ticket, email, await image_digest(image)).bounding_box
+            # Normalizing is deterministic, this is the image the ticket's bounding box was found on
+            image = await normalize_image(self.images, image, upstream_calls=1)
+
+        if self.images is not None:
+            image = await self.images.crop_to_face(image, bounding_box)
+
+        # Outside the transaction, an unknown user is not a failed registration
+        user = await self.users.get_by_email(email)
+        previous_face = face_reference(user)
+        replaces_image = user.face_image_key is not None
+        enrollment: FaceEnrollment | None = None
+        try:
+            async with self.uow:
+                enrollment = await self.rekognition.index_face(previous_face, image)
+                await self.users.update(
+                    user.id,
+                    {
+                        "face_image_key": user.s3_face_image_key,
+                        "face_id": enrollment.face_id,
+                        "face_embedding": enrollment.embedding,
+                    },
+                )
+                await self.s3.upload_object(key=user.s3_face_image_key, file=image)
+        except Exception as e:
+            await self.rollback(previous_face, enrollment, replaces_image)
+            if isinstance(e, UnitOfWorkError):
+                raise ServiceError(f"Failed to register user face: {e}") from e
+            raise
+
+        if previous_face.face_id is not None and previous_face.face_id != enrollment.face_id:
+            try:
+                await self.rekognition.forget_face(previous_face)
+            except rekognition_exceptions.RekognitionError as e:
+                logger.info(f"Failed to delete previous face from collection: {e}")
+
+        await self.rekognition.publish_face(previous_face.model_copy(update=enrollment.model_dump()))
+        return user
+
+    async def rollback(
+        self, previous_face: FaceReference, enrollment: FaceEnrollment | None, replaces_image: bool
+    ) -> None:
+        """Undo what a failed registration created, the user keeps their previous face"""
+        if enrollment is not None and enrollment.face_id not in (None, previous_face.face_id):
             try:
-                self.s3.delete_object(key=user.s3_face_image_key)
-            except s3_exceptions.S3ServiceError as e:
-                logging.info(f"Failed to delete user face image from S3, it probably doesn't exist: {e}")
+                await self.rekognition.forget_face(previous_face.model_copy(update={"face_id": enrollment.face_id}))
+            except (rekognition_exceptions.RekognitionError, ServiceUnavailableError) as e:
+                logger.warning(f"Failed to forget face {enrollment.face_id} of a failed registration: {e}")
+
+        if replaces_image:
+            # The previous image is under the same key
+            return
+        try:
+            await self.s3.delete_object(key=previous_face.key)
+        except (s3_exceptions.S3ServiceError, ServiceUnavailableError) as e:
+            logger.info(f"Failed to delete user face image from S3, it probably doesn't exist: {e}")
 
     def validate_face_on_registration(self, face_details: dict) -> None:
         faces = face_details.get("FaceDetails", [])
@@ -160,13 +250,24 @@ class RegisterUserFaceCommand(RegisterCommand):
 
 
 def get_register_user_face_command(
+    settings: SettingsDependency,
     uow: UnitOfWorkDependency,
     cognito: CognitoTokenServiceDependency,
     users: UserRepositoryDependency,
     rekognition: RekognitionServiceDependency,
     s3: S3ServiceDependency,
+    images: ImagePipelineDependency,
 ) -> RegisterUserFaceCommand:
-    return RegisterUserFaceCommand(uow, cognito, users, rekognition, s3)
+    return RegisterUserFaceCommand(
+        uow,
+        cognito,
+        users,
+        rekognition,
+        s3,
+        max_image_size=settings.MAX_IMAGE_SIZE,
+        images=images,
+        ticket_ttl=settings.FACE_VALIDATION_TICKET_TTL,
+    )
 
 
 RegisterUserFaceCommandDependency = Annotated[RegisterUserFaceCommand, Depends(get_register_user_face_command)]
@@ -193,7 +294,7 @@ class EmailConfirmationCommand(ConfirmSignupCommand):
             await self.users.update(user.id, {"email_verified": True})
 
         try:
-            self.cognito.confirm_signup(email, code)
+            await self.cognito.confirm_signup(email, code)
         except cognito_exceptions.AuthError as e:
             raise ServiceError(f"AWS Cognito confirmation failed: {e}") from e
 
@@ -252,7 +353,7 @@ class SigninViaPasswordCommand(SigninCommand):
     async def execute(self, email: str, key: str) -> dict:
         try:
             user = await self.users.get_by_email(email)
-            return self.cognito.signin(email, key)
+            return await self.cognito.signin(email, key)
         except UserNotFoundError as e:
             raise ServiceError(f"Requested user ({email}) not found") from e
 
@@ -274,27 +375,125 @@ SigninViaPasswordCommandDependency = Annotated[SigninViaPasswordCommand, Depends
 
 
 class SigninViaFaceCommand(SigninCommand):
-    def __init__(self, cognito: CognitoTokenService, users: UserRepository, rekognition: RekognitionService):
+    def __init__(
+        self,
+        cognito: CognitoTokenService,
+        users: UserRepository,
+        rekognition: RekognitionService,
+        speculative_auth: bool = False,
+        images: ImagePipeline | None = None,
+        max_concurrent_frames: int = 2,
+    ):
         self.cognito = cognito
         self.users = users
         self.rekognition = rekognition
+        self.speculative_auth = speculative_auth
+        self.images = images
+        self.max_concurrent_frames = max_concurrent_frames
 
-    async def execute(self, email: str, key: bytes) -> dict:
-        if not await self.any_face_on_image_matches(email, key):
+    async def execute(self, email: str, *frames: bytes) -> dict:
+        """Sign in if the user's face is on any of the frames"""
+        frames = await self.normalize_frames(frames)
+
+        if self.speculative_auth:
+            return await self.execute_speculatively(email, frames)
+
+        frame = await self.matching_frame(email, frames)
+        if frame is None:
             raise ServiceError("Face authentication is not enabled for this user")
 
-        return self.cognito.signin_via_face(email, key, "face_verified")
+        try:
+            return await self.cognito.signin_via_face(email, frame, FACE_VERIFIED_ANSWER)
+        except cognito_exceptions.AuthError as e:
+            raise ServiceError(f"AWS Cognito face signin failed for user ({email}): {e}") from e
+
+    async def execute_speculatively(self, email: str, frames: list[bytes]) -> dict:
+        """Start the CUSTOM_AUTH session while faces are compared, answer it only on a match.
 
-    async def any_face_on_image_matches(self, email: str, image: bytes) -> bool:
+        An unanswered session simply expires in Cognito, so dropping it on a
+        mismatch costs one wasted call and takes a round trip off every login.
+        """
+        challenge = asyncio.create_task(self.cognito.initiate_face_auth(email))
+        try:
+            frame = await self.matching_frame(email, frames)
+        except BaseException:
+            self._discard(challenge)
+            raise
+
+        if frame is None:
+            self._discard(challenge)
+            raise ServiceError("Face authentication is not enabled for this user")
+
+        try:
+            return await self.cognito.respond_to_face_auth(email, await challenge, FACE_VERIFIED_ANSWER)
+        except cognito_exceptions.AuthError as e:
+            raise ServiceError(f"AWS Cognito face signin failed for user ({email}): {e}") from e
+
+    @staticmethod
+    def _discard(task: asyncio.Task) -> None:
+        task.cancel()
+        # Retrieve the outcome so a failed, abandoned call isn't logged as unhandled
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    async def normalize_frames(self, frames: tuple[bytes, ...]) -> list[bytes]:
+        """Normalize the frames concurrently, dropping the ones the quality screen rejects.
+
+        Fails with the first rejection only when no frame is left to compare.
+        """
+        # A lone rejected frame also saves the speculative CUSTOM_AUTH session
+        upstream_calls = 2 if self.speculative_auth and len(frames) == 1 else 1
+        results = await asyncio.gather(
+            *(normalize_image(self.images, frame, upstream_calls) for frame in frames),
+            return_exceptions=True,
+        )
+
+        rejections = [result for result in results if isinstance(result, BaseException)]
+        for error in rejections:
+            if not isinstance(error, ServiceError):
+                raise error
+        if len(rejections) == len(results):
+            raise rejections[0]
+        return [result for result in results if not isinstance(result, BaseException)]
+
+    async def matching_frame(self, email: str, frames: list[bytes]) -> bytes | None:
+        """Compare the frames concurrently and return the first that matches the user.
+
+        At most `max_concurrent_frames` comparisons run at once; the rest are
+        cancelled as soon as one frame clears the threshold. A frame that fails
+        in Rekognition only fails the login when every frame does.
+        """
         try:
             user = await self.users.get_by_email(email)
-            matches = self.rekognition.compare_faces(user.s3_face_image_key, image)
-            return any(match["Matched"] for match in matches)
         except UserNotFoundError as e:
             raise ServiceError(f"Requested user ({email}) not found") from e
 
-        except rekognition_exceptions.RekognitionError as e:
-            raise ServiceError(f"Rekognition error: {e}") from e
+        reference = face_reference(user)
+        slots = asyncio.Semaphore(self.max_concurrent_frames)
+
+        async def compare(frame: bytes) -> bytes | None:
+            async with slots:
+                matches = await self.rekognition.compare_faces(reference, frame)
+            return frame if any(match["Matched"] for match in matches) else None
+
+        comparisons = [asyncio.create_task(compare(frame)) for frame in frames]
+        errors = []
+        try:
+            for comparison in asyncio.as_completed(comparisons):
+                try:
+                    frame = await comparison
+                except rekognition_exceptions.RekognitionError as e:
+                    errors.append(e)
+                    continue
+                if frame is not None:
+                    return frame
+        finally:
+            for comparison in comparisons:
+                if not comparison.done():
+                    self._discard(comparison)
+
+        if len(errors) == len(frames):
+            raise ServiceError(f"Rekognition error: {errors[0]}") from errors[0]
+        return None
 
     async def is_enabled(self, email: str) -> bool:
         try:
@@ -305,11 +504,113 @@ class SigninViaFaceCommand(SigninCommand):
 
 
 def get_signin_via_face_command(
+    settings: SettingsDependency,
     cognito: CognitoTokenServiceDependency,
     users: UserRepositoryDependency,
     rekognition: RekognitionServiceDependency,
+    images: ImagePipelineDependency,
 ) -> SigninViaFaceCommand:
-    return SigninViaFaceCommand(cognito, users, rekognition)
+    return SigninViaFaceCommand(
+        cognito,
+        users,
+        rekognition,
+        speculative_auth=settings.FACE_SIGNIN_SPECULATIVE_AUTH,
+        images=images,
+        max_concurrent_frames=settings.FACE_SIGNIN_FRAME_CONCURRENCY,
+    )
 
 
 SigninViaFaceCommandDependency = Annotated[SigninViaFaceCommand, Depends(get_signin_via_face_command)]
+
+
+class SigninViaFaceBurstCommand:
+    """Best-shot face login: score a burst locally and compare only its best frames.
+
+    Frames are ranked on the image pipeline's worker pool by sharpness, face
+    size and pose, so a burst of ten costs as many upstream comparisons as
+    `best_frames` rather than ten.
+    """
+
+    def __init__(self, signin: SigninViaFaceCommand, images: ImagePipeline, best_frames: int = 2):
+        self.signin = signin
+        self.images = images
+        self.best_frames = best_frames
+
+    async def execute(self, email: str, frames: list[bytes]) -> tuple[dict, BurstSelection]:
+        if not frames:
+            raise ServiceError("No frames to sign in with")
+
+        selection = await self.images.select_best(frames, self.best_frames)
+        if not selection.chosen:
+            reasons = ", ".join(sorted(set(selection.rejected.values())))
+            raise ServiceError(f"No usable frame among {selection.frames} ({reasons})")
+
+        credentials = await self.signin.execute(email, *(frames[frame.index] for frame in selection.chosen))
+        return credentials, selection
+
+
+def get_signin_via_face_burst_command(
+    settings: SettingsDependency,
+    signin: SigninViaFaceCommandDependency,
+    images: ImagePipelineDependency,
+) -> SigninViaFaceBurstCommand:
+    return SigninViaFaceBurstCommand(signin, images, best_frames=settings.FACE_BURST_BEST_FRAMES)
+
+
+SigninViaFaceBurstCommandDependency = Annotated[SigninViaFaceBurstCommand, Depends(get_signin_via_face_burst_command)]
+
+
+class SigninViaFaceOnlyCommand:
+    """Face login without a known identity: the image itself selects the user"""
+
+    def __init__(
+        self,
+        cognito: CognitoTokenService,
+        users: UserRepository,
+        rekognition: RekognitionService,
+        images: ImagePipeline | None = None,
+    ):
+        self.cognito = cognito
+        self.users = users
+        self.rekognition = rekognition
+        self.images = images
+
+    async def execute(self, image: bytes) -> tuple[str, dict]:
+        image = await normalize_image(self.images, image, upstream_calls=1)
+        user = await self.identify(image)
+        try:
+            return user.email, await self.cognito.signin_via_face(user.email, image, FACE_VERIFIED_ANSWER)
+        except cognito_exceptions.AuthError as e:
+            raise ServiceError(f"AWS Cognito face signin failed for user ({user.email}): {e}") from e
+
+    async def identify(self, image: bytes) -> User:
+        try:
+            matches = await self.rekognition.identify_face(image)
+        except rekognition_exceptions.FaceIdentificationNotSupportedError as e:
+            raise ServiceError("Face-only signin is not enabled") from e
+
+        except rekognition_exceptions.RekognitionError as e:
+            raise ServiceError(f"Rekognition error: {e}") from e
+
+        match = next((match for match in matches if match["Matched"]), None)
+        if match is None:
+            raise ServiceError("No registered face matches the image")
+
+        try:
+            if "UserId" in match:
+                return await self.users.get(match["UserId"])
+            return await self.users.get_by_face_id(match["FaceId"])
+        except UserNotFoundError as e:
+            raise ServiceError("Matched face doesn't belong to a registered user") from e
+
+
+def get_signin_via_face_only_command(
+    cognito: CognitoTokenServiceDependency,
+    users: UserRepositoryDependency,
+    rekognition: RekognitionServiceDependency,
+    images: ImagePipelineDependency,
+) -> SigninViaFaceOnlyCommand:
+    return SigninViaFaceOnlyCommand(cognito, users, rekognition, images=images)
+
+
+SigninViaFaceOnlyCommandDependency = Annotated[SigninViaFaceOnlyCommand, Depends(get_signin_via_face_only_command)]
@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+
+import jwt
+from pydantic import BaseModel
+
+from registration.exceptions import InvalidFaceTicketError
+from tokens import decode_jwt, encode_jwt
+
+FACE_TICKET_TYPE = "face_validation"
+# Tickets are signed with the identity cookie key, their audience keeps them from passing for a cookie
+FACE_TICKET_AUDIENCE = "face_validation"
+
+
+class FaceTicket(BaseModel):
+    """What `/validate_face` established about an image, for `/register_user_face` to reuse"""
+
+    email: str
+    digest: str
+    bounding_box: dict
+
+
+async def image_digest(image: bytes) -> str:
+    # hashlib releases the GIL on large inputs, keep a 10 MB upload off the event loop
+    return (await asyncio.to_thread(hashlib.sha256, image)).hexdigest()
+
+
+def issue_face_ticket(ticket: FaceTicket, expires_in: int) -> str:
+    return encode_jwt(
+        {"token_type": FACE_TICKET_TYPE, "aud": FACE_TICKET_AUDIENCE, **ticket.model_dump()}, expires_in=expires_in
+    )
+
+
+def verify_face_ticket(token: str, email: str, digest: str) -> FaceTicket:
+    """Decode a ticket, checking it was issued to `email` for the image with `digest`"""
+    try:
+        payload = decode_jwt(token, audience=FACE_TICKET_AUDIENCE)
+    except jwt.PyJWTError as e:
+        raise InvalidFaceTicketError("Face validation ticket is invalid or expired") from e
+
+    if payload.get("token_type") != FACE_TICKET_TYPE:
+        raise InvalidFaceTicketError("Not a face validation ticket")
+
+    ticket = FaceTicket.model_validate(payload)
+    if ticket.email != email or ticket.digest != digest:
+        raise InvalidFaceTicketError("Face validation ticket was issued for another image")
+    return ticket
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterable
+
+import numpy as np
+
+from faces.embeddings import EMBEDDING_DTYPE, FaceEmbeddingExtractor, cosine_similarity, from_bytes, to_bytes
+from faces.exceptions import ImageDecodeError
+from faces.index import IVFIndex
+from faces.store import MemoryEmbeddingStore
+from rekognition.exceptions import (
+    FaceIdentificationNotSupportedError,
+    FaceImageValidationError,
+    RekognitionClientError,
+)
+from rekognition.repository import RekognitionRepository
+from rekognition.schemas import FaceEnrollment, FaceReference
+
+logger = logging.getLogger(__name__)
+
+
+class FaceMatchingBackend(ABC):
+    """Face detection and matching behind RekognitionService.
+
+    Matches are returned as raw dicts with a `Similarity` percentage, so the
+    service applies the same threshold whichever backend produced them.
+    """
+
+    @abstractmethod
+    async def compare_faces(self, reference: FaceReference, image: bytes, threshold: float) -> list[dict]:
+        pass
+
+    @abstractmethod
+    async def detect_face_details(self, image: bytes) -> dict:
+        pass
+
+    async def identify_faces(self, image: bytes, threshold: float, max_matches: int) -> list[dict]:
+        """Search the image across all registered users.
+
+        Matches carry either `UserId` or `FaceId`, whichever the backend knows.
+        """
+        raise FaceIdentificationNotSupportedError("Backend can only compare against a known user")
+
+    async def index_face(self, reference: FaceReference, image: bytes) -> FaceEnrollment:
+        return FaceEnrollment()
+
+    async def publish_face(self, reference: FaceReference) -> None:
+        """Make a stored face searchable by `identify_faces`"""
+
+    async def forget_face(self, reference: FaceReference) -> None:
+        pass
+
+
+class CompareFacesBackend(FaceMatchingBackend):
+    """Rekognition CompareFaces against the reference image stored in S3"""
+
+    def __init__(self, repo: RekognitionRepository):
+        self._repo = repo
+
+    async def compare_faces(self, reference: FaceReference, image: bytes, threshold: float) -> list[dict]:
+        resp = await self._repo.compare_faces(reference.key, image, threshold)
+        return resp["FaceMatches"]
+
+    async def detect_face_details(self, image: bytes) -> dict:
+        return await self._repo.detect_face_details(image)
+
+
+class CollectionBackend(CompareFacesBackend):
+    """Rekognition collection search restricted to the user's indexed FaceId.
+
+    References without a FaceId (not yet backfilled) fall back to CompareFaces.
+    """
+
+    def __init__(self, repo: RekognitionRepository, search_max_faces: int = 100):
+        super().__init__(repo)
+        self._search_max_faces = search_max_faces
+
+    async def compare_faces(self, reference: FaceReference, image: bytes, threshold: float) -> list[dict]:
+        if reference.face_id is None:
+            return await super().compare_faces(reference, image, threshold)
+
+        resp = await self._repo.search_faces_by_image(image, threshold, self._search_max_faces)
+        return [match for match in resp["FaceMatches"] if match["Face"]["FaceId"] == reference.face_id]
+
+    async def identify_faces(self, image: bytes, threshold: float, max_matches: int) -> list[dict]:
+        resp = await self._repo.search_faces_by_image(image, threshold, max_matches)
+        return [{"Similarity": match["Similarity"], "FaceId": match["Face"]["FaceId"]} for match in resp["FaceMatches"]]
+
+    async def index_face(self, reference: FaceReference, image: bytes) -> FaceEnrollment:
+        resp = await self._repo.index_face(image, external_image_id=reference.key)
+        if not resp["FaceRecords"]:
+            raise FaceImageValidationError("No face of sufficient quality to index")
+        return FaceEnrollment(face_id=resp["FaceRecords"][0]["Face"]["FaceId"])
+
+    async def forget_face(self, reference: FaceReference) -> None:
+        if reference.face_id is not None:
+            await self._repo.delete_faces([reference.face_id])
+
+
+class LocalEmbeddingBackend(FaceMatchingBackend):
+    """On-prem matching with one fixed-length embedding stored per user.
+
+    Similarity is the cosine of the probe and reference embeddings, scaled to a
+    percentage so the service's Rekognition threshold keeps its meaning. All
+    stored embeddings are also kept in an embedding store with an ANN index
+    over it for 1:N search.
+    """
+
+    def __init__(self, extractor: FaceEmbeddingExtractor, index: IVFIndex | None = None, identification: bool = True):
+        self._extractor = extractor
+        self.index = index or IVFIndex(MemoryEmbeddingStore(extractor.dim))
+        self._identification = identification
+        # Hash of the embedding last added per user, to find what `resync` has to apply
+        self._digests: dict[int, int] = {}
+
+    async def compare_faces(self, reference: FaceReference, image: bytes, threshold: float) -> list[dict]:
+        if reference.embedding is None:
+            return []
+
+        try:
+            gallery = from_bytes(reference.embedding, self._extractor.dim)
+        except ValueError as e:
+            raise RekognitionClientError("Stored face embedding doesn't match the extractor") from e
+
+        probes = await self._extract(image)
+        similarities = cosine_similarity(probes, gallery).max(axis=1)
+        return [{"Similarity": float(similarity)} for similarity in np.clip(similarities, 0.0, 1.0) * 100]
+
+    async def detect_face_details(self, image: bytes) -> dict:
+        try:
+            return {"FaceDetails": await asyncio.to_thread(self._extractor.detect, image)}
+        except ImageDecodeError as e:
+            raise FaceImageValidationError("Invalid image parameters or format") from e
+
+    async def identify_faces(self, image: bytes, threshold: float, max_matches: int) -> list[dict]:
+        if not self._identification:
+            raise FaceIdentificationNotSupportedError("Identification is disabled for this face model")
+        probes = await self._extract(image)
+        candidates = await asyncio.to_thread(self.index.search, probes[0], max_matches)
+        return [
+            {"Similarity": float(np.clip(similarity, 0.0, 1.0) * 100), "UserId": user_id}
+            for user_id, similarity in candidates
+        ]
+
+    async def index_face(self, reference: FaceReference, image: bytes) -> FaceEnrollment:
+        probes = await self._extract(image)
+        return FaceEnrollment(embedding=to_bytes(probes[0]))
+
+    async def publish_face(self, reference: FaceReference) -> None:
+        if reference.user_id is not None and reference.embedding is not None:
+            embedding = from_bytes(reference.embedding, self._extractor.dim)[0]
+            await asyncio.to_thread(self.index.add, reference.user_id, embedding)
+            self._digests[reference.user_id] = hash(reference.embedding)
+
+    async def forget_face(self, reference: FaceReference) -> None:
+        if reference.user_id is not None:
+            await asyncio.to_thread(self.index.remove, reference.user_id)
+            self._digests.pop(reference.user_id, None)
+
+    async def load_index(self, batches: AsyncIterable[list[tuple[int, bytes]]]) -> int:
+        """Build the ANN index and return its size.
+
+        (user id, embedding) rows are read from `batches` only to seed an empty
+        store, a populated one (e.g. mapped from disk) is used as is.
+        """
+        if not len(self.index.store):
+            await self._seed_store(batches)
+        await asyncio.to_thread(self.index.build)
+        return len(self.index)
+
+    async def resync(self, batches: AsyncIterable[list[tuple[int, bytes]]]) -> tuple[int, int]:
+        """Reconcile the index with the database and return the users added and removed.
+
+        A process-local store never sees other processes' registrations, so every
+        (user id, embedding) row of `batches` that differs from what this process
+        last added is applied, and users missing from `batches` are removed.
+        """
+        embedding_size = self._extractor.dim * np.dtype(EMBEDDING_DTYPE).itemsize
+        known = dict(self._digests)
+        seen: set[int] = set()
+        added = 0
+        async for batch in batches:
+            for user_id, embedding in batch:
+                if len(embedding) != embedding_size:
+                    continue
+                seen.add(user_id)
+                if known.get(user_id) != hash(embedding):
+                    await self.publish_face(FaceReference(key="", user_id=user_id, embedding=embedding))
+                    added += 1
+
+        # Users registered by this process while reading aren't stale
+        stale = [
+            user_id for user_id, digest in known.items() if user_id not in seen and self._digests.get(user_id) == digest
+        ]
+        for user_id in stale:
+            await self.forget_face(FaceReference(key="", user_id=user_id))
+        return added, len(stale)
+
+    async def _seed_store(self, batches: AsyncIterable[list[tuple[int, bytes]]]) -> None:
+        embedding_size = self._extractor.dim * np.dtype(EMBEDDING_DTYPE).itemsize
+        ids, vectors = [], []
+        async for batch in batches:
+            rows = [(user_id, embedding) for user_id, embedding in batch if len(embedding) == embedding_size]
+            if len(rows) < len(batch):
+                logger.warning(f"Skipped {len(batch) - len(rows)} face embeddings of the wrong size")
+            ids.extend(user_id for user_id, _ in rows)
+            self._digests.update((user_id, hash(embedding)) for user_id, embedding in rows)
+            vectors.append(from_bytes(b"".join(embedding for _, embedding in rows), self._extractor.dim))
+
+        if ids:
+            await asyncio.to_thread(self.index.store.seed, np.asarray(ids, dtype=np.int64), np.concatenate(vectors))
+
+    async def _extract(self, image: bytes) -> np.ndarray:
+        try:
+            return await asyncio.to_thread(self._extractor.extract, image)
+        except ImageDecodeError as e:
+            raise FaceImageValidationError("Invalid image parameters or format") from e
@@ -0,0 +1,141 @@
+"""Index the reference images of users registered before the collection backend.
+
+Run from the backend directory once REKOGNITION_BACKEND=collection is set:
+
+    PYTHONPATH=src python -m rekognition.backfill --concurrency 4
+
+Only users without a FaceId are picked, so the command can be rerun after a
+partial run. Users whose image can't be indexed keep signing in through
+CompareFaces and get a FaceId on their next face registration.
+
+    PYTHONPATH=src python -m rekognition.backfill --delete
+
+removes every stored FaceId from the collection and the users table, run it
+before downgrading past the migration that added users.face_id.
+"""
+
+import argparse
+import asyncio
+import logging
+from collections import Counter
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from aws.config import get_aws_client_settings
+from aws.registry import AWSClientRegistry
+from core.db import engine
+from core.exceptions import ServiceUnavailableError
+from rekognition.backends import CollectionBackend
+from rekognition.config import get_rekognition_settings
+from rekognition.exceptions import RekognitionError
+from rekognition.repository import get_rekognition_repository
+from rekognition.schemas import FaceReference
+from s3.config import get_s3_config
+from s3.exceptions import S3ServiceError
+from s3.service import S3Service, get_s3_service
+from users.models import User
+from users.repo import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class FaceIdBackfill:
+    """Indexes users' reference images into the collection, `concurrency` users at a time"""
+
+    def __init__(
+        self,
+        backend: CollectionBackend,
+        s3: S3Service,
+        sessions: Callable[[], AsyncSession],
+        concurrency: int = 4,
+    ):
+        self.backend = backend
+        self.s3 = s3
+        self.sessions = sessions
+        self.concurrency = concurrency
+        self.counts: Counter[str] = Counter()
+
+    async def run(self) -> Counter[str]:
+        async with self.sessions() as session:
+            users = iter(
+                (
+                    await session.execute(
+                        select(User.id, User.face_image_key).where(
+                            User.face_image_key.is_not(None), User.face_id.is_(None)
+                        )
+                    )
+                ).all()
+            )
+
+        async def worker() -> None:
+            for user_id, key in users:
+                self.counts[await self.index(user_id, key)] += 1
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return self.counts
+
+    async def index(self, user_id: int, key: str) -> str:
+        reference = FaceReference(key=key, user_id=user_id)
+        try:
+            image = await self.s3.download_object(key)
+            enrollment = await self.backend.index_face(reference, image)
+        except (S3ServiceError, RekognitionError, ServiceUnavailableError) as e:
+            logger.warning(f"Failed to index face of user {user_id}: {e}")
+            return "failed"
+
+        try:
+            async with self.sessions() as session, session.begin():
+                await UserRepository(session).update(user_id, {"face_id": enrollment.face_id})
+        except Exception:
+            # Don't leave a face in the collection that no user points to
+            await self.backend.forget_face(reference.model_copy(update={"face_id": enrollment.face_id}))
+            raise
+        return "indexed"
+
+    async def delete(self) -> Counter[str]:
+        """Remove every stored FaceId from the collection and the users table"""
+        async with self.sessions() as session:
+            users = (await session.execute(select(User.id, User.face_id).where(User.face_id.is_not(None)))).all()
+
+        for user_id, face_id in users:
+            await self.backend.forget_face(FaceReference(key="", user_id=user_id, face_id=face_id))
+            async with self.sessions() as session, session.begin():
+                await UserRepository(session).update(user_id, {"face_id": None})
+            self.counts["deleted"] += 1
+        return self.counts
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=4, help="users indexed at once")
+    parser.add_argument("--delete", action="store_true", help="remove the stored FaceIds instead")
+    return parser.parse_args()
+
+
+async def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    settings = get_rekognition_settings()
+    if settings.REKOGNITION_BACKEND != "collection":
+        raise SystemExit("REKOGNITION_BACKEND is not collection, nothing to backfill")
+
+    aws_clients = AWSClientRegistry.from_settings(get_aws_client_settings())
+    backfill = FaceIdBackfill(
+        CollectionBackend(get_rekognition_repository(aws_clients.rekognition, settings)),
+        get_s3_service(get_s3_config(), aws_clients.s3),
+        async_sessionmaker(engine),
+        concurrency=args.concurrency,
+    )
+    try:
+        counts = await (backfill.delete() if args.delete else backfill.run())
+        print(", ".join(f"{status} {count}" for status, count in sorted(counts.items())) or "nothing to do")
+    finally:
+        await aws_clients.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 from functools import lru_cache
-from typing import Annotated
+from pathlib import Path
+from typing import Annotated, Literal
 
 from fastapi import Depends
 from pydantic_settings import BaseSettings
@@ -12,6 +13,41 @@ class RekognitionSettings(BaseSettings):
 
     AWS_REKOGNITION_SIMILARITY_THRESHOLD: float = 0.95
     AWS_REKOGNITION_COLLECTION_ID: str
+    AWS_REKOGNITION_SEARCH_MAX_FACES: int = 100
+
+    REKOGNITION_BACKEND: Literal["compare_faces", "collection", "local"] = "compare_faces"
+    # Face model of the local backend, as `package.module:factory` returning a
+    # FaceEmbeddingExtractor. Without one the local backend only starts with
+    # FACE_ALLOW_REFERENCE_EXTRACTOR, which embeds pixels rather than faces and
+    # is for tests and development only.
+    FACE_EMBEDDING_EXTRACTOR: str | None = None
+    FACE_ALLOW_REFERENCE_EXTRACTOR: bool = False
+    FACE_EMBEDDING_DIM: int = 128
+    # 0 sizes the partitions from the gallery (sqrt of the enrolled users)
+    FACE_INDEX_NLIST: int = 0
+    FACE_INDEX_NPROBE: int = 16
+    FACE_INDEX_RERANK: int = 32
+    FACE_INDEX_SYNC_INTERVAL: float = 5.0
+
+    # Directory of the memory-mapped embedding store shared by all workers.
+    # Unset keeps a gallery per process in memory, which only sees other
+    # processes' registrations (API workers, enrollment worker, bulk CLI) by
+    # re-reading every stored embedding from the database each
+    # FACE_INDEX_SYNC_INTERVAL. Set it whenever the API runs more than one
+    # process over a large gallery.
+    FACE_STORE_PATH: Path | None = None
+    FACE_STORE_COMPACTION_INTERVAL: float = 300.0
+    FACE_STORE_COMPACTION_RATIO: float = 0.25
+
+    # Opt-in hedging of comparisons against Rekognition: a comparison slower
+    # than the REKOGNITION_HEDGE_PERCENTILE of the last
+    # REKOGNITION_LATENCY_WINDOW seconds is sent again, for at most
+    # REKOGNITION_HEDGE_BUDGET extra calls per call
+    REKOGNITION_HEDGING: bool = False
+    REKOGNITION_HEDGE_PERCENTILE: float = 95.0
+    REKOGNITION_HEDGE_BUDGET: float = 0.05
+    REKOGNITION_HEDGE_MIN_DELAY: float = 0.05
+    REKOGNITION_LATENCY_WINDOW: float = 60.0
 
 
 @lru_cache
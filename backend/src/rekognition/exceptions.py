@@ -10,6 +10,10 @@ class FaceImageValidationError(RekognitionError):
     """Exception raised when face image validation fails."""
 
 
+class FaceIdentificationNotSupportedError(RekognitionError):
+    """Exception raised when the backend can't search faces across all users."""
+
+
 class RekognitionLimitExceededError(RekognitionError):
     """Exception raised when Rekognition limits are exceeded."""
 
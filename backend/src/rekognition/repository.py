@@ -2,7 +2,9 @@ from typing import Annotated
 
 from fastapi import Depends
 
-from rekognition.client import RekognitionClient, RekognitionClientDependency
+from aws.registry import AsyncClient
+from rekognition.client import RekognitionClientDependency
+from rekognition.config import RekognitionSettingsDependency
 from rekognition.exceptions import (
     FaceImageValidationError,
     RekognitionClientError,
@@ -12,18 +14,19 @@ from rekognition.exceptions import (
 
 
 class RekognitionRepository:
-    def __init__(self, rekognition_client: RekognitionClient):
+    def __init__(self, rekognition_client: AsyncClient, collection_id: str | None = None):
         self.client = rekognition_client
         self.bucket_name = "linqqq"
+        self.collection_id = collection_id
 
-    def compare_faces(
+    async def compare_faces(
         self,
         source_image_key: str,
         target_image: bytes,
         similarity_threshold: float = 95.0,
     ) -> dict:
         try:
-            return self.client.compare_faces(
+            return await self.client.compare_faces(
                 SourceImage={
                     "S3Object": {
                         "Bucket": "linqqq",
@@ -51,20 +54,74 @@ class RekognitionRepository:
         except self.client.exceptions.AccessDeniedException as e:
             raise RekognitionLimitExceededError("Access denied to Rekognition service") from e
 
-    def detect_face_details(self, image: bytes) -> dict:
+    async def detect_face_details(self, image: bytes) -> dict:
         try:
-            return self.client.detect_faces(
+            return await self.client.detect_faces(
                 Image={"Bytes": image},
                 Attributes=["SUNGLASSES", "FACE_OCCLUDED"],
             )
         except self.client.exceptions.ClientError as e:
             raise RekognitionClientError("Failed to detect face details") from e
 
+    async def index_face(self, image: bytes, external_image_id: str) -> dict:
+        try:
+            return await self.client.index_faces(
+                CollectionId=self.collection_id,
+                Image={"Bytes": image},
+                ExternalImageId=external_image_id,
+                MaxFaces=1,
+                QualityFilter="AUTO",
+            )
+        except self.client.exceptions.ResourceNotFoundException as e:
+            raise RekognitionClientError("Rekognition collection does not exist") from e
+        except (
+            self.client.exceptions.InvalidImageFormatException,
+            self.client.exceptions.InvalidParameterException,
+            self.client.exceptions.ImageTooLargeException,
+        ) as e:
+            raise FaceImageValidationError("Invalid image parameters or format") from e
+        except (
+            self.client.exceptions.ProvisionedThroughputExceededException,
+            self.client.exceptions.ThrottlingException,
+            self.client.exceptions.InternalServerError,
+        ) as e:
+            raise RekognitionLimitExceededError("Failed to send request to Rekognition") from e
+
+    async def search_faces_by_image(self, image: bytes, similarity_threshold: float, max_faces: int) -> dict:
+        try:
+            return await self.client.search_faces_by_image(
+                CollectionId=self.collection_id,
+                Image={"Bytes": image},
+                FaceMatchThreshold=similarity_threshold,
+                MaxFaces=max_faces,
+            )
+        except self.client.exceptions.ResourceNotFoundException as e:
+            raise RekognitionClientError("Rekognition collection does not exist") from e
+        except (
+            self.client.exceptions.InvalidImageFormatException,
+            self.client.exceptions.InvalidParameterException,
+            self.client.exceptions.ImageTooLargeException,
+        ) as e:
+            raise FaceImageValidationError("Invalid image parameters or format") from e
+        except (
+            self.client.exceptions.ProvisionedThroughputExceededException,
+            self.client.exceptions.ThrottlingException,
+            self.client.exceptions.InternalServerError,
+        ) as e:
+            raise RekognitionLimitExceededError("Failed to send request to Rekognition") from e
+
+    async def delete_faces(self, face_ids: list[str]) -> dict:
+        try:
+            return await self.client.delete_faces(CollectionId=self.collection_id, FaceIds=face_ids)
+        except self.client.exceptions.ClientError as e:
+            raise RekognitionClientError("Failed to delete faces from collection") from e
+
 
 def get_rekognition_repository(
     client: RekognitionClientDependency,
+    settings: RekognitionSettingsDependency,
 ) -> RekognitionRepository:
-    return RekognitionRepository(client)
+    return RekognitionRepository(client, settings.AWS_REKOGNITION_COLLECTION_ID)
 
 
 RekognitionRepositoryDependency = Annotated[RekognitionRepository, Depends(get_rekognition_repository)]
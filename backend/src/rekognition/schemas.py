@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class FaceReference(BaseModel):
+    """What is known about a user's registered face"""
+
+    key: str
+    user_id: int | None = None
+    face_id: str | None = None
+    embedding: bytes | None = None
+
+
+class FaceEnrollment(BaseModel):
+    """What a backend needs persisted for a newly registered face"""
+
+    face_id: str | None = None
+    embedding: bytes | None = None
@@ -1,22 +1,45 @@
+import importlib
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends
-from rekognition.repository import (
-    RekognitionRepository,
-    RekognitionRepositoryDependency,
+
+from core.hedging import HedgingPolicy
+from core.latency import LatencyHistogram
+from faces.embeddings import FaceEmbeddingExtractor, ReferenceEmbeddingExtractor
+from faces.index import IVFIndex
+from faces.store import EmbeddingStore, MappedEmbeddingStore, MemoryEmbeddingStore
+from rekognition.backends import (
+    CollectionBackend,
+    CompareFacesBackend,
+    FaceMatchingBackend,
+    LocalEmbeddingBackend,
 )
+from rekognition.config import RekognitionSettings, RekognitionSettingsDependency, get_rekognition_settings
+from rekognition.repository import RekognitionRepositoryDependency
+from rekognition.schemas import FaceEnrollment, FaceReference
 
 
 class RekognitionService:
-    """Orchestrates face comparison operations with proper validation and error handling."""
+    """Orchestrates face comparison operations with proper validation and error handling.
+
+    With a `hedging` policy, slow comparisons are raced against a second
+    identical one.
+    """
 
-    def __init__(self, repo: RekognitionRepository) -> None:
-        self._repo = repo
+    def __init__(self, backend: FaceMatchingBackend, hedging: HedgingPolicy | None = None) -> None:
+        self._backend = backend
+        self._hedging = hedging
         self._threshold = 95.0
 
-    def compare_faces(self, source_image: bytes, target_image: bytes) -> list[dict]:
-        resp = self._repo.compare_faces(source_image, target_image, self._threshold)
-        return self._format_matches(resp["FaceMatches"], self._threshold)
+    async def compare_faces(self, reference: FaceReference, target_image: bytes) -> list[dict]:
+        if self._hedging is not None:
+            matches = await self._hedging.run(
+                lambda: self._backend.compare_faces(reference, target_image, self._threshold)
+            )
+        else:
+            matches = await self._backend.compare_faces(reference, target_image, self._threshold)
+        return self._format_matches(matches, self._threshold)
 
     def _format_matches(self, matches: list[dict], threshold) -> list[dict]:
         return [
@@ -27,14 +50,111 @@ class RekognitionService:
             for match in matches
         ]
 
-    def detect_face_details(self, image: bytes) -> dict:
-        return self._repo.detect_face_details(image)
+    async def identify_face(self, image: bytes, max_matches: int = 1) -> list[dict]:
+        """Find the registered users whose face is on the image, best match first"""
+        matches = await self._backend.identify_faces(image, self._threshold, max_matches)
+        return [{**match, "Matched": match["Similarity"] >= self._threshold} for match in matches]
 
+    async def detect_face_details(self, image: bytes) -> dict:
+        return await self._backend.detect_face_details(image)
 
-def get_rekognition_service(
+    async def index_face(self, reference: FaceReference, image: bytes) -> FaceEnrollment:
+        """Register the face with the backend and return what needs to be stored for it"""
+        return await self._backend.index_face(reference, image)
+
+    async def publish_face(self, reference: FaceReference) -> None:
+        """Make a committed registration searchable by `identify_face`"""
+        await self._backend.publish_face(reference)
+
+    async def forget_face(self, reference: FaceReference) -> None:
+        """Remove a previously registered face from the backend"""
+        await self._backend.forget_face(reference)
+
+
+def load_embedding_extractor(settings: RekognitionSettings) -> FaceEmbeddingExtractor:
+    """The face model FACE_EMBEDDING_EXTRACTOR names.
+
+    The reference extractor stands in only when FACE_ALLOW_REFERENCE_EXTRACTOR
+    is set. It doesn't recognize faces, so the local backend refuses to start
+    on it otherwise.
+    """
+    if settings.FACE_EMBEDDING_EXTRACTOR is None:
+        if not settings.FACE_ALLOW_REFERENCE_EXTRACTOR:
+            raise ValueError(
+                "REKOGNITION_BACKEND=local needs a face model in FACE_EMBEDDING_EXTRACTOR, "
+                "FACE_ALLOW_REFERENCE_EXTRACTOR is for tests and development only"
+            )
+        return ReferenceEmbeddingExtractor(dim=settings.FACE_EMBEDDING_DIM)
+
+    module_name, _, factory_name = settings.FACE_EMBEDDING_EXTRACTOR.partition(":")
+    if not factory_name:
+        raise ValueError(f"FACE_EMBEDDING_EXTRACTOR must look like package.module:factory, not {module_name}")
+    extractor = getattr(importlib.import_module(module_name), factory_name)()
+    if not isinstance(extractor, FaceEmbeddingExtractor):
+        raise TypeError(f"{settings.FACE_EMBEDDING_EXTRACTOR} did not return a FaceEmbeddingExtractor")
+    if extractor.dim != settings.FACE_EMBEDDING_DIM:
+        raise ValueError(
+            f"{settings.FACE_EMBEDDING_EXTRACTOR} yields {extractor.dim}-dimensional embeddings, "
+            f"FACE_EMBEDDING_DIM is {settings.FACE_EMBEDDING_DIM}"
+        )
+    return extractor
+
+
+@lru_cache
+def get_local_embedding_backend() -> LocalEmbeddingBackend:
+    settings: RekognitionSettings = get_rekognition_settings()
+    extractor = load_embedding_extractor(settings)
+    store: EmbeddingStore
+    if settings.FACE_STORE_PATH is not None:
+        store = MappedEmbeddingStore(settings.FACE_STORE_PATH, settings.FACE_EMBEDDING_DIM)
+    else:
+        store = MemoryEmbeddingStore(settings.FACE_EMBEDDING_DIM)
+
+    index = IVFIndex(
+        store,
+        nlist=settings.FACE_INDEX_NLIST,
+        nprobe=settings.FACE_INDEX_NPROBE,
+        rerank=settings.FACE_INDEX_RERANK,
+    )
+    # Searching every user for a match would let the reference extractor log anyone in on a similar-looking image
+    return LocalEmbeddingBackend(
+        extractor, index, identification=not isinstance(extractor, ReferenceEmbeddingExtractor)
+    )
+
+
+@lru_cache
+def get_compare_faces_hedging() -> HedgingPolicy | None:
+    """Process-wide hedging policy for comparisons, None unless enabled for a Rekognition backend"""
+    settings = get_rekognition_settings()
+    if not settings.REKOGNITION_HEDGING or settings.REKOGNITION_BACKEND == "local":
+        return None
+    return HedgingPolicy(
+        "compare_faces",
+        LatencyHistogram(window=settings.REKOGNITION_LATENCY_WINDOW),
+        percentile=settings.REKOGNITION_HEDGE_PERCENTILE,
+        budget=settings.REKOGNITION_HEDGE_BUDGET,
+        min_delay=settings.REKOGNITION_HEDGE_MIN_DELAY,
+    )
+
+
+def get_face_matching_backend(
     repo: RekognitionRepositoryDependency,
+    settings: RekognitionSettingsDependency,
+) -> FaceMatchingBackend:
+    if settings.REKOGNITION_BACKEND == "local":
+        return get_local_embedding_backend()
+    if settings.REKOGNITION_BACKEND == "collection":
+        return CollectionBackend(repo, search_max_faces=settings.AWS_REKOGNITION_SEARCH_MAX_FACES)
+    return CompareFacesBackend(repo)
+
+
+FaceMatchingBackendDependency = Annotated[FaceMatchingBackend, Depends(get_face_matching_backend)]
+
+
+def get_rekognition_service(
+    backend: FaceMatchingBackendDependency,
 ) -> RekognitionService:
-    return RekognitionService(repo)
+    return RekognitionService(backend, get_compare_faces_hedging())
 
 
 RekognitionServiceDependency = Annotated[RekognitionService, Depends(get_rekognition_service)]
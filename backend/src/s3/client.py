@@ -3,7 +3,7 @@ from boto3 import client
 from botocore.exceptions import ClientError
 from fastapi import Depends
 
-from s3.config import S3SettingsDependency
+from aws.registry import AsyncClient, AWSClientRegistryDependency
 from s3.exceptions import S3ClientError
 
 
@@ -31,8 +31,8 @@ class S3Client:
         )
 
 
-def get_s3_client(settings: S3SettingsDependency) -> S3Client:
-    return S3Client.from_settings(settings).client
+def get_s3_client(aws_clients: AWSClientRegistryDependency) -> AsyncClient:
+    return aws_clients.s3
 
 
-S3ClientDependency = Annotated[S3Client, Depends(get_s3_client)]
+S3ClientDependency = Annotated[AsyncClient, Depends(get_s3_client)]
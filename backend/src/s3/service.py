@@ -1,8 +1,9 @@
-from io import BytesIO
+import asyncio
 from typing import Annotated
 
 from fastapi import Depends
-from s3.client import S3Client
+from aws.registry import AsyncClient
+from s3.client import S3ClientDependency
 from botocore.exceptions import ClientError
 
 from s3.config import S3SettingsDependency
@@ -10,32 +11,43 @@ from s3.exceptions import S3ServiceError
 
 
 class S3Service:
-    def __init__(self, client: S3Client, bucket_name: str):
+    def __init__(self, client: AsyncClient, bucket_name: str):
         self.client = client
         self.bucket_name = bucket_name
 
-    def upload_object(self, key: str, file: bytes):
-        """Upload an object to S3."""
-        file_obj = BytesIO(file)
+    async def upload_object(self, key: str, file: bytes):
+        """Upload an object to S3.
 
+        Face images fit in a single PutObject, which sends `file` as the body
+        without buffering it through a file object first.
+        """
         try:
-            self.client.upload_fileobj(file_obj, self.bucket_name, key)
+            await self.client.put_object(Bucket=self.bucket_name, Key=key, Body=file)
         except ClientError as e:
             raise S3ServiceError("Failed to upload object to S3") from e
 
-    def delete_object(self, key: str):
+    async def download_object(self, key: str) -> bytes:
+        """Download an object from S3."""
+        try:
+            response = await self.client.get_object(Bucket=self.bucket_name, Key=key)
+            return await asyncio.to_thread(response["Body"].read)
+        except ClientError as e:
+            raise S3ServiceError("Failed to download object from S3") from e
+
+    async def delete_object(self, key: str):
         """Delete an object from S3."""
         try:
-            self.client.delete_object(Bucket=self.bucket_name, Key=key)
+            await self.client.delete_object(Bucket=self.bucket_name, Key=key)
         except ClientError as e:
             raise S3ServiceError("Failed to delete object from S3") from e
 
 
 def get_s3_service(
     s3_config: S3SettingsDependency,
+    client: S3ClientDependency,
 ) -> S3Service:
     return S3Service(
-        client=S3Client.from_settings(s3_config).client,
+        client=client,
         bucket_name=s3_config.AWS_S3_BUCKET_NAME,
     )
 
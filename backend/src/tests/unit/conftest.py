@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    """A throwaway Postgres, TEST_DATABASE_URL points the tests at an existing one instead"""
+    if url := os.environ.get("TEST_DATABASE_URL"):
+        yield url
+        return
+
+    pgserver = pytest.importorskip("pgserver")
+    server = pgserver.get_server(tmp_path_factory.mktemp("pgdata"), cleanup_mode="stop")
+    yield server.get_uri().replace("postgresql://", "postgresql+asyncpg://", 1)
+    server.cleanup()
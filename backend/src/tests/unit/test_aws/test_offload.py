@@ -0,0 +1,80 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+
+from aws.offload import AdaptiveClient
+from core.exceptions import UpstreamSaturatedError
+from core.ratelimit import AdaptiveTokenBucket
+
+
+def client_error(code: str) -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": code}}, "CompareFaces")
+
+
+class TestAdaptiveClient:
+    @pytest.fixture
+    def bucket(self):
+        return AdaptiveTokenBucket("rekognition", rate=100, min_rate=1, max_rate=200, cooldown=0)
+
+    @pytest.fixture
+    def client(self):
+        client = AsyncMock()
+        client.compare_faces = AsyncMock()
+        return client
+
+    async def test_retries_throttled_call_and_backs_off(self, client, bucket):
+        client.compare_faces.side_effect = [client_error("ThrottlingException"), {"FaceMatches": []}]
+        adaptive = AdaptiveClient(client, bucket, base_delay=0.001)
+
+        assert await adaptive.compare_faces(SimilarityThreshold=90) == {"FaceMatches": []}
+
+        assert client.compare_faces.await_count == 2
+        assert bucket.stats()["throttles"] == 1
+        # Halved by the throttle, then nudged up by the success
+        assert bucket.rate == pytest.approx(50.02)
+
+    async def test_gives_up_after_max_attempts(self, client, bucket):
+        client.compare_faces.side_effect = client_error("ProvisionedThroughputExceededException")
+        adaptive = AdaptiveClient(client, bucket, max_attempts=3, base_delay=0.001)
+
+        with pytest.raises(ClientError):
+            await adaptive.compare_faces()
+
+        assert client.compare_faces.await_count == 3
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            EndpointConnectionError(endpoint_url="https://rekognition.us-east-1.amazonaws.com"),
+            ReadTimeoutError(endpoint_url="https://rekognition.us-east-1.amazonaws.com"),
+        ],
+    )
+    async def test_retries_network_errors(self, client, bucket, error):
+        client.compare_faces.side_effect = [error, {"FaceMatches": []}]
+        adaptive = AdaptiveClient(client, bucket, base_delay=0.001)
+
+        assert await adaptive.compare_faces() == {"FaceMatches": []}
+
+        assert client.compare_faces.await_count == 2
+        assert bucket.stats()["throttles"] == 0
+
+    async def test_other_errors_are_not_retried(self, client, bucket):
+        client.compare_faces.side_effect = client_error("InvalidParameterException")
+        adaptive = AdaptiveClient(client, bucket)
+
+        with pytest.raises(ClientError):
+            await adaptive.compare_faces()
+
+        assert client.compare_faces.await_count == 1
+        assert bucket.stats()["throttles"] == 0
+
+    async def test_sheds_call_whose_token_is_past_budget(self, client):
+        bucket = AdaptiveTokenBucket("rekognition", rate=1, min_rate=1, max_rate=1)
+        adaptive = AdaptiveClient(client, bucket, budget=0.1)
+        await adaptive.compare_faces()
+
+        with pytest.raises(UpstreamSaturatedError):
+            await adaptive.compare_faces()
+
+        assert client.compare_faces.await_count == 1
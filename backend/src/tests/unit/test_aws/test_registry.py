@@ -0,0 +1,142 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from aws.config import AWSClientSettings
+from aws.offload import AdaptiveClient, CircuitBreakerClient, OffloadedClient, RateLimitedClient
+from aws.registry import SERVICES, AWSClientRegistry
+from aws.routing import RegionalClient
+from aws.transport import AsyncAWSClient
+
+
+class TestAWSClientRegistry:
+    @pytest.fixture
+    def settings(self):
+        return AWSClientSettings(
+            AWS_ACCESS_KEY="test",
+            AWS_SECRET_ACCESS_KEY="test",
+            AWS_REGION="us-east-1",
+            AWS_MAX_POOL_CONNECTIONS=25,
+            AWS_CONNECT_TIMEOUT=1.5,
+            AWS_READ_TIMEOUT=4.0,
+            AWS_RETRY_MODE="adaptive",
+            AWS_MAX_ATTEMPTS=2,
+            CIRCUIT_BREAKER_ENABLED=False,
+        )
+
+    @pytest.fixture
+    def registry(self, settings):
+        registry = AWSClientRegistry.from_settings(settings)
+        yield registry
+        registry.close()
+
+    def test_client_is_built_once(self, registry):
+        assert registry.client("rekognition") is registry.client("rekognition")
+        assert registry.rekognition is registry.rekognition
+        assert registry.cognito_idp.meta.service_model.service_name == "cognito-idp"
+
+    def test_client_config_from_settings(self, registry):
+        config = registry.s3.meta.config
+
+        assert config.max_pool_connections == 25
+        assert config.connect_timeout == 1.5
+        assert config.read_timeout == 4.0
+        assert config.retries == {"mode": "adaptive", "total_max_attempts": 2}
+        assert registry.s3.meta.region_name == "us-east-1"
+
+    def test_warm_up_builds_every_client(self):
+        session = MagicMock()
+        registry = AWSClientRegistry(session, config=MagicMock())
+
+        registry.warm_up()
+        registry.warm_up()
+
+        assert session.client.call_count == len(SERVICES)
+        assert [call.args[0] for call in session.client.call_args_list] == list(SERVICES)
+
+    async def test_async_client_runs_on_executor(self, registry):
+        assert isinstance(registry.s3, OffloadedClient)
+        assert registry.s3.exceptions is registry.client("s3").exceptions
+
+        with patch.object(registry.client("s3"), "delete_object", return_value={}) as delete_object:
+            assert await registry.s3.delete_object(Bucket="bucket", Key="key") == {}
+
+        delete_object.assert_called_once_with(Bucket="bucket", Key="key")
+        assert registry.stats()["s3"]["completed"] == 1
+
+    async def test_rate_limit_setting(self, settings):
+        settings.REKOGNITION_ADAPTIVE_RATE_LIMIT = False
+        settings.REKOGNITION_RATE_LIMIT = 5
+        registry = AWSClientRegistry.from_settings(settings)
+
+        assert isinstance(registry.rekognition, RateLimitedClient)
+        assert isinstance(registry.s3, OffloadedClient)
+        with patch.object(registry.client("rekognition"), "detect_faces", return_value={}):
+            await registry.rekognition.detect_faces(Image={"Bytes": b"image"})
+
+        assert registry.stats()["rekognition"]["rate_limit"]["acquired"] == 1
+        registry.close()
+
+    def test_adaptive_rate_limit_takes_over_throttle_retries(self, settings):
+        settings.REKOGNITION_RATE_LIMIT = 20
+        registry = AWSClientRegistry.from_settings(settings)
+
+        assert isinstance(registry.rekognition, AdaptiveClient)
+        assert registry.client("rekognition").meta.config.retries["total_max_attempts"] == 1
+        assert registry.client("s3").meta.config.retries["total_max_attempts"] == 2
+        assert registry.stats()["rekognition"]["rate_limit"]["max_rate"] == 20
+        registry.close()
+
+    async def test_circuit_breaker_setting(self, settings):
+        settings.CIRCUIT_BREAKER_ENABLED = True
+        registry = AWSClientRegistry.from_settings(settings)
+
+        assert isinstance(registry.s3, CircuitBreakerClient)
+        with patch.object(registry.client("s3"), "delete_object", return_value={}):
+            await registry.s3.delete_object(Bucket="bucket", Key="key")
+
+        assert registry.stats()["s3"]["circuit_breaker"]["state"] == "closed"
+        assert registry.stats()["s3"]["circuit_breaker"]["calls"] == 1
+        registry.close()
+
+    async def test_failover_regions_setting(self, settings):
+        settings.AWS_FAILOVER_REGIONS = ["us-west-2"]
+        settings.AWS_S3_REPLICA_BUCKETS = {"us-west-2": "bucket-us-west-2"}
+        registry = AWSClientRegistry.from_settings(settings)
+
+        assert isinstance(registry.rekognition, RegionalClient)
+        assert isinstance(registry.s3, RegionalClient)
+        assert isinstance(registry.cognito_idp, OffloadedClient)
+        assert registry.client("s3", "us-west-2").meta.region_name == "us-west-2"
+
+        outage = EndpointConnectionError(endpoint_url="https://s3.us-east-1.amazonaws.com")
+        with (
+            patch.object(registry.client("s3"), "get_object", side_effect=outage),
+            patch.object(registry.client("s3", "us-west-2"), "get_object", return_value={}) as get_object,
+        ):
+            assert await registry.s3.get_object(Bucket="bucket", Key="key") == {}
+
+        get_object.assert_called_once_with(Bucket="bucket-us-west-2", Key="key")
+        assert registry.stats()["s3"]["routing"]["failovers"] == 1
+        registry.close()
+
+    async def test_native_transport_setting(self, settings):
+        settings.AWS_TRANSPORT = "native"
+        registry = AWSClientRegistry.from_settings(settings)
+
+        assert isinstance(registry.cognito_idp, AsyncAWSClient)
+        assert registry.cognito_idp is registry.cognito_idp
+
+        await registry.aclose()
+
+    def test_close_closes_clients(self):
+        session = MagicMock()
+        registry = AWSClientRegistry(session, config=MagicMock())
+        client = registry.client("rekognition")
+
+        registry.close()
+
+        client.close.assert_called_once()
+        assert registry.client("rekognition") is not None
+        assert session.client.call_count == 2
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from aws.routing import RegionalClient, RegionRouter, replica_buckets
+from core.exceptions import CircuitOpenError
+
+
+class RegionStandIn:
+    """Regional endpoint stand-in with a set latency that can be taken down"""
+
+    def __init__(self, region: str, latency: float):
+        self.region = region
+        self.latency = latency
+        self.down = False
+        self.missing = False
+        self.calls: list[dict] = []
+        self.exceptions = None
+        self.meta = region
+
+    async def compare_faces(self, **params) -> dict:
+        self.calls.append(params)
+        await asyncio.sleep(self.latency)
+        if self.down:
+            raise EndpointConnectionError(endpoint_url=f"https://rekognition.{self.region}.amazonaws.com")
+        if self.missing:
+            raise ClientError({"Error": {"Code": "InvalidS3ObjectException"}}, "CompareFaces")
+        return {"FaceMatches": [], "Region": self.region}
+
+    async def index_faces(self, **params) -> dict:
+        self.calls.append(params)
+        return {"Region": self.region}
+
+
+def compare(client: RegionalClient, bucket: str = "faces") -> asyncio.Future:
+    return client.compare_faces(SourceImage={"S3Object": {"Bucket": bucket, "Name": "face_1.jpg"}})
+
+
+class TestRegionalClient:
+    @pytest.fixture
+    def regions(self):
+        return {
+            "us-east-1": RegionStandIn("us-east-1", 0.02),
+            "us-west-2": RegionStandIn("us-west-2", 0.001),
+            "eu-west-1": RegionStandIn("eu-west-1", 0.001),
+        }
+
+    @pytest.fixture
+    def router(self):
+        return RegionRouter("rekognition", "us-east-1", ["us-west-2", "eu-west-1"], min_calls=3, explore_rate=0)
+
+    @pytest.fixture
+    def client(self, router, regions):
+        return RegionalClient(
+            router,
+            regions,
+            {"compare_faces"},
+            localize=replica_buckets("us-east-1", {"us-west-2": "faces-us-west-2"}),
+        )
+
+    async def test_reads_start_in_home_region(self, client, regions):
+        response = await compare(client)
+
+        assert response["Region"] == "us-east-1"
+        assert regions["us-east-1"].calls[0]["SourceImage"]["S3Object"]["Bucket"] == "faces"
+
+    async def test_fails_over_and_uses_replica_bucket(self, client, regions, router):
+        regions["us-east-1"].down = True
+
+        response = await compare(client)
+
+        assert response["Region"] == "us-west-2"
+        assert regions["us-west-2"].calls[0]["SourceImage"]["S3Object"]["Bucket"] == "faces-us-west-2"
+        assert router.stats()["failovers"] == 1
+
+    async def test_outage_moves_reads_away_from_region(self, client, regions, router):
+        regions["us-east-1"].down = True
+        for _ in range(3):
+            await compare(client)
+
+        regions["us-east-1"].calls.clear()
+        await compare(client)
+
+        assert router.order()[-1] == "us-east-1"
+        assert regions["us-east-1"].calls == []
+
+    async def test_faster_region_takes_over(self, client, regions, router):
+        # Let every region's latency be known
+        for region in ("us-east-1", "us-west-2"):
+            router.record(region, regions[region].latency, False)
+
+        assert router.order()[0] == "us-west-2"
+        assert (await compare(client))["Region"] == "us-west-2"
+
+    async def test_replica_missing_object_falls_back_to_home_region(self, client, regions, router):
+        for region in ("us-east-1", "us-west-2", "eu-west-1"):
+            router.record(region, regions[region].latency, False)
+        # Not replicated yet
+        regions["us-west-2"].missing = True
+
+        response = await compare(client)
+
+        assert response["Region"] == "us-east-1"
+        assert len(regions["us-west-2"].calls) == 1
+        assert regions["eu-west-1"].calls == []
+
+    async def test_region_without_replica_is_skipped(self, client, regions):
+        regions["us-east-1"].down = True
+        regions["us-west-2"].down = True
+
+        with pytest.raises(EndpointConnectionError):
+            await compare(client)
+
+        assert regions["eu-west-1"].calls == []
+
+    async def test_open_circuit_fails_over(self, router):
+        class OpenCircuit:
+            async def compare_faces(self, **params):
+                raise CircuitOpenError("Upstream rekognition is unavailable, try again later")
+
+        fallback = RegionStandIn("us-west-2", 0)
+        client = RegionalClient(router, {"us-east-1": OpenCircuit(), "us-west-2": fallback}, {"compare_faces"})
+        router.regions = ["us-east-1", "us-west-2"]
+
+        assert (await client.compare_faces(TargetImage={"Bytes": b"image"}))["Region"] == "us-west-2"
+
+    async def test_request_errors_do_not_fail_over(self, router):
+        class BadRequest:
+            async def compare_faces(self, **params):
+                raise ClientError({"Error": {"Code": "InvalidParameterException"}}, "CompareFaces")
+
+        fallback = RegionStandIn("us-west-2", 0)
+        client = RegionalClient(router, {"us-east-1": BadRequest(), "us-west-2": fallback}, {"compare_faces"})
+        router.regions = ["us-east-1", "us-west-2"]
+
+        with pytest.raises(ClientError):
+            await client.compare_faces(TargetImage={"Bytes": b"image"})
+        assert fallback.calls == []
+
+    async def test_writes_stay_in_home_region(self, client, regions):
+        regions["us-east-1"].down = True
+
+        assert (await client.index_faces(CollectionId="faces"))["Region"] == "us-east-1"
+        assert regions["us-west-2"].calls == []
@@ -0,0 +1,138 @@
+import base64
+import io
+import json
+from unittest.mock import AsyncMock
+
+import boto3
+import httpx
+import pytest
+from botocore.credentials import Credentials
+
+from aws.transport import AsyncAWSClient
+from core import deadline
+
+ENDPOINT_URL = "http://aws-standin.local"
+
+
+class AWSStandIn:
+    """Local HTTP stand-in answering with canned responses and recording requests"""
+
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []
+
+    def reply(self, status_code: int = 200, **kwargs) -> None:
+        self.responses.append(httpx.Response(status_code, **kwargs))
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+class TestAsyncAWSClient:
+    @pytest.fixture
+    def standin(self):
+        return AWSStandIn()
+
+    @pytest.fixture
+    def fallback(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def make_client(self, standin, fallback):
+        http = httpx.AsyncClient(transport=httpx.MockTransport(standin))
+
+        def make_client(service_name: str) -> AsyncAWSClient:
+            client = boto3.client(
+                service_name,
+                region_name="us-east-1",
+                endpoint_url=ENDPOINT_URL,
+                aws_access_key_id="test",
+                aws_secret_access_key="test",
+            )
+            return AsyncAWSClient(client, Credentials("test", "test"), http, fallback, max_attempts=2)
+
+        return make_client
+
+    async def test_unsigned_cognito_operation(self, make_client, standin):
+        standin.reply(json={"ChallengeName": "CUSTOM_CHALLENGE", "Session": "session"})
+        cognito = make_client("cognito-idp")
+
+        response = await cognito.initiate_auth(
+            ClientId="client", AuthFlow="USER_PASSWORD_AUTH", AuthParameters={"USERNAME": "user"}
+        )
+
+        assert response["ChallengeName"] == "CUSTOM_CHALLENGE"
+        request = standin.requests[0]
+        assert request.headers["X-Amz-Target"] == "AWSCognitoIdentityProviderService.InitiateAuth"
+        assert "Authorization" not in request.headers
+        assert json.loads(request.content)["ClientId"] == "client"
+
+    async def test_signed_rekognition_operation(self, make_client, standin):
+        standin.reply(json={"FaceMatches": [{"Similarity": 99.5}], "UnmatchedFaces": []})
+        rekognition = make_client("rekognition")
+
+        response = await rekognition.compare_faces(
+            SourceImage={"S3Object": {"Bucket": "bucket", "Name": "face_1.jpg"}},
+            TargetImage={"Bytes": b"image"},
+            SimilarityThreshold=95.0,
+        )
+
+        assert response["FaceMatches"][0]["Similarity"] == 99.5
+        request = standin.requests[0]
+        assert request.headers["Authorization"].startswith("AWS4-HMAC-SHA256 Credential=test/")
+        assert "/us-east-1/rekognition/aws4_request" in request.headers["Authorization"]
+        assert json.loads(request.content)["TargetImage"]["Bytes"] == base64.b64encode(b"image").decode()
+
+    async def test_modeled_error(self, make_client, standin):
+        standin.reply(400, json={"__type": "InvalidParameterException", "message": "bad image"})
+        rekognition = make_client("rekognition")
+
+        with pytest.raises(rekognition.exceptions.InvalidParameterException) as e:
+            await rekognition.detect_faces(Image={"Bytes": b"image"})
+
+        assert e.value.response["Error"]["Code"] == "InvalidParameterException"
+        assert len(standin.requests) == 1
+
+    async def test_retries_throttling(self, make_client, standin):
+        standin.reply(400, json={"__type": "ThrottlingException", "message": "slow down"})
+        standin.reply(json={"FaceDetails": []})
+        rekognition = make_client("rekognition")
+
+        response = await rekognition.detect_faces(Image={"Bytes": b"image"})
+
+        assert response["FaceDetails"] == []
+        assert len(standin.requests) == 2
+
+    async def test_no_retry_past_request_deadline(self, make_client, standin, monkeypatch):
+        standin.reply(400, json={"__type": "ThrottlingException", "message": "slow down"})
+        rekognition = make_client("rekognition")
+        # The retry would wait 0.1s
+        monkeypatch.setattr("aws.transport.random.random", lambda: 1.0)
+
+        with deadline.within(0.05), pytest.raises(rekognition.exceptions.ThrottlingException):
+            await rekognition.detect_faces(Image={"Bytes": b"image"})
+
+        assert len(standin.requests) == 1
+
+    async def test_s3_put_and_delete(self, make_client, standin):
+        standin.reply(headers={"ETag": '"etag"'})
+        standin.reply(204)
+        s3 = make_client("s3")
+
+        await s3.upload_fileobj(io.BytesIO(b"image"), "bucket", "face_1.jpg")
+        await s3.delete_object(Bucket="bucket", Key="face_1.jpg")
+
+        put, delete = standin.requests
+        assert (put.method, put.url.path, put.content) == ("PUT", "/bucket/face_1.jpg", b"image")
+        assert "x-amz-content-sha256" in put.headers
+        assert (delete.method, delete.url.path) == ("DELETE", "/bucket/face_1.jpg")
+
+    async def test_other_operations_fall_back(self, make_client, standin, fallback):
+        fallback.global_sign_out.return_value = {}
+        cognito = make_client("cognito-idp")
+
+        assert await cognito.global_sign_out(AccessToken="token") == {}
+
+        fallback.global_sign_out.assert_awaited_once_with(AccessToken="token")
+        assert standin.requests == []
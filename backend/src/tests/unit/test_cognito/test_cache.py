@@ -0,0 +1,130 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import jwt
+import pytest
+
+from cognito.cache import ProfileCache
+from cognito.service import CognitoTokenService
+
+
+def access_token(username: str, expires_in: float = 3600, jti: str = "1") -> str:
+    claims = {"username": username, "exp": int(time.time() + expires_in), "jti": jti}
+    return jwt.encode(claims, "secret", algorithm="HS256")
+
+
+def profile(username: str) -> dict:
+    return {"username": username, "attributes": {"sub": username, "email": username, "email_verified": "true"}}
+
+
+class TestProfileCache:
+    @pytest.fixture
+    def cache(self):
+        return ProfileCache(ttl=60, max_size=2)
+
+    async def test_repeated_lookups_hit(self, cache):
+        load = AsyncMock(return_value=profile("alice"))
+        token = access_token("alice")
+
+        for _ in range(3):
+            assert await cache.get(token, load) == profile("alice")
+
+        load.assert_awaited_once()
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+
+    async def test_concurrent_misses_share_one_lookup(self, cache):
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return profile("alice")
+
+        token = access_token("alice")
+        results = await asyncio.gather(*(cache.get(token, load) for _ in range(5)))
+
+        assert results == [profile("alice")] * 5
+        assert calls == 1
+        assert cache.stats()["coalesced"] == 4
+
+    async def test_ttl_capped_by_token_expiry(self, cache, monkeypatch):
+        load = AsyncMock(return_value=profile("alice"))
+        token = access_token("alice", expires_in=5)
+        await cache.get(token, load)
+
+        clock = time.monotonic() + 6
+        monkeypatch.setattr(time, "monotonic", lambda: clock)
+        await cache.get(token, load)
+
+        assert load.await_count == 2
+
+    async def test_expired_token_is_not_cached(self, cache):
+        load = AsyncMock(return_value=profile("alice"))
+        token = access_token("alice", expires_in=-1)
+
+        await cache.get(token, load)
+        await cache.get(token, load)
+
+        assert load.await_count == 2
+
+    async def test_least_recently_used_evicted(self, cache):
+        tokens = {name: access_token(name) for name in ("alice", "bob", "carol")}
+        loads = {name: AsyncMock(return_value=profile(name)) for name in tokens}
+
+        await cache.get(tokens["alice"], loads["alice"])
+        await cache.get(tokens["bob"], loads["bob"])
+        await cache.get(tokens["alice"], loads["alice"])
+        await cache.get(tokens["carol"], loads["carol"])
+        await cache.get(tokens["alice"], loads["alice"])
+        await cache.get(tokens["bob"], loads["bob"])
+
+        assert loads["alice"].await_count == 1
+        assert loads["bob"].await_count == 2
+        assert cache.stats()["evictions"] == 2
+
+    async def test_failed_lookup_is_not_cached(self, cache):
+        load = AsyncMock(side_effect=[RuntimeError("down"), profile("alice")])
+        token = access_token("alice")
+
+        with pytest.raises(RuntimeError):
+            await cache.get(token, load)
+        assert await cache.get(token, load) == profile("alice")
+
+    async def test_invalidate_drops_all_tokens_of_user(self, cache):
+        laptop, phone = access_token("alice", jti="laptop"), access_token("alice", jti="phone")
+        load = AsyncMock(return_value=profile("alice"))
+        await cache.get(laptop, load)
+        await cache.get(phone, load)
+
+        cache.invalidate(laptop)
+
+        assert cache.stats()["size"] == 0
+
+    async def test_invalidate_uncached_token_drops_user(self, cache):
+        await cache.get(access_token("alice", jti="laptop"), AsyncMock(return_value=profile("alice")))
+        await cache.get(access_token("bob"), AsyncMock(return_value=profile("bob")))
+
+        # The phone's profile was never looked up
+        cache.invalidate(access_token("alice", jti="phone"))
+
+        assert cache.stats()["size"] == 1
+
+
+class TestCognitoTokenServiceProfileCache:
+    async def test_logout_invalidates_cached_profile(self):
+        repo = AsyncMock()
+        repo.get_user_profile.return_value = profile("alice")
+        service = CognitoTokenService(repo, ProfileCache())
+        token = access_token("alice")
+
+        await service.get_user_profile(token)
+        await service.get_user_profile(token)
+        await service.logout(token)
+        await service.get_user_profile(token)
+
+        repo.logout.assert_awaited_once_with(token)
+        assert repo.get_user_profile.await_count == 2
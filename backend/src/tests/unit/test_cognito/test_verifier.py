@@ -0,0 +1,158 @@
+import json
+import time
+from unittest.mock import AsyncMock
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from cognito.exceptions import NotAuthorizedError
+from cognito.verifier import CognitoTokenVerifier, FileJWKSSource, JWKSCache, JWKSSource
+
+ISSUER = "https://cognito-idp.us-east-1.amazonaws.com/us-east-1_pool"
+CLIENT_ID = "client-id"
+
+
+class InMemoryJWKSSource(JWKSSource):
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.fetches = 0
+
+    async def fetch(self) -> dict:
+        self.fetches += 1
+        return {"keys": [jwk for _, jwk in self.keys]}
+
+
+def make_key(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = RSAAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update(kid=kid, alg="RS256", use="sig")
+    return private_key, jwk
+
+
+def make_token(private_key, kid: str, **overrides) -> str:
+    now = int(time.time())
+    claims = {
+        "sub": "1111-2222",
+        "iss": ISSUER,
+        "client_id": CLIENT_ID,
+        "token_use": "access",
+        "username": "john.doe@example.com",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+class TestCognitoTokenVerifier:
+    @pytest.fixture
+    def signing_key(self):
+        return make_key("kid-1")
+
+    @pytest.fixture
+    def source(self, signing_key):
+        return InMemoryJWKSSource(signing_key)
+
+    @pytest.fixture
+    def verifier(self, source):
+        return CognitoTokenVerifier(JWKSCache(source), issuer=ISSUER, client_id=CLIENT_ID)
+
+    async def test_profile_from_access_token(self, verifier, signing_key):
+        # Email-as-username pools name users by an opaque id, the email comes from get_user
+        lookup = AsyncMock(
+            return_value={
+                "username": "0f6e-4d1c",
+                "attributes": {"sub": "1111-2222", "email": "john.doe@example.com", "email_verified": "true"},
+            }
+        )
+
+        for _ in range(3):
+            profile = await verifier.get_profile(make_token(signing_key[0], "kid-1", username="0f6e-4d1c"), lookup)
+
+        assert profile.sub == "1111-2222"
+        assert profile.username == "0f6e-4d1c"
+        assert profile.email == "john.doe@example.com"
+        assert profile.email_verified is True
+        lookup.assert_awaited_once()
+
+    async def test_profile_from_id_token(self, signing_key, source):
+        verifier = CognitoTokenVerifier(JWKSCache(source), issuer=ISSUER, client_id=CLIENT_ID, token_use="id")
+        lookup = AsyncMock()
+        token = make_token(
+            signing_key[0],
+            "kid-1",
+            token_use="id",
+            aud=CLIENT_ID,
+            email="john.doe@example.com",
+            email_verified=False,
+        )
+
+        profile = await verifier.get_profile(token, lookup)
+
+        assert profile.email == "john.doe@example.com"
+        assert profile.email_verified is False
+        lookup.assert_not_awaited()
+
+    async def test_keys_are_cached(self, verifier, source, signing_key):
+        for _ in range(3):
+            await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+        assert source.fetches == 1
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"exp": int(time.time()) - 10},
+            {"iss": "https://cognito-idp.us-east-1.amazonaws.com/other_pool"},
+            {"client_id": "other-client"},
+            {"token_use": "id"},
+        ],
+    )
+    async def test_rejects_invalid_claims(self, verifier, signing_key, overrides):
+        with pytest.raises(NotAuthorizedError):
+            await verifier.verify(make_token(signing_key[0], "kid-1", **overrides))
+
+    async def test_rejects_forged_signature(self, verifier):
+        forged_key, _ = make_key("kid-1")
+
+        with pytest.raises(NotAuthorizedError):
+            await verifier.verify(make_token(forged_key, "kid-1"))
+
+    async def test_refreshes_on_unknown_kid(self, verifier, source, signing_key):
+        await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+        rotated_key = make_key("kid-2")
+        source.keys.append(rotated_key)
+        verifier.keys.min_refresh_interval = 0
+
+        await verifier.verify(make_token(rotated_key[0], "kid-2"))
+        assert source.fetches == 2
+
+    async def test_unknown_kid_refresh_is_rate_limited(self, verifier, source, signing_key):
+        await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+        for _ in range(3):
+            with pytest.raises(NotAuthorizedError):
+                await verifier.verify(make_token(signing_key[0], "made-up"))
+
+        assert source.fetches == 1
+
+    async def test_failed_refresh_is_retried(self, verifier, source, signing_key):
+        fetch = source.fetch
+        source.fetch = AsyncMock(side_effect=OSError("unreachable"))
+        with pytest.raises(NotAuthorizedError):
+            await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+        source.fetch = fetch
+        await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+    async def test_file_source(self, tmp_path, signing_key):
+        jwks_path = tmp_path / "jwks.json"
+        jwks_path.write_text(json.dumps({"keys": [signing_key[1]]}))
+        verifier = CognitoTokenVerifier(JWKSCache(FileJWKSSource(jwks_path)), issuer=ISSUER, client_id=CLIENT_ID)
+
+        claims = await verifier.verify(make_token(signing_key[0], "kid-1"))
+
+        assert claims["sub"] == "1111-2222"
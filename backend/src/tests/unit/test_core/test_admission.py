@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from core.admission import ByteBudget
+from core.exceptions import ServiceUnavailableError
+
+
+class TestByteBudget:
+    @pytest.fixture
+    def budget(self):
+        return ByteBudget("images", capacity=100, max_wait=0.2)
+
+    async def test_admits_within_capacity(self, budget):
+        async with budget.reserve(60), budget.reserve(40):
+            assert budget.stats()["in_use"] == 100
+
+        stats = budget.stats()
+        assert stats["in_use"] == 0
+        assert stats["high_water"] == 100
+        assert stats["admitted"] == 2
+        assert stats["waited"] == 0
+
+    async def test_waits_for_release(self, budget):
+        order = []
+
+        async def hold(name: str, nbytes: int, duration: float):
+            async with budget.reserve(nbytes):
+                order.append(name)
+                await asyncio.sleep(duration)
+
+        first = asyncio.create_task(hold("first", 80, 0.05))
+        await asyncio.sleep(0)
+        await asyncio.gather(hold("second", 50, 0), first)
+
+        assert order == ["first", "second"]
+        assert budget.stats()["waited"] == 1
+        assert budget.stats()["high_water"] == 80
+
+    async def test_serves_waiters_in_order(self, budget):
+        order = []
+        release = asyncio.Event()
+
+        async def hold(name: str, nbytes: int):
+            async with budget.reserve(nbytes):
+                order.append(name)
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold("big", 100))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold("large", 90)))
+        await asyncio.sleep(0)
+        # Would fit next to "large" but must not overtake it
+        tasks.append(asyncio.create_task(hold("small", 10)))
+        await asyncio.sleep(0.01)
+        assert order == ["big"]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == ["big", "large", "small"]
+
+    async def test_sheds_after_max_wait(self, budget):
+        async with budget.reserve(100):
+            with pytest.raises(ServiceUnavailableError) as e:
+                async with budget.reserve(1):
+                    pass
+
+        assert e.value.retry_after == 1
+        stats = budget.stats()
+        assert stats["shed"] == 1
+        assert stats["waiting"] == 0
+        assert stats["in_use"] == 0
+
+    async def test_clamps_reservation_to_capacity(self, budget):
+        async with budget.reserve(1000):
+            assert budget.stats()["in_use"] == 100
+
+    async def test_cancelled_waiter_does_not_leak(self, budget):
+        release = asyncio.Event()
+
+        async def hold(nbytes: int):
+            async with budget.reserve(nbytes):
+                await release.wait()
+
+        holder = asyncio.create_task(hold(100))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold(50))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        release.set()
+        await holder
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert budget.stats()["in_use"] == 0
+        assert budget.stats()["waiting"] == 0
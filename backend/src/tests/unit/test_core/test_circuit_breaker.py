@@ -0,0 +1,90 @@
+import time
+from contextlib import suppress
+
+import pytest
+
+from core.circuit_breaker import CircuitBreaker, CircuitState
+from core.exceptions import CircuitOpenError, UpstreamSaturatedError
+
+
+class UpstreamDown(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+def call(breaker: CircuitBreaker, error: Exception | None = None) -> None:
+    with suppress(UpstreamDown, BadRequest, UpstreamSaturatedError), breaker.guard():
+        if error is not None:
+            raise error
+
+
+class TestCircuitBreaker:
+    @pytest.fixture
+    def breaker(self):
+        return CircuitBreaker(
+            "upstream",
+            is_failure=lambda e: isinstance(e, UpstreamDown),
+            window=10,
+            min_calls=4,
+            failure_rate=0.5,
+            open_duration=60,
+            half_open_calls=2,
+        )
+
+    def test_opens_at_failure_rate_and_fails_fast(self, breaker):
+        for error in (None, UpstreamDown(), None):
+            call(breaker, error)
+        assert breaker.state == CircuitState.CLOSED
+
+        call(breaker, UpstreamDown())
+
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitOpenError) as exc_info:
+            call(breaker)
+        assert exc_info.value.retry_after == 60
+        assert breaker.stats()["rejected"] == 1
+
+    def test_rejected_requests_and_shed_calls_are_not_failures(self, breaker):
+        for _ in range(4):
+            call(breaker, BadRequest())
+            call(breaker, UpstreamSaturatedError("busy"))
+
+        stats = breaker.stats()
+        assert stats["state"] == CircuitState.CLOSED
+        assert stats["calls"] == 4
+        assert stats["failure_rate"] == 0
+
+    def test_opens_at_slow_call_rate(self, breaker):
+        breaker.slow_call_duration = 0.01
+        for _ in range(4):
+            with breaker.guard():
+                time.sleep(0.02)
+
+        assert breaker.state == CircuitState.OPEN
+
+    def test_half_open_probes_close_it_again(self, breaker, monkeypatch):
+        for _ in range(4):
+            call(breaker, UpstreamDown())
+        clock = time.monotonic() + 61
+        monkeypatch.setattr(time, "monotonic", lambda: clock)
+
+        assert breaker.state == CircuitState.HALF_OPEN
+        with breaker.guard(), breaker.guard():
+            # Both probe slots are taken
+            pytest.raises(CircuitOpenError, call, breaker)
+
+        assert breaker.state == CircuitState.CLOSED
+
+    def test_failed_probe_reopens_it(self, breaker, monkeypatch):
+        for _ in range(4):
+            call(breaker, UpstreamDown())
+        clock = time.monotonic() + 61
+        monkeypatch.setattr(time, "monotonic", lambda: clock)
+
+        call(breaker, UpstreamDown())
+
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.stats()["opened"] == 2
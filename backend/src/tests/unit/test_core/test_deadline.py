@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
+
+from core import deadline
+from core.exceptions import DeadlineExceededError
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.add_middleware(deadline.DeadlineMiddleware, default_timeout=1.0, route_timeouts={"/slow": 0.05}, grace=0.05)
+
+    @app.exception_handler(DeadlineExceededError)
+    async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> JSONResponse:
+        return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT, content={"detail": str(exc)})
+
+    @app.get("/remaining")
+    async def remaining() -> dict:
+        return {"remaining": deadline.remaining()}
+
+    @app.get("/slow")
+    async def slow() -> dict:
+        async with deadline.bounded():
+            await asyncio.sleep(10)
+        return {}
+
+    @app.get("/stuck")
+    async def stuck() -> dict:
+        # Ignores the deadline, the middleware has to cut it off
+        await asyncio.sleep(10)
+        return {}
+
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+class TestDeadline:
+    def test_no_deadline_outside_a_request(self):
+        assert deadline.remaining() is None
+        assert deadline.timeout(5.0) == 5.0
+        assert deadline.allows(100.0)
+
+    def test_nested_scope_cannot_extend_deadline(self):
+        with deadline.within(0.5):
+            with deadline.within(10):
+                assert deadline.remaining() <= 0.5
+            assert deadline.timeout(5.0) <= 0.5
+            assert not deadline.allows(1.0)
+        assert deadline.remaining() is None
+
+    async def test_bounded_raises_at_deadline(self):
+        with deadline.within(0.02), pytest.raises(DeadlineExceededError):
+            async with deadline.bounded():
+                await asyncio.sleep(1)
+
+    async def test_bounded_fails_fast_once_deadline_passed(self):
+        with deadline.within(0), pytest.raises(DeadlineExceededError):
+            async with deadline.bounded():
+                pytest.fail("ran past the deadline")
+
+
+class TestDeadlineMiddleware:
+    async def test_sets_route_deadline(self, client):
+        response = await client.get("/remaining")
+
+        assert 0.9 < response.json()["remaining"] <= 1.0
+
+    async def test_bounded_call_answers_504(self, client):
+        response = await asyncio.wait_for(client.get("/slow"), timeout=1)
+
+        assert response.status_code == 504
+        assert response.json() == {"detail": "Request deadline exceeded"}
+
+    async def test_handler_past_deadline_is_cut_off(self, client):
+        response = await asyncio.wait_for(client.get("/stuck"), timeout=2)
+
+        assert response.status_code == 504
@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.exceptions import UpstreamSaturatedError
+from core.executors import UpstreamExecutor
+
+
+class TestUpstreamExecutor:
+    @pytest.fixture
+    def executor(self):
+        executor = UpstreamExecutor("test", max_concurrency=2, max_queue=1)
+        yield executor
+        executor.shutdown()
+
+    async def test_run_off_the_event_loop(self, executor):
+        loop_thread = threading.get_ident()
+
+        worker_thread = await executor.run(threading.get_ident)
+
+        assert worker_thread != loop_thread
+        assert executor.stats()["completed"] == 1
+
+    async def test_run_passes_arguments_and_errors(self, executor):
+        assert await executor.run(pow, 2, exp=3) == 8
+
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(lambda: 1 / 0)
+
+    async def test_rejects_when_queue_is_full(self, executor):
+        release = threading.Event()
+        blocked = [asyncio.create_task(executor.run(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        stats = executor.stats()
+        assert stats["in_flight"] == 2
+        assert stats["queue_depth"] == 1
+
+        with pytest.raises(UpstreamSaturatedError) as e:
+            await executor.run(release.wait)
+        assert e.value.retry_after == 1
+
+        release.set()
+        await asyncio.gather(*blocked)
+
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 3
+        assert stats["queue_depth"] == 0
+        assert stats["wait_time_max_ms"] > 0
+
+    async def test_cancelled_call_counts_until_its_thread_is_free(self, executor):
+        release = threading.Event()
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        queued = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+        # Both threads are still blocked, so the queue stays full
+        stats = executor.stats()
+        assert stats["in_flight"] == 2
+        assert stats["queue_depth"] == 1
+        with pytest.raises(UpstreamSaturatedError):
+            await executor.run(release.wait)
+
+        release.set()
+        await queued
+        await asyncio.sleep(0.05)
+
+        stats = executor.stats()
+        assert stats["in_flight"] == 0
+        assert stats["queue_depth"] == 0
+
+    async def test_cancelled_before_starting_is_released(self, executor):
+        release = threading.Event()
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        queued = asyncio.create_task(executor.run(release.wait))
+        await asyncio.sleep(0.05)
+
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+
+        assert executor.stats()["queue_depth"] == 0
+        release.set()
+        await asyncio.gather(*running)
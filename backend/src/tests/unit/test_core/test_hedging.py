@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from core.hedging import HedgingPolicy
+from core.latency import LatencyHistogram
+
+
+def policy(budget: float = 1.0) -> HedgingPolicy:
+    latencies = LatencyHistogram()
+    for _ in range(100):
+        latencies.record(0.01)
+    return HedgingPolicy("upstream", latencies, percentile=95, budget=budget, min_delay=0.01)
+
+
+class TestHedgingPolicy:
+    async def test_hedge_answers_for_slow_call(self):
+        hedging = policy()
+        delays = iter([10.0, 0.001])
+        cancelled = []
+
+        async def call():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        assert await asyncio.wait_for(hedging.run(call), timeout=1) == 0.001
+
+        await asyncio.sleep(0)
+        assert cancelled == [10.0]
+        stats = hedging.stats()
+        assert stats["hedged"] == 1
+        assert stats["hedge_wins"] == 1
+
+    async def test_no_hedge_before_enough_samples(self):
+        hedging = HedgingPolicy("upstream", LatencyHistogram(), budget=1.0)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+
+        await hedging.run(call)
+
+        assert calls == 1
+        assert hedging.latencies.count() == 1
+
+    async def test_budget_limits_hedges(self):
+        hedging = policy(budget=0.5)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.03)
+
+        for _ in range(4):
+            await hedging.run(call)
+
+        # Two calls earn one hedge
+        assert hedging.stats()["hedged"] == 2
+        assert hedging.stats()["over_budget"] == 2
+        assert calls == 6
+
+    async def test_error_raised_once_both_calls_fail(self):
+        hedging = policy()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            raise ValueError(calls)
+
+        with pytest.raises(ValueError):
+            await hedging.run(call)
+
+        assert calls == 2
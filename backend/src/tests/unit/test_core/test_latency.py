@@ -0,0 +1,34 @@
+import time
+
+import pytest
+
+from core.latency import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    def test_percentiles_within_bucket_growth(self):
+        histogram = LatencyHistogram(growth=1.1)
+        for i in range(1, 101):
+            histogram.record(i / 1000)
+
+        assert histogram.count() == 100
+        assert histogram.percentile(50) == pytest.approx(0.050, rel=0.1)
+        assert histogram.percentile(99) == pytest.approx(0.099, rel=0.1)
+        assert histogram.percentile(50) >= 0.050
+
+    def test_empty_histogram_has_no_percentile(self):
+        assert LatencyHistogram().percentile(99) is None
+
+    def test_old_latencies_age_out(self, monkeypatch):
+        clock = 1000.0
+        monkeypatch.setattr(time, "monotonic", lambda: clock)
+        histogram = LatencyHistogram(window=60, slices=6)
+        histogram.record(5.0)
+
+        clock += 30
+        histogram.record(0.1)
+        assert histogram.percentile(100) == pytest.approx(5.0, rel=0.1)
+
+        clock += 35
+        assert histogram.count() == 1
+        assert histogram.percentile(100) == pytest.approx(0.1, rel=0.1)
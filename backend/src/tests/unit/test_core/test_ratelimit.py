@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+
+from core.exceptions import UpstreamSaturatedError
+from core.ratelimit import AdaptiveTokenBucket, TokenBucket
+
+
+class TestTokenBucket:
+    async def test_burst_passes_without_waiting(self):
+        bucket = TokenBucket("upstream", rate=10, burst=5)
+
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+
+        assert time.monotonic() - started < 0.05
+        assert bucket.stats()["waited"] == 0
+
+    async def test_holds_callers_to_rate(self):
+        bucket = TokenBucket("upstream", rate=50, burst=1)
+
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(11)))
+
+        # The first token is free, the other ten arrive at 50 per second
+        assert time.monotonic() - started == pytest.approx(0.2, abs=0.05)
+        stats = bucket.stats()
+        assert stats["acquired"] == 11
+        assert stats["waited"] == 10
+        assert stats["wait_time_max"] == pytest.approx(0.2, abs=0.01)
+
+    async def test_cancelled_waiter_returns_its_token(self):
+        bucket = TokenBucket("upstream", rate=10, burst=1)
+        await bucket.acquire()
+
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        started = time.monotonic()
+        await bucket.acquire()
+        # Due 0.1s after the first token rather than 0.2s
+        assert time.monotonic() - started < 0.15
+
+    async def test_sheds_caller_past_max_wait(self):
+        bucket = TokenBucket("upstream", rate=2, burst=1)
+        await bucket.acquire()
+
+        with pytest.raises(UpstreamSaturatedError) as exc_info:
+            await bucket.acquire(max_wait=0.1)
+
+        assert exc_info.value.retry_after == 1
+        stats = bucket.stats()
+        assert stats["acquired"] == 1
+        assert stats["shed"] == 1
+
+    def test_rejects_non_positive_rate(self):
+        with pytest.raises(ValueError):
+            TokenBucket("upstream", rate=0)
+
+
+class TestAdaptiveTokenBucket:
+    def test_throttle_halves_rate_once_per_cooldown(self):
+        bucket = AdaptiveTokenBucket("upstream", rate=40, min_rate=5, max_rate=100, cooldown=10)
+
+        bucket.on_throttle()
+        bucket.on_throttle()
+
+        assert bucket.rate == 20
+        assert bucket.burst == 20
+        stats = bucket.stats()
+        assert stats["throttles"] == 2
+        assert stats["decreases"] == 1
+
+    def test_success_raises_rate_additively(self):
+        bucket = AdaptiveTokenBucket("upstream", rate=10, min_rate=1, max_rate=100)
+
+        for _ in range(10):
+            bucket.on_success()
+
+        # A second's worth of successes adds about `increase` per second
+        assert bucket.rate == pytest.approx(11, abs=0.05)
+
+    def test_rate_stays_within_bounds(self):
+        bucket = AdaptiveTokenBucket("upstream", rate=2, min_rate=1, max_rate=3, cooldown=0)
+
+        for _ in range(5):
+            bucket.on_throttle()
+        assert bucket.rate == 1
+
+        for _ in range(100):
+            bucket.on_success()
+        assert bucket.rate == 3
@@ -0,0 +1,228 @@
+import asyncio
+import os
+import threading
+from typing import Annotated, Self
+
+import httpx
+import pytest
+from fastapi import FastAPI, File, Request, UploadFile
+
+from core.config import Settings
+from core.uploads import MULTIPART_OVERHEAD, BodySizeLimitMiddleware, read_body, read_upload
+
+MB = 1024 * 1024
+LIMIT = 10 * MB
+CHUNK = b"\xff" * (256 * 1024)
+BOUNDARY = "upload-test-boundary"
+
+
+def multipart_body(size: int, sent: list[int]):
+    """Stream a multipart body with a `size`-byte file, counting the bytes the server pulled"""
+
+    async def body():
+        yield f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; filename="face.jpg"\r\n'.encode()
+        yield b"Content-Type: image/jpeg\r\n\r\n"
+        for start in range(0, size, len(CHUNK)):
+            chunk = CHUNK[: min(len(CHUNK), size - start)]
+            sent[0] += len(chunk)
+            yield chunk
+        yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+    return body()
+
+
+def raw_body(size: int, sent: list[int]):
+    async def body():
+        for start in range(0, size, len(CHUNK)):
+            chunk = CHUNK[: min(len(CHUNK), size - start)]
+            sent[0] += len(chunk)
+            yield chunk
+
+    return body()
+
+
+class PeakRSS:
+    """Sample this process's resident set size in the background and keep the peak"""
+
+    def __init__(self, interval: float = 0.002):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def rss(self) -> int:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    def __enter__(self) -> Self:
+        self.baseline = self.peak = self.rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def growth(self) -> int:
+        return self.peak - self.baseline
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+
+@pytest.fixture
+def app():
+    app = FastAPI()
+    app.state.received = []
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=LIMIT + MULTIPART_OVERHEAD)
+
+    @app.post("/upload")
+    async def upload(image: Annotated[UploadFile, File()]) -> dict:
+        data = await read_upload(image, LIMIT)
+        app.state.received.append(len(data))
+        # Stand-in for the upstream calls the image would be held across
+        await asyncio.sleep(0.01)
+        return {"size": len(data)}
+
+    @app.post("/raw")
+    async def raw(request: Request) -> dict:
+        data = await read_body(request, LIMIT)
+        app.state.received.append(len(data))
+        return {"size": len(data)}
+
+    return app
+
+
+@pytest.fixture
+async def client(app):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+async def post_upload(client: httpx.AsyncClient, size: int, sent: list[int], **headers) -> httpx.Response:
+    return await client.post(
+        "/upload",
+        content=multipart_body(size, sent),
+        headers={"Content-Type": f"multipart/form-data; boundary={BOUNDARY}", **headers},
+    )
+
+
+class TestBodySizeLimitMiddleware:
+    async def test_accepts_upload_within_limit(self, client, app):
+        sent = [0]
+        response = await post_upload(client, LIMIT, sent)
+
+        assert response.status_code == 200
+        assert response.json() == {"size": LIMIT}
+
+    async def test_rejects_declared_length_before_reading(self, client, app):
+        sent = [0]
+        response = await post_upload(client, 2 * LIMIT, sent, **{"Content-Length": str(2 * LIMIT)})
+
+        assert response.status_code == 413
+        assert sent[0] == 0
+        assert app.state.received == []
+
+    async def test_stops_reading_once_limit_is_crossed(self, client, app):
+        sent = [0]
+        response = await post_upload(client, 5 * LIMIT, sent)
+
+        assert response.status_code == 413
+        assert sent[0] <= LIMIT + MULTIPART_OVERHEAD + len(CHUNK)
+        assert app.state.received == []
+
+    async def test_read_upload_rejects_file_over_limit(self, client, app):
+        # Within the body limit thanks to the multipart allowance, but over the file limit
+        sent = [0]
+        response = await post_upload(client, LIMIT + 1, sent)
+
+        assert response.status_code == 413
+        assert app.state.received == []
+
+
+class TestRouteLimits:
+    @pytest.fixture
+    def settings(self):
+        return Settings(MAX_IMAGE_SIZE=MB)
+
+    @pytest.fixture
+    def app(self, settings):
+        app = FastAPI()
+        # Wired like the app's own middleware
+        app.add_middleware(
+            BodySizeLimitMiddleware,
+            max_body_size=settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+            route_limits={"/burst": settings.MAX_BURST_UPLOAD_SIZE + MULTIPART_OVERHEAD},
+        )
+
+        async def frames(image: list[UploadFile]) -> dict:
+            return {"frames": [len(await read_upload(frame, settings.MAX_IMAGE_SIZE)) for frame in image]}
+
+        app.post("/burst")(frames)
+        app.post("/frames")(frames)
+        return app
+
+    async def test_accepts_largest_burst(self, client, settings):
+        files = [("image", (f"{i}.jpg", os.urandom(MB), "image/jpeg")) for i in range(settings.FACE_BURST_MAX_FRAMES)]
+
+        response = await client.post("/burst", files=files)
+
+        assert response.status_code == 200
+        assert response.json() == {"frames": [MB] * settings.FACE_BURST_MAX_FRAMES}
+
+    async def test_other_routes_keep_default_limit(self, client, settings):
+        files = [("image", (f"{i}.jpg", os.urandom(MB), "image/jpeg")) for i in range(settings.FACE_BURST_MAX_FRAMES)]
+
+        response = await client.post("/frames", files=files)
+
+        assert response.status_code == 413
+
+
+class TestReadBody:
+    async def test_accepts_raw_image_within_limit(self, client, app):
+        response = await client.post("/raw", content=raw_body(LIMIT, [0]), headers={"Content-Type": "image/jpeg"})
+
+        assert response.status_code == 200
+        assert response.json() == {"size": LIMIT}
+
+    async def test_rejects_raw_image_over_limit(self, client, app):
+        sent = [0]
+        response = await client.post(
+            "/raw", content=raw_body(2 * LIMIT, sent), headers={"Content-Type": "application/octet-stream"}
+        )
+
+        assert response.status_code == 413
+        assert sent[0] <= LIMIT + len(CHUNK)
+        assert app.state.received == []
+
+    async def test_rejects_other_content_types(self, client, app):
+        response = await client.post("/raw", json={"image": "base64"})
+
+        assert response.status_code == 415
+
+
+class TestUploadMemory:
+    async def test_concurrent_uploads_hold_one_copy_each(self, client, app):
+        uploads = 100
+        with PeakRSS() as rss:
+            responses = await asyncio.gather(*(post_upload(client, LIMIT, [0]) for _ in range(uploads)))
+
+        assert all(response.status_code == 200 for response in responses)
+        assert app.state.received == [LIMIT] * uploads
+        # Parts past 1 MB are spooled to disk while parsing, so only the bytes
+        # handed to the route stay resident, one copy per in-flight upload
+        assert rss.growth < uploads * LIMIT * 1.25
+
+    async def test_oversized_uploads_are_not_buffered(self, client, app):
+        uploads = 100
+        with PeakRSS() as rss:
+            responses = await asyncio.gather(*(post_upload(client, 3 * LIMIT, [0]) for _ in range(uploads)))
+
+        assert all(response.status_code == 413 for response in responses)
+        assert app.state.received == []
+        # At most the parser's in-memory spool (1 MB before rolling over to disk) per upload
+        assert rss.growth < uploads * 2 * MB
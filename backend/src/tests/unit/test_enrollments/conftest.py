@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from enrollments.models import EnrollmentJob
+
+
+@pytest.fixture
+async def engine(database_url):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(EnrollmentJob.__table__.drop, checkfirst=True)
+        await connection.run_sync(EnrollmentJob.__table__.create)
+    yield engine
+    await engine.dispose()
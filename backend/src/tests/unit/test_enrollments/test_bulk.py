@@ -0,0 +1,164 @@
+import json
+from contextlib import nullcontext
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.unit_of_work import UnitOfWork
+from enrollments.bulk import BulkEnrollment, read_checkpoint, read_manifest
+from registration.exceptions import ServiceError
+from registration.service import RegisterUserFaceCommand
+from tests.unit.test_enrollments.test_worker import FakeRegistration, throttled_registration_error
+from users.exceptions import UserNotFoundError
+
+
+@pytest.fixture
+def photos(tmp_path):
+    for i in range(5):
+        (tmp_path / f"user{i}.jpg").write_bytes(f"face {i}".encode())
+    return tmp_path
+
+
+def write_csv(directory, rows) -> object:
+    manifest = directory / "badges.csv"
+    manifest.write_text("email,image\n" + "".join(f"{email},{image}\n" for email, image in rows))
+    return manifest
+
+
+class TestReadManifest:
+    def test_reads_csv_and_jsonl(self, photos):
+        rows = [(f"user{i}@example.com", f"user{i}.jpg") for i in range(2)]
+        csv_manifest = write_csv(photos, rows)
+        jsonl_manifest = photos / "badges.jsonl"
+        jsonl_manifest.write_text(
+            "".join(json.dumps({"email": email, "image": str(photos / image)}) + "\n" for email, image in rows)
+        )
+
+        from_csv = list(read_manifest(csv_manifest))
+        from_jsonl = list(read_manifest(jsonl_manifest))
+
+        assert [(row.line, row.email, row.image) for row in from_csv] == [
+            (2, "user0@example.com", photos / "user0.jpg"),
+            (3, "user1@example.com", photos / "user1.jpg"),
+        ]
+        assert [(row.email, row.image) for row in from_jsonl] == [(row.email, row.image) for row in from_csv]
+
+    def test_malformed_rows_are_yielded_with_an_error(self, photos):
+        manifest = photos / "badges.jsonl"
+        manifest.write_text(
+            json.dumps({"email": "user0@example.com", "image": "user0.jpg"})
+            + "\n{not json\n"
+            + json.dumps({"email": "user1@example.com"})
+            + "\n"
+            + json.dumps({"email": "user2@example.com", "image": "user2.jpg"})
+            + "\n"
+        )
+
+        rows = list(read_manifest(manifest))
+
+        assert [(row.line, row.email, row.error is None) for row in rows] == [
+            (1, "user0@example.com", True),
+            (2, "", False),
+            (3, "user1@example.com", False),
+            (4, "user2@example.com", True),
+        ]
+
+
+class TestBulkEnrollment:
+    async def test_registers_rows_with_bounded_concurrency(self, photos):
+        manifest = write_csv(photos, [(f"user{i}@example.com", f"user{i}.jpg") for i in range(5)])
+        registration = FakeRegistration()
+        enrollment = BulkEnrollment(registration, nullcontext, photos / "report.jsonl", concurrency=2)
+
+        counts = await enrollment.run(read_manifest(manifest))
+
+        assert counts["registered"] == 5
+        assert registration.max_in_flight == 2
+        assert sorted(registration.registered) == [(f"user{i}@example.com", f"face {i}".encode()) for i in range(5)]
+        results = read_checkpoint(photos / "report.jsonl")
+        assert {result.status for result in results.values()} == {"registered"}
+
+    async def test_reports_failures(self, photos):
+        manifest = write_csv(
+            photos,
+            [
+                ("user0@example.com", "user0.jpg"),
+                ("user1@example.com", "user1.jpg"),
+                ("user2@example.com", "user2.jpg"),
+                ("missing@example.com", "missing.jpg"),
+            ],
+        )
+        registration = FakeRegistration(
+            {
+                "user0@example.com": ServiceError("Image rejected: blurry"),
+                "user1@example.com": ConnectionError("throttled"),
+                "user2@example.com": await throttled_registration_error(),
+            }
+        )
+
+        counts = await BulkEnrollment(registration, nullcontext, photos / "report.jsonl").run(read_manifest(manifest))
+
+        assert counts["failed"] == 4
+        results = read_checkpoint(photos / "report.jsonl")
+        assert results["user0@example.com"].error == "Image rejected: blurry"
+        assert not results["user0@example.com"].retryable
+        assert results["user1@example.com"].retryable
+        assert results["user2@example.com"].retryable
+        assert not results["missing@example.com"].retryable
+
+    async def test_resumes_from_report(self, photos):
+        manifest = write_csv(photos, [(f"user{i}@example.com", f"user{i}.jpg") for i in range(4)])
+        report = photos / "report.jsonl"
+        errors = {
+            "user2@example.com": ConnectionError("throttled"),
+            "user3@example.com": ServiceError("Image rejected: blurry"),
+        }
+        await BulkEnrollment(FakeRegistration(dict(errors)), nullcontext, report).run(read_manifest(manifest))
+
+        rerun = FakeRegistration()
+        counts = await BulkEnrollment(rerun, nullcontext, report).run(read_manifest(manifest))
+
+        # Registered and permanently rejected rows are skipped, the transient failure is retried
+        assert [email for email, _ in rerun.registered] == ["user2@example.com"]
+        assert counts == {"skipped": 3, "registered": 1}
+        assert read_checkpoint(report)["user2@example.com"].status == "registered"
+
+        retry_all = FakeRegistration()
+        await BulkEnrollment(retry_all, nullcontext, report, retry_failed=True).run(read_manifest(manifest))
+        assert [email for email, _ in retry_all.registered] == ["user3@example.com"]
+
+    async def test_unknown_user_is_not_retryable(self, photos):
+        manifest = write_csv(photos, [("nobody@example.com", "user0.jpg")])
+        users = AsyncMock()
+        users.get_by_email.side_effect = UserNotFoundError("User with email nobody@example.com is not found")
+        rekognition = AsyncMock()
+        rekognition.detect_face_details.return_value = {"FaceDetails": [{"BoundingBox": {}}]}
+
+        def commands(session):
+            return RegisterUserFaceCommand(UnitOfWork(AsyncMock()), AsyncMock(), users, rekognition, AsyncMock())
+
+        await BulkEnrollment(commands, nullcontext, photos / "report.jsonl").run(read_manifest(manifest))
+
+        result = read_checkpoint(photos / "report.jsonl")["nobody@example.com"]
+        assert result.status == "failed"
+        assert not result.retryable
+
+    async def test_malformed_row_does_not_stop_the_run(self, photos):
+        manifest = photos / "badges.csv"
+        manifest.write_text(
+            "email,image\nuser0@example.com,user0.jpg\nuser1@example.com\nuser2@example.com,user2.jpg\n"
+        )
+        report = photos / "report.jsonl"
+        registration = FakeRegistration()
+
+        counts = await BulkEnrollment(registration, nullcontext, report).run(read_manifest(manifest))
+
+        assert counts == {"registered": 2, "failed": 1}
+        failed = read_checkpoint(report)["user1@example.com"]
+        assert failed.line == 3
+        assert failed.error.startswith("Malformed row")
+        assert not failed.retryable
+
+        # The checkpoint gets past it
+        rerun = FakeRegistration()
+        assert await BulkEnrollment(rerun, nullcontext, report).run(read_manifest(manifest)) == {"skipped": 3}
@@ -0,0 +1,77 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from enrollments.models import EnrollmentJob, EnrollmentStatus
+from enrollments.repo import EnrollmentJobRepository
+
+LEASE = 300
+
+
+async def enqueue(sessions, count: int) -> list[EnrollmentJob]:
+    started = datetime.now(UTC)
+    async with sessions() as session, session.begin():
+        jobs = [
+            EnrollmentJob(
+                email=f"user{i}@example.com", image_key=f"staged/{i}", created_at=started + timedelta(seconds=i)
+            )
+            for i in range(count)
+        ]
+        session.add_all(jobs)
+    return jobs
+
+
+class TestEnrollmentJobRepository:
+    @pytest.fixture
+    def sessions(self, engine):
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    async def test_claims_oldest_jobs_first(self, sessions):
+        jobs = await enqueue(sessions, 3)
+
+        async with sessions() as session, session.begin():
+            claimed = await EnrollmentJobRepository(session).claim(2, LEASE)
+
+        assert [job.id for job in claimed] == [jobs[0].id, jobs[1].id]
+        assert all(job.status == EnrollmentStatus.RUNNING and job.attempts == 1 for job in claimed)
+
+    async def test_concurrent_claims_skip_locked_rows(self, sessions):
+        jobs = await enqueue(sessions, 3)
+
+        async with sessions() as first, first.begin(), sessions() as second, second.begin():
+            # The first transaction still holds its rows, the second must not wait for or get them
+            claimed_first = await EnrollmentJobRepository(first).claim(2, LEASE)
+            claimed_second = await EnrollmentJobRepository(second).claim(2, LEASE)
+
+        assert [job.id for job in claimed_first] == [jobs[0].id, jobs[1].id]
+        assert [job.id for job in claimed_second] == [jobs[2].id]
+
+    async def test_reclaims_running_job_after_lease(self, sessions):
+        [job] = await enqueue(sessions, 1)
+        async with sessions() as session, session.begin():
+            repo = EnrollmentJobRepository(session)
+            assert len(await repo.claim(1, LEASE)) == 1
+            assert await repo.claim(1, LEASE) == []
+
+            await session.execute(
+                update(EnrollmentJob)
+                .where(EnrollmentJob.id == job.id)
+                .values(updated_at=datetime.now(UTC) - timedelta(seconds=2 * LEASE))
+            )
+            [reclaimed] = await repo.claim(1, LEASE)
+
+        assert reclaimed.id == job.id
+        assert reclaimed.attempts == 2
+
+    async def test_requeued_job_is_claimed_again(self, sessions):
+        [job] = await enqueue(sessions, 1)
+        async with sessions() as session, session.begin():
+            repo = EnrollmentJobRepository(session)
+            await repo.claim(1, LEASE)
+            await repo.finish(job.id, EnrollmentStatus.QUEUED, "throttled")
+            [reclaimed] = await repo.claim(1, LEASE)
+
+        assert reclaimed.attempts == 2
+        assert reclaimed.error == "throttled"
@@ -0,0 +1,231 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from botocore.exceptions import ClientError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from core.unit_of_work import UnitOfWork
+from enrollments.config import EnrollmentSettings
+from enrollments.exceptions import EnrollmentJobNotFoundError
+from enrollments.models import EnrollmentJob, EnrollmentStatus
+from enrollments.repo import EnrollmentJobRepository
+from enrollments.service import EnrollmentService
+from enrollments.worker import EnrollmentWorker
+from registration.exceptions import ServiceError
+from registration.service import RegisterUserFaceCommand
+from rekognition.backends import CompareFacesBackend
+from rekognition.repository import RekognitionRepository
+from rekognition.service import RekognitionService
+from s3.exceptions import S3ServiceError
+from users.exceptions import UserNotFoundError
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+
+    async def upload_object(self, key: str, file: bytes):
+        self.objects[key] = file
+
+    async def download_object(self, key: str) -> bytes:
+        if key not in self.objects:
+            raise S3ServiceError("Failed to download object from S3")
+        return self.objects[key]
+
+    async def delete_object(self, key: str):
+        self.objects.pop(key, None)
+
+
+class FakeRegistration:
+    """Stands in for RegisterUserFaceCommand, failing with `errors[email]` when set"""
+
+    def __init__(self, errors: dict[str, Exception] | None = None, duration: float = 0.01):
+        self.errors = errors or {}
+        self.duration = duration
+        self.registered: list[tuple[str, bytes]] = []
+        self.attempts = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, session):
+        return self
+
+    async def execute(self, email: str, image: bytes):
+        self.attempts += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.duration)
+            if email in self.errors:
+                raise self.errors[email]
+            self.registered.append((email, image))
+        finally:
+            self.in_flight -= 1
+
+
+async def throttled_registration_error() -> Exception:
+    """What RegisterUserFaceCommand raises when DetectFaces is throttled"""
+    client = AsyncMock()
+    client.exceptions.ClientError = ClientError
+    client.detect_faces.side_effect = ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "DetectFaces"
+    )
+    rekognition = RekognitionService(CompareFacesBackend(RekognitionRepository(client, "faces")))
+    command = RegisterUserFaceCommand(UnitOfWork(AsyncMock()), AsyncMock(), AsyncMock(), rekognition, AsyncMock())
+
+    with pytest.raises(ServiceError) as raised:
+        await command.execute("user@example.com", b"image")
+    return raised.value
+
+
+@pytest.fixture
+def settings():
+    return EnrollmentSettings(ENROLLMENT_WORKER_CONCURRENCY=2, ENROLLMENT_POLL_INTERVAL=0.01, ENROLLMENT_MAX_ATTEMPTS=2)
+
+
+@pytest.fixture
+def sessions(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+async def enqueue(sessions, s3, settings, *emails: str) -> list[EnrollmentJob]:
+    jobs = []
+    for email in emails:
+        async with sessions() as session:
+            service = EnrollmentService(UnitOfWork(session), EnrollmentJobRepository(session), s3, settings)
+            jobs.append(await service.enqueue(email, f"face of {email}".encode()))
+    return jobs
+
+
+async def job_status(sessions, job) -> EnrollmentJob:
+    async with sessions() as session:
+        return await EnrollmentJobRepository(session).get(job.id)
+
+
+class TestEnrollmentService:
+    async def test_enqueue_stages_image_and_queues_job(self, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "user@example.com")
+
+        assert job.status == EnrollmentStatus.QUEUED
+        stored = await job_status(sessions, job)
+        assert s3.objects[stored.image_key] == b"face of user@example.com"
+
+    async def test_failed_upload_queues_nothing(self, sessions, s3, settings):
+        async def fail(key: str, file: bytes):
+            raise S3ServiceError("Failed to upload object to S3")
+
+        s3.upload_object = fail
+        with pytest.raises(ServiceError):
+            await enqueue(sessions, s3, settings, "user@example.com")
+
+        async with sessions() as session:
+            assert await EnrollmentJobRepository(session).count() == 0
+
+    async def test_get_hides_other_users_jobs(self, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "user@example.com")
+
+        async with sessions() as session:
+            service = EnrollmentService(UnitOfWork(session), EnrollmentJobRepository(session), s3, settings)
+            assert (await service.get(job.id, "user@example.com")).id == job.id
+            with pytest.raises(EnrollmentJobNotFoundError):
+                await service.get(job.id, "other@example.com")
+
+
+class TestEnrollmentWorker:
+    async def test_registers_queued_faces_with_bounded_concurrency(self, engine, sessions, s3, settings):
+        emails = [f"user{i}@example.com" for i in range(6)]
+        jobs = await enqueue(sessions, s3, settings, *emails)
+        registration = FakeRegistration()
+        worker = EnrollmentWorker(engine, registration, s3, settings)
+
+        await worker.run(until_idle=True)
+
+        assert sorted(email for email, _ in registration.registered) == emails
+        assert registration.max_in_flight == 2
+        for job in jobs:
+            assert (await job_status(sessions, job)).status == EnrollmentStatus.SUCCEEDED
+        # Staged images are deleted once registered
+        assert s3.objects == {}
+        assert worker.stats()["succeeded"] == 6
+
+    async def test_concurrent_workers_register_each_job_once(self, engine, sessions, s3, settings):
+        emails = [f"user{i}@example.com" for i in range(8)]
+        await enqueue(sessions, s3, settings, *emails)
+        registration = FakeRegistration()
+        workers = [EnrollmentWorker(engine, registration, s3, settings) for _ in range(3)]
+
+        await asyncio.gather(*(worker.run(until_idle=True) for worker in workers))
+
+        assert sorted(email for email, _ in registration.registered) == emails
+        assert registration.attempts == len(emails)
+
+    async def test_rejected_face_fails_without_retry(self, engine, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "user@example.com")
+        registration = FakeRegistration({"user@example.com": ServiceError("Image rejected: blurry")})
+
+        await EnrollmentWorker(engine, registration, s3, settings).run(until_idle=True)
+
+        stored = await job_status(sessions, job)
+        assert stored.status == EnrollmentStatus.FAILED
+        assert stored.error == "Image rejected: blurry"
+        assert stored.attempts == 1
+
+    async def test_transient_failure_is_retried_up_to_max_attempts(self, engine, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "user@example.com")
+        registration = FakeRegistration({"user@example.com": ConnectionError("upstream unavailable")})
+        worker = EnrollmentWorker(engine, registration, s3, settings)
+
+        await worker.run(until_idle=True)
+
+        stored = await job_status(sessions, job)
+        assert stored.status == EnrollmentStatus.FAILED
+        assert stored.attempts == settings.ENROLLMENT_MAX_ATTEMPTS
+        assert registration.attempts == settings.ENROLLMENT_MAX_ATTEMPTS
+        assert worker.stats()["retried"] == 1
+
+    async def test_throttled_face_detection_is_retried(self, engine, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "user@example.com")
+        registration = FakeRegistration({"user@example.com": await throttled_registration_error()})
+        worker = EnrollmentWorker(engine, registration, s3, settings)
+
+        await worker.run(until_idle=True)
+
+        stored = await job_status(sessions, job)
+        assert stored.attempts == settings.ENROLLMENT_MAX_ATTEMPTS
+        assert worker.stats()["retried"] == 1
+
+    async def test_unknown_user_fails_without_retry(self, engine, sessions, s3, settings):
+        [job] = await enqueue(sessions, s3, settings, "nobody@example.com")
+        users = AsyncMock()
+        users.get_by_email.side_effect = UserNotFoundError("User with email nobody@example.com is not found")
+        rekognition = AsyncMock()
+        rekognition.detect_face_details.return_value = {"FaceDetails": [{"BoundingBox": {}}]}
+
+        def commands(session):
+            return RegisterUserFaceCommand(UnitOfWork(session), AsyncMock(), users, rekognition, s3)
+
+        await EnrollmentWorker(engine, commands, s3, settings).run(until_idle=True)
+
+        stored = await job_status(sessions, job)
+        assert stored.status == EnrollmentStatus.FAILED
+        assert stored.attempts == 1
+
+    async def test_stop_lets_running_jobs_finish(self, engine, sessions, s3, settings):
+        jobs = await enqueue(sessions, s3, settings, "a@example.com", "b@example.com", "c@example.com")
+        registration = FakeRegistration(duration=0.1)
+        worker = EnrollmentWorker(engine, registration, s3, settings)
+        stop = asyncio.Event()
+
+        running = asyncio.create_task(worker.run(stop))
+        await asyncio.sleep(0.05)
+        stop.set()
+        await running
+
+        statuses = [(await job_status(sessions, job)).status for job in jobs]
+        assert sorted(statuses) == [EnrollmentStatus.QUEUED, EnrollmentStatus.SUCCEEDED, EnrollmentStatus.SUCCEEDED]
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+from PIL import Image, ImageFilter, ImageOps
+
+from faces.burst import measure_frame, select_frames, split_mjpeg
+from faces.config import FaceImageSettings, FaceQualitySettings
+from faces.normalize import ImagePipeline
+from faces.quality import QualityScreen
+from tests.unit.test_faces.test_quality import encode, make_image
+
+
+def framed(subject_size: int, size: int = 800) -> Image.Image:
+    """A subject of `subject_size` pixels on a plain, evenly lit background"""
+    canvas = Image.new("RGB", (size, size), (128, 128, 128))
+    offset = (size - subject_size) // 2
+    canvas.paste(make_image(subject_size), (offset, offset))
+    return canvas
+
+
+def symmetric(image: Image.Image) -> Image.Image:
+    half = image.crop((0, 0, image.width // 2, image.height))
+    mirrored = image.copy()
+    mirrored.paste(ImageOps.mirror(half), (image.width // 2, 0))
+    return mirrored
+
+
+class TestSplitMjpeg:
+    def test_splits_concatenated_and_multipart_frames(self):
+        frames = [encode(make_image(200 + 10 * i)) for i in range(3)]
+        clip = b"".join(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + frame + b"\r\n" for frame in frames)
+
+        assert split_mjpeg(clip, max_frames=10) == frames
+        assert split_mjpeg(b"".join(frames), max_frames=10) == frames
+
+    def test_embedded_thumbnail_does_not_split_a_frame(self):
+        thumbnail = encode(make_image(40))
+        exif = b"Exif\x00\x00" + thumbnail
+        frames = [encode(make_image(200 + 10 * i)) for i in range(2)]
+        frames = [frame[:2] + b"\xff\xe1" + (len(exif) + 2).to_bytes(2, "big") + exif + frame[2:] for frame in frames]
+
+        assert split_mjpeg(b"".join(frames), max_frames=10) == frames
+
+    def test_samples_long_clips_evenly(self):
+        frames = [encode(make_image(200 + i)) for i in range(9)]
+
+        assert split_mjpeg(b"".join(frames), max_frames=3) == [frames[0], frames[4], frames[8]]
+
+
+class TestMeasureFrame:
+    def test_larger_subject_measures_larger(self):
+        small = measure_frame(0, encode(framed(300)))
+        large = measure_frame(1, encode(framed(700)))
+
+        assert large.face_size > 2 * small.face_size
+
+    def test_symmetric_subject_measures_frontal(self):
+        image = make_image()
+
+        assert measure_frame(0, encode(symmetric(image))).pose > 0.9
+        assert measure_frame(1, encode(image)).pose < 0.9
+
+    def test_undecodable_frame_is_rejected(self):
+        assert measure_frame(3, b"not an image").rejected == "undecodable"
+
+
+class TestSelectFrames:
+    @pytest.fixture
+    def quality(self):
+        return QualityScreen(FaceQualitySettings())
+
+    def test_prefers_sharp_frames(self, quality):
+        sharp = make_image()
+        frames = [
+            sharp.filter(ImageFilter.GaussianBlur(2)),
+            sharp,
+            sharp.filter(ImageFilter.GaussianBlur(1)),
+        ]
+        scores = [measure_frame(index, encode(frame)) for index, frame in enumerate(frames)]
+
+        selection = select_frames(scores, quality, count=2)
+
+        assert [frame.index for frame in selection.chosen] == [1, 2]
+        assert selection.chosen[0].score > selection.chosen[1].score
+
+    def test_reports_rejected_frames(self, quality):
+        dark = Image.fromarray(np.full((800, 800, 3), 10, dtype=np.uint8))
+        scores = [
+            measure_frame(0, encode(dark)),
+            measure_frame(1, b"not an image"),
+            measure_frame(2, encode(make_image())),
+        ]
+
+        selection = select_frames(scores, quality, count=2)
+
+        assert [frame.index for frame in selection.chosen] == [2]
+        assert selection.rejected == {0: "exposure", 1: "undecodable"}
+        assert selection.frames == 3
+
+
+class TestImagePipelineSelectBest:
+    async def test_scores_burst_on_executor(self):
+        pipeline = ImagePipeline(FaceImageSettings(), QualityScreen(FaceQualitySettings()))
+        sharp = make_image()
+        frames = [encode(sharp.filter(ImageFilter.GaussianBlur(radius))) for radius in (3, 0, 2)]
+
+        selection = await pipeline.select_best(frames, count=1)
+
+        assert [frame.index for frame in selection.chosen] == [1]
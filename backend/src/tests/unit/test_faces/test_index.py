@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from faces.embeddings import normalize
+from faces.index import IVFIndex
+from faces.store import MappedEmbeddingStore, MemoryEmbeddingStore
+
+DIM = 32
+
+
+def embeddings(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((64, DIM))
+    return normalize((centers[rng.integers(0, 64, count)] + 0.3 * rng.standard_normal((count, DIM))).astype(np.float32))
+
+
+class TestIVFIndex:
+    @pytest.fixture
+    def gallery(self):
+        return embeddings(5000)
+
+    @pytest.fixture
+    def index(self, gallery):
+        store = MemoryEmbeddingStore(DIM)
+        store.seed(np.arange(100, 100 + len(gallery)), gallery)
+        index = IVFIndex(store, nprobe=8)
+        index.build()
+        return index
+
+    def test_build_partitions_gallery(self, index, gallery):
+        stats = index.stats()
+
+        assert stats["live"] == len(gallery)
+        assert stats["nlist"] == int(np.sqrt(len(gallery)))
+
+    def test_search_agrees_with_exhaustive_search(self, index, gallery):
+        rng = np.random.default_rng(1)
+        queries = normalize(gallery[:200] + 0.05 * rng.standard_normal((200, DIM)).astype(np.float32))
+        expected = np.argmax(queries @ gallery.T, axis=1) + 100
+
+        found = [index.search(query, k=1)[0][0] for query in queries]
+
+        assert np.mean(np.asarray(found) == expected) >= 0.95
+
+    def test_search_scores_are_exact(self, index, gallery):
+        (id, similarity), *_ = index.search(gallery[42], k=3)
+
+        assert id == 142
+        assert similarity == pytest.approx(1.0, abs=1e-3)
+
+    def test_add_replaces_and_remove_deletes(self, index, gallery):
+        index.add(142, gallery[7])
+        assert {id for id, _ in index.search(gallery[7], k=2)} == {107, 142}
+
+        assert index.remove(142)
+        assert not index.remove(142)
+        assert 142 not in index
+        assert index.search(gallery[7], k=2)[0][0] == 107
+        assert len(index) == len(gallery) - 1
+
+    def test_incremental_adds_before_build(self):
+        index = IVFIndex(MemoryEmbeddingStore(DIM))
+        gallery = embeddings(10)
+        for id, vector in enumerate(gallery):
+            index.add(id, vector)
+
+        assert [index.search(vector)[0][0] for vector in gallery] == list(range(10))
+
+    def test_empty_index(self):
+        assert IVFIndex(MemoryEmbeddingStore(DIM)).search(embeddings(1)[0]) == []
+
+    def test_sync_follows_other_workers(self, tmp_path):
+        gallery = embeddings(20)
+        ours = IVFIndex(MappedEmbeddingStore(tmp_path, DIM))
+        theirs = IVFIndex(MappedEmbeddingStore(tmp_path, DIM))
+
+        for id in range(10):
+            theirs.add(id, gallery[id])
+        ours.sync()
+        assert ours.search(gallery[3])[0][0] == 3
+
+        theirs.remove(3)
+        assert theirs.compact()
+        ours.sync()
+        assert ours.store.generation == 1
+        assert [id for id, _ in ours.search(gallery[3], k=9)].count(3) == 0
+        assert ours.search(gallery[4])[0][0] == 4
@@ -0,0 +1,101 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import pytest
+from PIL import ExifTags, Image
+
+from faces.config import FaceImageSettings, FaceQualitySettings
+from faces.exceptions import ImageDecodeError, ResolutionTooLowError
+from faces.normalize import ImagePipeline, crop_to_box, normalize_image
+from faces.quality import QualityScreen
+from tests.unit.test_faces.test_quality import make_image
+
+
+def encode(image: Image.Image, format: str = "JPEG", orientation: int | None = None) -> bytes:
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ExifTags.Base.Orientation] = orientation
+    buffer = BytesIO()
+    image.save(buffer, format=format, quality=95, exif=exif)
+    return buffer.getvalue()
+
+
+def decode(data: bytes) -> Image.Image:
+    return Image.open(BytesIO(data))
+
+
+class TestNormalizeImage:
+    def test_downscales_to_max_edge(self):
+        image = encode(make_image(800).resize((1600, 1200)))
+
+        normalized = normalize_image(image, max_edge=640, format="JPEG", quality=85, analysis_size=640)
+
+        assert (normalized.width, normalized.height) == (640, 480)
+        assert decode(normalized.data).size == (640, 480)
+        assert (normalized.quality.width, normalized.quality.height) == (1600, 1200)
+        assert len(normalized.data) < len(image)
+
+    def test_applies_exif_orientation(self):
+        image = encode(make_image(800).resize((800, 400)), orientation=6)
+
+        normalized = normalize_image(image, max_edge=1280, format="JPEG", quality=85, analysis_size=640)
+
+        assert decode(normalized.data).size == (400, 800)
+        assert ExifTags.Base.Orientation not in decode(normalized.data).getexif()
+
+    def test_passes_through_conforming_image(self):
+        image = encode(make_image(800))
+
+        assert normalize_image(image, max_edge=1280, format="JPEG", quality=85, analysis_size=640).data == image
+
+    def test_reencodes_to_format(self):
+        image = encode(make_image(800), format="PNG")
+
+        normalized = normalize_image(image, max_edge=1280, format="WEBP", quality=85, analysis_size=640)
+
+        assert decode(normalized.data).format == "WEBP"
+
+    def test_undecodable_image(self):
+        with pytest.raises(ImageDecodeError):
+            normalize_image(b"not an image", max_edge=1280, format="JPEG", quality=85, analysis_size=640)
+
+
+def test_crop_to_box_keeps_margin():
+    image = encode(make_image(800))
+    box = {"Left": 0.25, "Top": 0.25, "Width": 0.25, "Height": 0.25}
+
+    assert decode(crop_to_box(image, box, margin=0.5, format="JPEG", quality=85)).size == (400, 400)
+    assert decode(crop_to_box(image, box, margin=2.0, format="JPEG", quality=85)).size == (800, 800)
+
+
+class TestImagePipeline:
+    @pytest.fixture
+    def pipeline(self):
+        executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+        pipeline = ImagePipeline(
+            FaceImageSettings(FACE_IMAGE_MAX_EDGE=640, FACE_IMAGE_CROP_TO_FACE=True),
+            QualityScreen(FaceQualitySettings()),
+            executor,
+        )
+        yield pipeline
+        pipeline.shutdown()
+
+    async def test_normalizes_in_worker_process(self, pipeline):
+        normalized = await pipeline.normalize(encode(make_image(800).resize((1600, 1600))))
+
+        assert decode(normalized).size == (640, 640)
+        assert pipeline.quality.stats()["checked"] == 1
+
+    async def test_rejects_low_quality_image(self, pipeline):
+        with pytest.raises(ResolutionTooLowError):
+            await pipeline.normalize(encode(make_image(120)), upstream_calls=2)
+
+        assert pipeline.quality.stats()["upstream_calls_saved"] == 2
+
+    async def test_crop_to_face(self, pipeline):
+        box = {"Left": 0.25, "Top": 0.25, "Width": 0.5, "Height": 0.5}
+
+        cropped = await pipeline.crop_to_face(encode(make_image(800)), box)
+
+        assert decode(cropped).size == (800, 800)
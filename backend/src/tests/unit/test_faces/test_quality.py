@@ -0,0 +1,87 @@
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from faces.config import FaceQualitySettings
+from faces.exceptions import (
+    BadExposureError,
+    BlurryImageError,
+    ImageDecodeError,
+    LowContrastError,
+    ResolutionTooLowError,
+)
+from faces.quality import QualityScreen, measure_quality
+
+
+def make_image(size: int = 800) -> Image.Image:
+    rng = np.random.default_rng(0)
+    image = Image.radial_gradient("L").resize((size, size)).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.integers(0, size * 3 // 4, 2)
+        w, h = rng.integers(size // 40, size // 4, 2)
+        draw.ellipse([x, y, x + w, y + h], outline=tuple(int(v) for v in rng.integers(0, 256, 3)), width=3)
+    return image
+
+
+def encode(image: Image.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+class TestMeasureQuality:
+    def test_measures_sharp_image(self):
+        report = measure_quality(encode(make_image()))
+
+        assert (report.width, report.height) == (800, 800)
+        assert report.sharpness > 100
+        assert 40 < report.brightness < 220
+
+    def test_blur_lowers_sharpness(self):
+        image = make_image()
+
+        sharp = measure_quality(encode(image))
+        blurry = measure_quality(encode(image.filter(ImageFilter.GaussianBlur(6))))
+
+        assert blurry.sharpness < sharp.sharpness / 10
+
+    def test_undecodable_image(self):
+        with pytest.raises(ImageDecodeError):
+            measure_quality(b"not an image")
+
+
+class TestQualityScreen:
+    @pytest.fixture
+    def screen(self):
+        return QualityScreen(FaceQualitySettings())
+
+    def test_accepts_good_image(self, screen):
+        screen.enforce(measure_quality(encode(make_image())))
+
+        assert screen.stats() == {"checked": 1, "rejected": 0, "rejected_by_reason": {}, "upstream_calls_saved": 0}
+
+    @pytest.mark.parametrize(
+        "image, error",
+        [
+            (make_image(120), ResolutionTooLowError),
+            (make_image().point(lambda v: v // 6), BadExposureError),
+            (make_image().point(lambda v: 128 + v // 20), LowContrastError),
+            (make_image().filter(ImageFilter.GaussianBlur(6)), BlurryImageError),
+        ],
+    )
+    def test_rejects_hopeless_image(self, screen, image, error):
+        with pytest.raises(error):
+            screen.enforce(measure_quality(encode(image)), upstream_calls=2)
+
+        assert screen.stats()["rejected_by_reason"] == {error.reason: 1}
+        assert screen.stats()["upstream_calls_saved"] == 2
+
+    def test_disabled(self):
+        screen = QualityScreen(FaceQualitySettings(FACE_QUALITY_SCREEN_ENABLED=False))
+
+        screen.enforce(measure_quality(encode(make_image(120))))
+
+        assert screen.stats()["checked"] == 0
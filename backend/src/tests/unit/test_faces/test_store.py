@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from faces.embeddings import normalize
+from faces.store import MappedEmbeddingStore, MemoryEmbeddingStore
+
+DIM = 8
+
+
+def vector(seed: int) -> np.ndarray:
+    return normalize(np.random.default_rng(seed).standard_normal((1, DIM)).astype(np.float32))[0]
+
+
+class TestMappedEmbeddingStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return MappedEmbeddingStore(tmp_path, DIM)
+
+    def test_append_replace_and_delete(self, store):
+        assert store.append(1, vector(1)) == (0, None)
+        assert store.append(2, vector(2)) == (1, None)
+        assert store.append(1, vector(3)) == (2, 0)
+        assert store.delete(2) == 1
+        assert store.delete(2) is None
+
+        assert store.row(1) == 2
+        assert len(store) == 1
+        assert store.stats()["tombstones"] == 2
+        np.testing.assert_allclose(store.vectors[2], vector(3), atol=1e-3)
+        assert store.refresh() == ([0, 1, 2], [0, 1])
+
+    def test_cold_start_maps_existing_files(self, store, tmp_path):
+        store.seed(np.array([5, 6]), np.stack([vector(5), vector(6)]))
+        store.delete(5)
+
+        reopened = MappedEmbeddingStore(tmp_path, DIM)
+
+        assert isinstance(reopened.vectors, np.memmap)
+        assert reopened.row(6) == 1
+        assert reopened.row(5) is None
+        assert not reopened.seed(np.array([7]), vector(7)[np.newaxis])
+
+    def test_partial_append_is_dropped(self, store, tmp_path):
+        store.append(1, vector(1))
+        store.append(2, vector(2))
+        # A writer that died after its vector, and partway through its id
+        with open(tmp_path / "vectors-0.f16", "ab") as vectors:
+            vectors.write(vector(3).astype(np.float16).tobytes())
+        with open(tmp_path / "ids-0.i64", "ab") as ids:
+            ids.write(b"\x03\x00\x00")
+
+        reopened = MappedEmbeddingStore(tmp_path, DIM)
+        assert len(reopened.ids) == len(reopened.vectors) == 2
+
+        assert reopened.append(4, vector(4)) == (2, None)
+        np.testing.assert_allclose(reopened.vectors[reopened.row(4)], vector(4), atol=1e-3)
+        np.testing.assert_allclose(reopened.vectors[reopened.row(2)], vector(2), atol=1e-3)
+        assert (tmp_path / "ids-0.i64").stat().st_size == 3 * 8
+
+    def test_refresh_reads_other_writers(self, store, tmp_path):
+        other = MappedEmbeddingStore(tmp_path, DIM)
+
+        other.append(1, vector(1))
+        other.append(1, vector(2))
+
+        assert store.refresh() == ([0, 1], [0])
+        assert store.row(1) == 1
+
+    def test_compaction_drops_tombstones(self, store, tmp_path):
+        other = MappedEmbeddingStore(tmp_path, DIM)
+        for id in range(4):
+            store.append(id, vector(id))
+        store.delete(0)
+        store.delete(1)
+
+        assert not store.compact(min_dead_ratio=0.5)
+        assert store.compact(min_dead_ratio=0.25)
+
+        assert store.generation == 1
+        assert store.stats()["rows"] == 2
+        assert sorted(path.name for path in tmp_path.glob("*-*")) == ["ids-1.i64", "tombstones-1.i64", "vectors-1.f16"]
+
+        other.append(4, vector(4))
+        assert other.generation == 1
+        assert other.row(4) == 2
+        store.refresh()
+        np.testing.assert_allclose(store.vectors[store.row(3)], vector(3), atol=1e-3)
+
+    def test_rejects_other_dimension(self, store, tmp_path):
+        with pytest.raises(ValueError):
+            MappedEmbeddingStore(tmp_path, DIM * 2)
+
+
+class TestMemoryEmbeddingStore:
+    def test_append_replace_and_delete(self):
+        store = MemoryEmbeddingStore(DIM)
+        for id in range(20):
+            store.append(id, vector(id))
+        store.append(3, vector(30))
+        store.delete(4)
+
+        assert len(store) == 19
+        assert store.row(3) == 20
+        assert store.ids[20] == 3
+        assert store.stats() == {"generation": 0, "rows": 21, "live": 19, "tombstones": 2}
@@ -0,0 +1,378 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from PIL import ImageFilter
+
+from cognito.exceptions import NotAuthorizedError
+from core.unit_of_work import UnitOfWork
+from faces.config import FaceImageSettings, FaceQualitySettings
+from faces.normalize import ImagePipeline
+from faces.quality import QualityScreen
+from registration.dependencies import get_user_from_cookie
+from registration.exceptions import InvalidFaceTicketError, ServiceError
+from registration.service import (
+    RegisterUserFaceCommand,
+    SigninViaFaceBurstCommand,
+    SigninViaFaceCommand,
+    SigninViaFaceOnlyCommand,
+)
+from rekognition.exceptions import RekognitionClientError
+from rekognition.schemas import FaceEnrollment, FaceReference
+from s3.exceptions import S3ServiceError
+from tests.unit.test_faces.test_quality import encode, make_image
+from users.models import User
+
+LATENCY = 0.1
+
+
+class StubCognito:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.initiated = 0
+        self.answered = []
+
+    async def initiate_face_auth(self, email: str) -> dict:
+        await asyncio.sleep(self.latency)
+        self.initiated += 1
+        return {"ChallengeName": "CUSTOM_CHALLENGE", "Session": "session"}
+
+    async def respond_to_face_auth(self, email: str, challenge: dict, answer: str) -> dict:
+        await asyncio.sleep(self.latency)
+        self.answered.append(answer)
+        return {"AuthenticationResult": {"AccessToken": "token"}}
+
+    async def signin_via_face(self, email: str, image_bytes: bytes, answer: str) -> dict:
+        challenge = await self.initiate_face_auth(email)
+        return await self.respond_to_face_auth(email, challenge, answer)
+
+
+class StubRekognition:
+    def __init__(self, latency: float, similarity: float):
+        self.latency = latency
+        self.similarity = similarity
+
+    async def compare_faces(self, reference: FaceReference, target_image: bytes) -> list[dict]:
+        await asyncio.sleep(self.latency)
+        return [{"Similarity": self.similarity, "Matched": self.similarity >= 95.0}]
+
+
+class FrameRekognition:
+    """Compares each frame with its own latency and similarity, tracking concurrency"""
+
+    def __init__(self, frames: dict[bytes, tuple[float, float | Exception]]):
+        self.frames = frames
+        self.running = 0
+        self.peak = 0
+        self.finished = []
+        self.cancelled = []
+
+    async def compare_faces(self, reference: FaceReference, target_image: bytes) -> list[dict]:
+        latency, similarity = self.frames[target_image]
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            self.cancelled.append(target_image)
+            raise
+        finally:
+            self.running -= 1
+
+        self.finished.append(target_image)
+        if isinstance(similarity, Exception):
+            raise similarity
+        return [{"Similarity": similarity, "Matched": similarity >= 95.0}]
+
+
+class TestRegisterUserFaceCommand:
+    EMAIL = "john.doe@example.com"
+
+    @pytest.fixture
+    def users(self):
+        users = AsyncMock()
+        users.get_by_email.return_value = User(id=1, username="john", email=self.EMAIL)
+        return users
+
+    @pytest.fixture
+    def rekognition(self):
+        rekognition = AsyncMock()
+        rekognition.detect_face_details.return_value = {
+            "FaceDetails": [{"BoundingBox": {"Width": 0.5, "Height": 0.5, "Left": 0.25, "Top": 0.25}}]
+        }
+        rekognition.index_face.return_value = FaceEnrollment()
+        return rekognition
+
+    @pytest.fixture
+    def command(self, users, rekognition):
+        return RegisterUserFaceCommand(UnitOfWork(AsyncMock()), StubCognito(0), users, rekognition, AsyncMock())
+
+    async def test_ticket_skips_face_detection(self, command, rekognition):
+        ticket = await command.validate(self.EMAIL, b"image")
+        rekognition.detect_face_details.assert_awaited_once()
+
+        await command.execute(self.EMAIL, b"image", ticket)
+
+        rekognition.detect_face_details.assert_awaited_once()
+        rekognition.index_face.assert_awaited_once()
+        command.s3.upload_object.assert_awaited_once()
+
+    async def test_registers_without_ticket(self, command, rekognition):
+        await command.execute(self.EMAIL, b"image")
+
+        rekognition.detect_face_details.assert_awaited_once()
+        command.s3.upload_object.assert_awaited_once()
+
+    @pytest.mark.parametrize(
+        "email, image, ticket",
+        [
+            ("jane.doe@example.com", b"image", None),
+            (EMAIL, b"other image", None),
+            (EMAIL, b"image", "not a ticket"),
+        ],
+    )
+    async def test_rejects_ticket_for_other_image_or_user(self, command, rekognition, email, image, ticket):
+        ticket = ticket or await command.validate(self.EMAIL, b"image")
+
+        with pytest.raises(InvalidFaceTicketError):
+            await command.execute(email, image, ticket)
+
+        rekognition.index_face.assert_not_awaited()
+        command.s3.upload_object.assert_not_awaited()
+
+    async def test_failed_reenrollment_keeps_previous_face(self, command, users, rekognition):
+        users.get_by_email.return_value = User(
+            id=1, username="john", email=self.EMAIL, face_image_key="faces/john.jpg", face_id="old-face"
+        )
+        rekognition.index_face.return_value = FaceEnrollment(face_id="new-face")
+        command.s3.upload_object.side_effect = S3ServiceError("Failed to upload object to S3")
+
+        with pytest.raises(ServiceError):
+            await command.execute(self.EMAIL, b"image")
+
+        # Only the face this attempt indexed is forgotten, the stored enrollment is left as is
+        [forgotten] = [call.args[0] for call in rekognition.forget_face.await_args_list]
+        assert forgotten.face_id == "new-face"
+        rekognition.publish_face.assert_not_awaited()
+        command.s3.delete_object.assert_not_awaited()
+        assert all(call.args[1]["face_id"] == "new-face" for call in users.update.await_args_list)
+
+    async def test_ticket_is_not_an_identity_cookie(self, command):
+        ticket = await command.validate(self.EMAIL, b"image")
+
+        with pytest.raises(HTTPException) as e:
+            get_user_from_cookie(HTTPAuthorizationCredentials(scheme="Bearer", credentials=ticket))
+        assert e.value.status_code == 403
+
+
+class TestSigninViaFaceCommand:
+    @pytest.fixture
+    def users(self):
+        users = AsyncMock()
+        users.get_by_email.return_value = User(id=1, username="john", email="john.doe@example.com")
+        return users
+
+    @pytest.fixture
+    def cognito(self):
+        return StubCognito(LATENCY)
+
+    def command(self, cognito, users, similarity: float, speculative_auth: bool) -> SigninViaFaceCommand:
+        return SigninViaFaceCommand(
+            cognito, users, StubRekognition(LATENCY, similarity), speculative_auth=speculative_auth
+        )
+
+    async def timed(self, coro) -> tuple[float, dict]:
+        started = time.perf_counter()
+        result = await coro
+        return time.perf_counter() - started, result
+
+    async def test_rejected_image_makes_no_upstream_call(self, cognito, users):
+        rekognition = AsyncMock()
+        command = SigninViaFaceCommand(
+            cognito,
+            users,
+            rekognition,
+            images=ImagePipeline(FaceImageSettings(), QualityScreen(FaceQualitySettings())),
+            speculative_auth=True,
+        )
+
+        with pytest.raises(ServiceError):
+            await command.execute("john.doe@example.com", b"not an image")
+
+        rekognition.compare_faces.assert_not_awaited()
+        assert cognito.initiated == 0
+
+    async def test_sequential_signin_waits_for_each_upstream(self, cognito, users):
+        command = self.command(cognito, users, similarity=99.0, speculative_auth=False)
+
+        elapsed, result = await self.timed(command.execute("john.doe@example.com", b"image"))
+
+        assert result["AuthenticationResult"]["AccessToken"] == "token"
+        assert elapsed >= 3 * LATENCY
+
+    async def test_speculative_signin_overlaps_initiation(self, cognito, users):
+        command = self.command(cognito, users, similarity=99.0, speculative_auth=True)
+
+        elapsed, result = await self.timed(command.execute("john.doe@example.com", b"image"))
+
+        assert result["AuthenticationResult"]["AccessToken"] == "token"
+        assert cognito.answered == ["face_verified"]
+        assert 2 * LATENCY <= elapsed < 2.8 * LATENCY
+
+    @pytest.mark.parametrize("speculative_auth", [False, True])
+    async def test_rejected_challenge_is_a_service_error(self, cognito, users, speculative_auth):
+        cognito.respond_to_face_auth = AsyncMock(side_effect=NotAuthorizedError("Face authentication was not accepted"))
+        command = self.command(cognito, users, similarity=99.0, speculative_auth=speculative_auth)
+
+        with pytest.raises(ServiceError, match="not accepted"):
+            await command.execute("john.doe@example.com", b"image")
+
+    async def test_speculative_session_dropped_on_mismatch(self, cognito, users):
+        cognito.latency = 3 * LATENCY
+        command = self.command(cognito, users, similarity=60.0, speculative_auth=True)
+
+        started = time.perf_counter()
+        with pytest.raises(ServiceError):
+            await command.execute("john.doe@example.com", b"image")
+
+        assert time.perf_counter() - started < 2 * LATENCY
+        await asyncio.sleep(4 * LATENCY)
+        assert cognito.initiated == 0
+        assert cognito.answered == []
+
+    async def test_speculative_session_dropped_on_lookup_error(self, cognito, users):
+        users.get_by_email.side_effect = ServiceError("database is down")
+        command = self.command(cognito, users, similarity=99.0, speculative_auth=True)
+
+        with pytest.raises(ServiceError):
+            await command.execute("john.doe@example.com", b"image")
+
+        await asyncio.sleep(2 * LATENCY)
+        assert cognito.answered == []
+
+    async def test_first_matching_frame_wins(self, cognito, users):
+        rekognition = FrameRekognition(
+            {b"dark": (LATENCY, 60.0), b"good": (LATENCY / 2, 99.0), b"slow": (5 * LATENCY, 99.0)}
+        )
+        command = SigninViaFaceCommand(cognito, users, rekognition, max_concurrent_frames=3)
+
+        elapsed, result = await self.timed(command.execute("john.doe@example.com", b"dark", b"good", b"slow"))
+
+        assert result["AuthenticationResult"]["AccessToken"] == "token"
+        assert elapsed < 3 * LATENCY
+        await asyncio.sleep(0)
+        assert rekognition.finished == [b"good"]
+        assert sorted(rekognition.cancelled) == [b"dark", b"slow"]
+
+    async def test_frames_respect_concurrency_cap(self, cognito, users):
+        rekognition = FrameRekognition({bytes([frame]): (LATENCY / 2, 60.0) for frame in range(4)})
+        rekognition.frames[b"\x03"] = (LATENCY / 2, 99.0)
+        command = SigninViaFaceCommand(cognito, users, rekognition, max_concurrent_frames=2)
+
+        result = await command.execute("john.doe@example.com", *(bytes([frame]) for frame in range(4)))
+
+        assert result["AuthenticationResult"]["AccessToken"] == "token"
+        assert rekognition.peak == 2
+
+    async def test_failed_frame_does_not_fail_login(self, cognito, users):
+        rekognition = FrameRekognition(
+            {b"broken": (0, RekognitionClientError("Invalid image")), b"good": (LATENCY, 99.0)}
+        )
+        command = SigninViaFaceCommand(cognito, users, rekognition)
+
+        result = await command.execute("john.doe@example.com", b"broken", b"good")
+
+        assert result["AuthenticationResult"]["AccessToken"] == "token"
+
+    async def test_no_matching_frame(self, cognito, users):
+        rekognition = FrameRekognition({b"dark": (0, 60.0), b"broken": (0, RekognitionClientError("Invalid image"))})
+        command = SigninViaFaceCommand(cognito, users, rekognition, speculative_auth=True)
+
+        with pytest.raises(ServiceError, match="not enabled"):
+            await command.execute("john.doe@example.com", b"dark", b"broken")
+
+        await asyncio.sleep(2 * LATENCY)
+        assert cognito.answered == []
+
+
+class TestSigninViaFaceBurstCommand:
+    @pytest.fixture
+    def users(self):
+        users = AsyncMock()
+        users.get_by_email.return_value = User(id=1, username="john", email="john.doe@example.com")
+        return users
+
+    @pytest.fixture
+    def images(self):
+        return ImagePipeline(FaceImageSettings(FACE_IMAGE_WORKERS=0), QualityScreen(FaceQualitySettings()))
+
+    async def test_compares_only_best_frames(self, users, images):
+        sharp = make_image()
+        frames = [encode(sharp.filter(ImageFilter.GaussianBlur(radius))) for radius in (3, 2, 0, 1)]
+        rekognition = FrameRekognition({frame: (0, 99.0) for frame in frames})
+        signin = SigninViaFaceCommand(StubCognito(0), users, rekognition)
+        command = SigninViaFaceBurstCommand(signin, images, best_frames=1)
+
+        credentials, selection = await command.execute("john.doe@example.com", frames)
+
+        assert credentials["AuthenticationResult"]["AccessToken"] == "token"
+        assert [frame.index for frame in selection.chosen] == [2]
+        assert rekognition.finished == [frames[2]]
+
+    async def test_burst_without_usable_frame(self, users, images):
+        rekognition = FrameRekognition({})
+        command = SigninViaFaceBurstCommand(SigninViaFaceCommand(StubCognito(0), users, rekognition), images)
+
+        with pytest.raises(ServiceError, match="undecodable"):
+            await command.execute("john.doe@example.com", [b"not an image", b"nor this"])
+
+        assert rekognition.finished == []
+
+
+class TestSigninViaFaceOnlyCommand:
+    @pytest.fixture
+    def users(self):
+        users = AsyncMock()
+        users.get.return_value = User(id=2, username="jane", email="jane.doe@example.com")
+        users.get_by_face_id.return_value = User(id=3, username="jim", email="jim.doe@example.com")
+        return users
+
+    @pytest.fixture
+    def rekognition(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def command(self, users, rekognition):
+        return SigninViaFaceOnlyCommand(StubCognito(0), users, rekognition)
+
+    async def test_signs_in_identified_user(self, command, rekognition, users):
+        rekognition.identify_face.return_value = [{"Similarity": 99.0, "UserId": 2, "Matched": True}]
+
+        email, credentials = await command.execute(b"image")
+
+        assert email == "jane.doe@example.com"
+        assert credentials["AuthenticationResult"]["AccessToken"] == "token"
+        users.get.assert_awaited_once_with(2)
+
+    async def test_resolves_collection_face_id(self, command, rekognition):
+        rekognition.identify_face.return_value = [{"Similarity": 99.0, "FaceId": "face-id", "Matched": True}]
+
+        user = await command.identify(b"image")
+
+        assert user.email == "jim.doe@example.com"
+
+    async def test_rejects_unmatched_image(self, command, rekognition):
+        rekognition.identify_face.return_value = [{"Similarity": 80.0, "UserId": 2, "Matched": False}]
+
+        with pytest.raises(ServiceError):
+            await command.execute(b"image")
+
+    async def test_rejected_challenge_is_a_service_error(self, command, rekognition):
+        rekognition.identify_face.return_value = [{"Similarity": 99.0, "UserId": 2, "Matched": True}]
+        command.cognito.respond_to_face_auth = AsyncMock(side_effect=NotAuthorizedError("Face authentication failed"))
+
+        with pytest.raises(ServiceError, match="jane.doe@example.com"):
+            await command.execute(b"image")
@@ -0,0 +1,178 @@
+from io import BytesIO
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from faces.embeddings import ReferenceEmbeddingExtractor, from_bytes
+from rekognition.backends import CollectionBackend, CompareFacesBackend, LocalEmbeddingBackend
+from rekognition.exceptions import FaceIdentificationNotSupportedError, FaceImageValidationError
+from rekognition.schemas import FaceReference
+from rekognition.service import RekognitionService
+
+
+def make_image(seed: int, size: int = 64) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    buffer = BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TestCompareFacesBackend:
+    async def test_identification_not_supported(self):
+        with pytest.raises(FaceIdentificationNotSupportedError):
+            await CompareFacesBackend(AsyncMock()).identify_faces(b"image", 95.0, 1)
+
+    async def test_compare_faces_uses_s3_reference(self):
+        repo = AsyncMock()
+        repo.compare_faces.return_value = {"FaceMatches": [{"Similarity": 99.0}]}
+
+        matches = await CompareFacesBackend(repo).compare_faces(FaceReference(key="face_1.jpg"), b"image", 95.0)
+
+        repo.compare_faces.assert_awaited_once_with("face_1.jpg", b"image", 95.0)
+        assert matches == [{"Similarity": 99.0}]
+
+
+class TestCollectionBackend:
+    @pytest.fixture
+    def repo(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def backend(self, repo):
+        return CollectionBackend(repo, search_max_faces=10)
+
+    async def test_searches_for_stored_face(self, backend, repo):
+        repo.search_faces_by_image.return_value = {
+            "FaceMatches": [
+                {"Similarity": 99.0, "Face": {"FaceId": "someone-else"}},
+                {"Similarity": 96.0, "Face": {"FaceId": "face-id"}},
+            ]
+        }
+
+        matches = await backend.compare_faces(FaceReference(key="face_1.jpg", face_id="face-id"), b"image", 95.0)
+
+        repo.search_faces_by_image.assert_awaited_once_with(b"image", 95.0, 10)
+        repo.compare_faces.assert_not_awaited()
+        assert [match["Similarity"] for match in matches] == [96.0]
+
+    async def test_falls_back_without_stored_face(self, backend, repo):
+        repo.compare_faces.return_value = {"FaceMatches": []}
+
+        assert await backend.compare_faces(FaceReference(key="face_1.jpg"), b"image", 95.0) == []
+        repo.compare_faces.assert_awaited_once()
+
+    async def test_identify_faces_across_collection(self, backend, repo):
+        repo.search_faces_by_image.return_value = {"FaceMatches": [{"Similarity": 99.0, "Face": {"FaceId": "face-id"}}]}
+
+        matches = await backend.identify_faces(b"image", 95.0, 1)
+
+        repo.search_faces_by_image.assert_awaited_once_with(b"image", 95.0, 1)
+        assert matches == [{"Similarity": 99.0, "FaceId": "face-id"}]
+
+    async def test_index_face(self, backend, repo):
+        repo.index_face.return_value = {"FaceRecords": [{"Face": {"FaceId": "face-id"}}]}
+
+        enrollment = await backend.index_face(FaceReference(key="face_1.jpg"), b"image")
+
+        assert enrollment.face_id == "face-id"
+        repo.index_face.assert_awaited_once_with(b"image", external_image_id="face_1.jpg")
+
+    async def test_index_face_rejected_by_quality_filter(self, backend, repo):
+        repo.index_face.return_value = {"FaceRecords": [], "UnindexedFaces": [{"Reasons": ["LOW_SHARPNESS"]}]}
+
+        with pytest.raises(FaceImageValidationError):
+            await backend.index_face(FaceReference(key="face_1.jpg"), b"image")
+
+
+class TestLocalEmbeddingBackend:
+    @pytest.fixture
+    def backend(self):
+        return LocalEmbeddingBackend(ReferenceEmbeddingExtractor(dim=64))
+
+    @pytest.fixture
+    def service(self, backend):
+        return RekognitionService(backend)
+
+    async def test_embedding_is_deterministic(self, backend):
+        first = await backend.index_face(FaceReference(key="face_1.jpg"), make_image(1))
+        second = await backend.index_face(FaceReference(key="face_1.jpg"), make_image(1))
+
+        assert first.face_id is None
+        assert first.embedding == second.embedding
+        assert np.linalg.norm(from_bytes(first.embedding, 64)) == pytest.approx(1.0)
+
+    async def test_same_face_matches(self, backend, service):
+        enrollment = await backend.index_face(FaceReference(key="face_1.jpg"), make_image(1))
+        reference = FaceReference(key="face_1.jpg", embedding=enrollment.embedding)
+
+        matches = await service.compare_faces(reference, make_image(1))
+
+        assert matches[0]["Matched"] is True
+        assert matches[0]["Similarity"] == pytest.approx(100.0, abs=1e-3)
+
+    async def test_other_face_does_not_match(self, backend, service):
+        enrollment = await backend.index_face(FaceReference(key="face_1.jpg"), make_image(1))
+        reference = FaceReference(key="face_1.jpg", embedding=enrollment.embedding)
+
+        matches = await service.compare_faces(reference, make_image(2))
+
+        assert matches[0]["Matched"] is False
+
+    async def test_identify_published_faces(self, backend, service):
+        for user_id in (1, 2, 3):
+            enrollment = await backend.index_face(FaceReference(key=f"face_{user_id}.jpg"), make_image(user_id))
+            await service.publish_face(FaceReference(key="", user_id=user_id, embedding=enrollment.embedding))
+
+        matches = await service.identify_face(make_image(2))
+
+        assert matches[0]["UserId"] == 2
+        assert matches[0]["Matched"] is True
+
+        await service.forget_face(FaceReference(key="face_2.jpg", user_id=2))
+        assert all(match["UserId"] != 2 for match in await service.identify_face(make_image(2), max_matches=3))
+
+    async def test_identification_can_be_disabled(self):
+        backend = LocalEmbeddingBackend(ReferenceEmbeddingExtractor(dim=64), identification=False)
+
+        with pytest.raises(FaceIdentificationNotSupportedError):
+            await backend.identify_faces(make_image(1), 95.0, 1)
+
+    async def test_load_index(self, backend):
+        enrollment = await backend.index_face(FaceReference(key="face_1.jpg"), make_image(1))
+
+        async def rows():
+            yield [(1, enrollment.embedding), (2, b"truncated")]
+
+        assert await backend.load_index(rows()) == 1
+        assert 1 in backend.index
+
+    async def test_resync_applies_other_processes_registrations(self, backend):
+        first, second, third = [
+            (await backend.index_face(FaceReference(key=""), make_image(seed))).embedding for seed in (1, 2, 3)
+        ]
+
+        async def rows(*batch):
+            yield list(batch)
+
+        await backend.load_index(rows((1, first), (2, second)))
+
+        # Another process re-registered user 1, registered user 3 and deleted user 2
+        assert await backend.resync(rows((1, third), (3, second))) == (2, 1)
+        assert 2 not in backend.index
+        assert (await backend.identify_faces(make_image(3), 95.0, 1))[0]["UserId"] == 1
+
+        assert await backend.resync(rows((1, third), (3, second))) == (0, 0)
+
+    async def test_no_enrolled_embedding(self, service):
+        assert await service.compare_faces(FaceReference(key="face_1.jpg"), make_image(1)) == []
+
+    async def test_detect_face_details(self, service):
+        details = await service.detect_face_details(make_image(1))
+
+        assert len(details["FaceDetails"]) == 1
+
+    async def test_undecodable_image(self, service):
+        with pytest.raises(FaceImageValidationError):
+            await service.detect_face_details(b"not an image")
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import select
+
+from rekognition.backfill import FaceIdBackfill
+from rekognition.exceptions import FaceImageValidationError
+from rekognition.schemas import FaceEnrollment, FaceReference
+from tests.unit.test_enrollments.test_worker import FakeS3
+from users.models import User
+from users.repo import UserRepository
+
+
+class FakeCollection:
+    """Stands in for CollectionBackend, indexing each image as face-<its bytes>"""
+
+    def __init__(self):
+        self.indexed: list[str] = []
+        self.forgotten: list[str] = []
+
+    async def index_face(self, reference: FaceReference, image: bytes) -> FaceEnrollment:
+        if image == b"no face":
+            raise FaceImageValidationError("No face of sufficient quality to index")
+        self.indexed.append(reference.key)
+        return FaceEnrollment(face_id=f"face-{image.decode()}")
+
+    async def forget_face(self, reference: FaceReference) -> None:
+        self.forgotten.append(reference.face_id)
+
+
+@pytest.fixture
+async def engine(database_url):
+    engine = create_async_engine(database_url)
+    async with engine.begin() as connection:
+        await connection.run_sync(User.__table__.drop, checkfirst=True)
+        await connection.run_sync(User.__table__.create)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def sessions(engine):
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def collection():
+    return FakeCollection()
+
+
+@pytest.fixture
+def s3():
+    return FakeS3()
+
+
+async def add_users(sessions, s3, *users: tuple[str, bytes | None, str | None]) -> None:
+    """Add (username, stored image, face id) users, the image is stored under face_<username>.jpg"""
+    async with sessions() as session, session.begin():
+        for username, image, face_id in users:
+            key = f"face_{username}.jpg" if image is not None else None
+            session.add(User(username=username, email=f"{username}@example.com", face_image_key=key, face_id=face_id))
+            if image is not None:
+                s3.objects[key] = image
+
+
+async def face_ids(sessions) -> dict[str, str | None]:
+    async with sessions() as session:
+        return dict((await session.execute(select(User.username, User.face_id))).all())
+
+
+class TestFaceIdBackfill:
+    async def test_indexes_only_users_missing_a_face_id(self, sessions, s3, collection):
+        await add_users(sessions, s3, ("alice", b"alice", None), ("bob", b"bob", "face-bob"), ("carol", None, None))
+
+        counts = await FaceIdBackfill(collection, s3, sessions, concurrency=2).run()
+
+        assert counts == {"indexed": 1}
+        assert collection.indexed == ["face_alice.jpg"]
+        assert await face_ids(sessions) == {"alice": "face-alice", "bob": "face-bob", "carol": None}
+
+    async def test_rerun_resumes_with_the_failed_users(self, sessions, s3, collection):
+        await add_users(sessions, s3, ("alice", b"alice", None), ("bob", b"no face", None), ("carol", b"carol", None))
+        # Not uploaded yet
+        del s3.objects["face_carol.jpg"]
+
+        counts = await FaceIdBackfill(collection, s3, sessions).run()
+
+        assert counts == {"indexed": 1, "failed": 2}
+        assert (await face_ids(sessions))["bob"] is None
+
+        s3.objects["face_carol.jpg"] = b"carol"
+        collection.indexed.clear()
+        counts = await FaceIdBackfill(collection, s3, sessions).run()
+
+        assert counts == {"indexed": 1, "failed": 1}
+        assert collection.indexed == ["face_carol.jpg"]
+        assert await face_ids(sessions) == {"alice": "face-alice", "bob": None, "carol": "face-carol"}
+
+    async def test_face_that_cant_be_stored_is_forgotten(self, sessions, s3, collection, monkeypatch):
+        await add_users(sessions, s3, ("alice", b"alice", None))
+
+        async def update(self, id, data):
+            raise ConnectionResetError("database went away")
+
+        monkeypatch.setattr(UserRepository, "update", update)
+
+        with pytest.raises(ConnectionResetError):
+            await FaceIdBackfill(collection, s3, sessions).run()
+
+        assert collection.forgotten == ["face-alice"]
+
+    async def test_delete_removes_every_face_id(self, sessions, s3, collection):
+        await add_users(sessions, s3, ("alice", b"alice", "face-alice"), ("bob", b"bob", None))
+
+        counts = await FaceIdBackfill(collection, s3, sessions).delete()
+
+        assert counts == {"deleted": 1}
+        assert collection.forgotten == ["face-alice"]
+        assert await face_ids(sessions) == {"alice": None, "bob": None}
@@ -0,0 +1,89 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from core.hedging import HedgingPolicy
+from core.latency import LatencyHistogram
+from faces.embeddings import ReferenceEmbeddingExtractor
+from rekognition.config import RekognitionSettings
+from rekognition.schemas import FaceEnrollment, FaceReference
+from rekognition.service import RekognitionService, load_embedding_extractor
+
+
+def reference_extractor() -> ReferenceEmbeddingExtractor:
+    return ReferenceEmbeddingExtractor(dim=64)
+
+
+class TestRekognitionService:
+    @pytest.fixture
+    def backend(self):
+        return AsyncMock()
+
+    @pytest.fixture
+    def service(self, backend):
+        return RekognitionService(backend)
+
+    async def test_compare_faces_applies_threshold(self, service, backend):
+        backend.compare_faces.return_value = [{"Similarity": 97.0}, {"Similarity": 80.0}]
+        reference = FaceReference(key="face_1.jpg")
+
+        matches = await service.compare_faces(reference, b"image")
+
+        backend.compare_faces.assert_awaited_once_with(reference, b"image", 95.0)
+        assert matches == [{"Similarity": 97.0, "Matched": True}, {"Similarity": 80.0, "Matched": False}]
+
+    async def test_compare_faces_hedges_slow_comparison(self, backend):
+        latencies = LatencyHistogram()
+        for _ in range(20):
+            latencies.record(0.01)
+        service = RekognitionService(backend, HedgingPolicy("compare_faces", latencies, budget=1.0, min_delay=0.01))
+        delays = iter([10, 0])
+
+        async def compare_faces(*args):
+            await asyncio.sleep(next(delays))
+            return [{"Similarity": 99.0}]
+
+        backend.compare_faces.side_effect = compare_faces
+
+        matches = await asyncio.wait_for(service.compare_faces(FaceReference(key="face_1.jpg"), b"image"), timeout=1)
+
+        assert matches == [{"Similarity": 99.0, "Matched": True}]
+        assert backend.compare_faces.call_count == 2
+
+    async def test_index_and_forget_face(self, service, backend):
+        backend.index_face.return_value = FaceEnrollment(face_id="face-id")
+        reference = FaceReference(key="face_1.jpg")
+
+        assert await service.index_face(reference, b"image") == FaceEnrollment(face_id="face-id")
+        await service.forget_face(reference)
+
+        backend.forget_face.assert_awaited_once_with(reference)
+
+
+class TestLoadEmbeddingExtractor:
+    def test_refuses_reference_extractor_by_default(self):
+        with pytest.raises(ValueError, match="FACE_EMBEDDING_EXTRACTOR"):
+            load_embedding_extractor(RekognitionSettings(REKOGNITION_BACKEND="local"))
+
+    def test_reference_extractor_when_allowed(self):
+        settings = RekognitionSettings(REKOGNITION_BACKEND="local", FACE_ALLOW_REFERENCE_EXTRACTOR=True)
+
+        assert isinstance(load_embedding_extractor(settings), ReferenceEmbeddingExtractor)
+
+    def test_imports_configured_extractor(self):
+        settings = RekognitionSettings(
+            FACE_EMBEDDING_EXTRACTOR=f"{__name__}:reference_extractor",
+            FACE_EMBEDDING_DIM=64,
+        )
+
+        assert load_embedding_extractor(settings).dim == 64
+
+    def test_rejects_dimension_mismatch(self):
+        settings = RekognitionSettings(
+            FACE_EMBEDDING_EXTRACTOR=f"{__name__}:reference_extractor",
+            FACE_EMBEDDING_DIM=128,
+        )
+
+        with pytest.raises(ValueError, match="64-dimensional"):
+            load_embedding_extractor(settings)
@@ -1,5 +1,4 @@
-from io import BytesIO
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from botocore.exceptions import ClientError
@@ -11,7 +10,7 @@ from s3.service import S3Service
 class TestS3Service:
     @pytest.fixture
     def s3_client_mock(self):
-        return MagicMock()
+        return AsyncMock()
 
     @pytest.fixture
     def s3_service(self, s3_client_mock):
@@ -29,26 +28,28 @@ class TestS3Service:
         assert s3_service.client is not None
         assert s3_service.bucket_name == "test-bucket"
 
-    def test_upload_object_ok(self, s3_service, s3_client_mock):
+    async def test_upload_object_ok(self, s3_service, s3_client_mock):
         test_file = b"test-file"
         test_key = "test-key"
 
-        s3_service.upload_object(key=test_key, file=test_file)
-        s3_client_mock.upload_fileobj.assert_called_once()
+        await s3_service.upload_object(key=test_key, file=test_file)
+        s3_client_mock.put_object.assert_awaited_once_with(Bucket="test-bucket", Key=test_key, Body=test_file)
+        assert s3_client_mock.put_object.call_args.kwargs["Body"] is test_file
 
-        args, kwargs = s3_client_mock.upload_fileobj.call_args
-        assert isinstance(args[0], BytesIO)
-        assert args[0].getvalue() == test_file
-        assert args[1] == "test-bucket"
-        assert args[2] == test_key
-        assert kwargs == {}
-
-    def test_upload_object_error(self, s3_service, s3_client_mock):
-        s3_client_mock.upload_fileobj.side_effect = ClientError(
+    async def test_upload_object_error(self, s3_service, s3_client_mock):
+        s3_client_mock.put_object.side_effect = ClientError(
             {"Error": {"Code": "400", "Message": "Bad Request"}},
             "Upload",
         )
         with pytest.raises(S3ServiceError) as e:
-            s3_service.upload_object(key="test-key", file=b"test-file")
+            await s3_service.upload_object(key="test-key", file=b"test-file")
 
         assert str(e.value) == "Failed to upload object to S3"
+
+    async def test_download_object_ok(self, s3_service, s3_client_mock):
+        body = MagicMock()
+        body.read.return_value = b"test-file"
+        s3_client_mock.get_object.return_value = {"Body": body}
+
+        assert await s3_service.download_object(key="test-key") == b"test-file"
+        s3_client_mock.get_object.assert_awaited_once_with(Bucket="test-bucket", Key="test-key")
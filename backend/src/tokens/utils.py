@@ -26,8 +26,9 @@ def decode_jwt(
     token: str | bytes,
     key: str = JWT.PUBLIC_KEY_PATH.read_text(),
     algorithm: str = JWT.ALGORITHM,
+    audience: str | None = None,
 ) -> dict:
-    """Decode JWT token using public key and algorithm"""
+    """Decode JWT token using public key and algorithm, only tokens without an audience unless `audience` is given"""
     if algorithm.lower() == "none":
         raise ValueError("Secure algorithm is required")
 
@@ -35,6 +36,7 @@ def decode_jwt(
         token,
         key,
         algorithms=[algorithm],
+        audience=audience,
         options={
             "verify_signature": True,
             "verify_exp": True,
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlmodel import Column, Field, Relationship, SQLModel, String
+from sqlmodel import Column, Field, LargeBinary, Relationship, SQLModel, String
 
 from clients.models import ClientUserLink
 
@@ -15,6 +15,8 @@ class User(SQLModel, table=True):
     username: str = Field(sa_column=Column(String, unique=True))
     email: str = Field(sa_column=Column(String, unique=True))
     face_image_key: str | None = Field(sa_column=Column(String, unique=True))
+    face_id: str | None = Field(default=None, sa_column=Column(String, unique=True))
+    face_embedding: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
     email_verified: bool = Field(default=False, sa_column_kwargs={"server_default": "false"})
     is_direct: bool = Field(default=True, sa_column_kwargs={"server_default": "true"})
 
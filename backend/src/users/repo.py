@@ -1,8 +1,9 @@
-from typing import Annotated, Dict, Any
+from collections.abc import AsyncIterator
+from typing import Annotated, Any, Dict
 
 import sqlalchemy
 from fastapi import Depends
-from sqlmodel import Session
+from sqlmodel import Session, select
 
 from core.db import get_session
 from users.exceptions import (
@@ -72,6 +73,22 @@ class UserRepository(SQLModelRepository):
             raise UserNotFoundError("User with email {email} is not found")
         return user[0]
 
+    async def get_by_face_id(self, face_id: str) -> User:
+        user = await super().filter(face_id=face_id)
+        if not user:
+            raise UserNotFoundError(f"User with face id {face_id} is not found")
+        return user[0]
+
+    async def iter_face_embeddings(self, batch_size: int = 10_000) -> AsyncIterator[list[tuple[int, bytes]]]:
+        """Stream (id, face_embedding) of every user with a stored embedding"""
+        result = await self.session.stream(
+            select(User.id, User.face_embedding)
+            .where(User.face_embedding.is_not(None))
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in result.partitions(batch_size):
+            yield [tuple(row) for row in partition]
+
 
 def get_users_repository(
     session: Annotated[Session, Depends(get_session)],